@@ -27,24 +27,43 @@
 #
 # =================================================================
 
+import contextlib
+import copy
 import datetime
+import functools
 import geopandas
+import json
+import numpy
+import os
 import pandas
+import pyogrio
+import re
 import shapely.geometry
+import threading
+import time
 import logging
+import operator
+import pyarrow
+import pyarrow.compute
+import pyarrow.ipc
+import pyarrow.parquet
 from shapely import box
 from collections import OrderedDict
-from typing import Literal, Optional
+from typing import Callable, Literal, Optional
 from typing import TypedDict
 from collections import defaultdict
 from pygeoapi.provider.base import (
     BaseProvider,
     ProviderInvalidDataError,
+    ProviderInvalidQueryError,
     ProviderItemNotFoundError,
     ProviderNoDataError,
     ProviderQueryError,
 )
 from pygeoapi.crs import crs_transform
+from pygeofilter import ast as cql, values as cql_values
+from pygeofilter.parsers.cql2_text import parse as parse_cql2_text
+from pygeofilter.util import like_pattern_to_re
 
 LOGGER = logging.getLogger(__name__)
 
@@ -95,178 +114,2698 @@ class FeatureCollection(TypedDict):
     numberReturned: int
 
 
+class SharedDataset(TypedDict):
+    gdf: geopandas.GeoDataFrame
+    # Position of the first row carrying each identifier
+    ids: Optional[dict[str, int]]
+    # Row positions in time order and their times, if there is a time field
+    times: Optional[tuple[numpy.ndarray, numpy.ndarray]]
+    # x and y of each row as float64, if the geometry is an x and y column
+    coordinates: Optional[tuple[numpy.ndarray, numpy.ndarray]]
+    # Envelope index, if geometries are kept as WKB: the row positions in
+    # order of their min x and those min x, the width of the envelopes
+    # indexed, and the positions of the wider ones
+    envelopes: Optional[
+        tuple[numpy.ndarray, numpy.ndarray, float, numpy.ndarray]
+    ]
+    # Row positions in sort order, keyed by the sortby they were sorted with
+    sorts: dict[tuple, numpy.ndarray]
+    # Rows created since gdf was built; the first delta_size belong to
+    # this version, later ones to the versions appended after it
+    delta: list[dict]
+    delta_size: int
+    # Generation and end offset of the write-ahead log this version
+    # includes, the offset is None for the start of the generation
+    wal: Optional[tuple[int, Optional[int]]]
+    # Geometry type and GeoJSON of each row of gdf, None until serialized
+    geojson: Optional[numpy.ndarray]
+    # Words of the q fields: the id of each word, and the row positions
+    # of word id i, sorted, at positions[offsets[i]:offsets[i + 1]]
+    terms: Optional[tuple[dict[str, int], numpy.ndarray, numpy.ndarray]]
+
+
+class QueryFilter(TypedDict):
+    # Estimated number of rows of the whole dataset the filter keeps
+    estimate: int
+    apply: Callable[[geopandas.GeoDataFrame], geopandas.GeoDataFrame]
+
+
+# Number of rows sampled to estimate how selective a property filter is
+PLANNER_SAMPLE_SIZE = 1024
+
+# Number of sort orders of a dataset kept for paging through sorted results
+SORT_CACHE_SIZE = 8
+
+# Number of compiled CQL2 filters kept, so repeated filters are not compiled
+FILTER_CACHE_SIZE = 256
+
+# Number of updated rows from which setting whole columns is faster than
+# setting the cells of each row
+BATCH_UPDATE_SIZE = 64
+
+# Columns holding the envelopes of geometries shared as WKB
+ENVELOPE_COLUMNS = ('__xmin', '__ymin', '__xmax', '__ymax')
+
+# Quantile of the envelope widths from which envelopes are checked apart by
+# bbox queries rather than widening the range of min x they search
+WIDE_ENVELOPES = 0.99
+
+# Size in bytes from which the write-ahead log is checkpointed
+WAL_COMPACT_SIZE = 16 * 2**20
+
+# Created rows are buffered until there are as many as rows in the frame,
+# and at least this many, so that creating a row costs amortized O(1)
+DELTA_COMPACT_SIZE = 1024
+
+# Words q searches for, anything else separates them
+WORD = r'\w+'
+
+# A date or datetime of any precision, from a year to fractional seconds
+PARTIAL_ISO_DATETIME = re.compile(
+    r'^(?P<year>\d{4})'
+    r'(?:-(?P<month>\d{2})'
+    r'(?:-(?P<day>\d{2})'
+    r'(?:[T ](?P<hour>\d{2})'
+    r'(?::(?P<minute>\d{2})'
+    r'(?::(?P<second>\d{2})(?P<fraction>\.\d+)?)?)?)?)?)?'
+    r'(?P<tz>Z|[+-]\d{2}:?\d{2})?$'
+)
+
+
+# pygeoapi instantiates a provider for every request it serves, so the
+# prepared GeoDataFrame of each source and its indexes (including the spatial
+# index geopandas caches on the frame) are shared by every GeoPandasProvider
+# reading that unchanged source. Writes publish a new version of the dataset
+# rather than modifying a shared frame in place.
+_DATASETS: dict[tuple, SharedDataset] = {}
+
+# New versions of the shared datasets are published under this lock. The
+# frame and rows of a version never change once published, so a provider
+# keeps reading the version it started with while others write.
+_DATASETS_LOCK = threading.Lock()
+
+# Writers of a dataset build its next version under the lock of its key,
+# so writing to one dataset blocks neither its readers nor other datasets
+_WRITE_LOCKS: dict[tuple, threading.Lock] = {}
+
+# Compiled CQL2 filters keyed by their text, least recently used first
+_FILTERS: OrderedDict[str, Callable] = OrderedDict()
+_FILTERS_LOCK = threading.Lock()
+
+# Schemas read from schema caches, by the path of their cache
+_SCHEMAS: dict[str, dict] = {}
+
+# Background reloads of changed sources, by the key of the new version
+_RELOADS: dict[tuple, threading.Thread] = {}
+
+
+def _new_dataset(
+    gdf: geopandas.GeoDataFrame,
+    ids: Optional[dict[str, int]] = None,
+    wal: Optional[tuple[int, Optional[int]]] = None,
+    geojson: Optional[numpy.ndarray] = None,
+    terms: Optional[
+        tuple[dict[str, int], numpy.ndarray, numpy.ndarray]
+    ] = None,
+) -> SharedDataset:
+    """
+    Start a version of a dataset with no indexes other than ids
+
+    :param gdf: GeoDataFrame of the version
+    :param ids: identifier positions in gdf, if already known
+    :param wal: position in the write-ahead log the version includes
+    :param geojson: serialized geometries of gdf, if already known
+    :param terms: text index of gdf, if already known
+
+    :returns: the dataset version
+    """
+    return {
+        'gdf': gdf,
+        'ids': ids,
+        'times': None,
+        'coordinates': None,
+        'envelopes': None,
+        'sorts': {},
+        'delta': [],
+        'delta_size': 0,
+        'wal': wal,
+        'geojson': geojson,
+        'terms': terms,
+    }
+
+
+def _wal_default(value: any) -> any:
+    """
+    Encode the values of items JSON cannot, for the write-ahead log
+
+    :param value: value of an item
+
+    :returns: JSON serializable value
+    """
+    if isinstance(value, shapely.geometry.base.BaseGeometry):
+        return {'$geometry': shapely.to_wkb(value, hex=True)}
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, numpy.generic):
+        return value.item()
+
+    raise TypeError(f'Cannot log {type(value).__name__} values')
+
+
+def _wal_object_hook(obj: dict) -> any:
+    """
+    Decode the values encoded by _wal_default
+
+    :param obj: JSON object
+
+    :returns: the decoded value
+    """
+    if obj.keys() == {'$geometry'}:
+        return shapely.from_wkb(obj['$geometry'])
+    if obj.keys() == {'$datetime'}:
+        return pandas.Timestamp(obj['$datetime'])
+
+    return obj
+
+
+def _dataset_key(provider_def: dict) -> tuple:
+    """
+    Key a provider definition by its data source and the config used to
+    prepare it
+
+    :param provider_def: provider definition
+
+    :returns: tuple of the data source, its version and the preparation config
+    """
+    data = provider_def['data']
+
+    try:
+        stat = os.stat(data)
+        version = (stat.st_mtime_ns, stat.st_size)
+    except (OSError, TypeError, ValueError):
+        # Remote or otherwise not stat-able sources are keyed by name only
+        version = None
+
+    options = json.dumps(
+        {
+            key: provider_def.get(key)
+            for key in (
+                'id_field',
+                'time_field',
+                'geometry',
+                'wal',
+                'shared_memory',
+                'geometry_precision',
+                'q_fields',
+            )
+        },
+        sort_keys=True,
+        default=str,
+    )
+
+    return (str(data), options, version)
+
+
+# Spatial index predicates relating a literal geometry to the geometry of
+# the rows, for spatial operators applied to (row geometry, literal)
+SPATIAL_PREDICATES = {
+    cql.SpatialComparisonOp.INTERSECTS: 'intersects',
+    cql.SpatialComparisonOp.DISJOINT: 'intersects',
+    cql.SpatialComparisonOp.CONTAINS: 'within',
+    cql.SpatialComparisonOp.WITHIN: 'contains',
+    cql.SpatialComparisonOp.TOUCHES: 'touches',
+    cql.SpatialComparisonOp.CROSSES: 'crosses',
+    cql.SpatialComparisonOp.OVERLAPS: 'overlaps',
+    cql.SpatialComparisonOp.EQUALS: 'intersects',
+}
+
+# Spatial operators of (literal, row geometry) as applied to (row geometry,
+# literal), the other operators being symmetric
+SPATIAL_CONVERSES = {
+    cql.SpatialComparisonOp.CONTAINS: cql.SpatialComparisonOp.WITHIN,
+    cql.SpatialComparisonOp.WITHIN: cql.SpatialComparisonOp.CONTAINS,
+}
+
+COMPARISONS = {
+    cql.ComparisonOp.EQ: operator.eq,
+    cql.ComparisonOp.NE: operator.ne,
+    cql.ComparisonOp.LT: operator.lt,
+    cql.ComparisonOp.LE: operator.le,
+    cql.ComparisonOp.GT: operator.gt,
+    cql.ComparisonOp.GE: operator.ge,
+}
+
+ARITHMETIC = {
+    cql.ArithmeticOp.ADD: operator.add,
+    cql.ArithmeticOp.SUB: operator.sub,
+    cql.ArithmeticOp.MUL: operator.mul,
+    cql.ArithmeticOp.DIV: operator.truediv,
+}
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    """
+    Hold an exclusive lock on a file, shared by all processes
+
+    fcntl is only imported here, so the provider still imports on
+    platforms without it as long as neither a wal nor shared memory is
+    configured.
+
+    :param path: path of the lock file
+    """
+    try:
+        import fcntl
+    except ModuleNotFoundError:
+        raise ProviderInvalidDataError(
+            'wal and shared_memory need POSIX file locks'
+        )
+
+    with open(path, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _float_id(identifier: str) -> Optional[float]:
+    """
+    Read an identifier of a float id field as the float it was written from
+
+    :param identifier: feature id
+
+    :returns: the float, None if no float is written as the identifier
+    """
+    try:
+        value = float(identifier)
+    except ValueError:
+        return None
+
+    return value if str(value) == identifier else None
+
+
+def _as_mask(values: any, size: int) -> numpy.ndarray:
+    """
+    Convert the result of a predicate to a boolean mask, missing as False
+
+    :param values: Series, array or scalar result of a predicate
+    :param size: number of rows of the mask
+
+    :returns: boolean mask of the rows
+    """
+    if isinstance(values, pandas.Series):
+        return values.fillna(False).to_numpy(dtype=bool)
+    if isinstance(values, numpy.ndarray):
+        return values.astype(bool)
+
+    return numpy.full(size, bool(values))
+
+
+def _to_index_time(value: datetime.datetime) -> numpy.datetime64:
+    """
+    Convert a datetime to the UTC time of the time index
+
+    :param value: datetime or Timestamp, naive or with a UTC offset
+
+    :returns: naive UTC datetime64 in microseconds
+    """
+    if isinstance(value, pandas.Timestamp):
+        value = value.to_pydatetime()
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+    return numpy.datetime64(value.replace(tzinfo=None), 'us')
+
+
+def _coerce(values: any, literal: any) -> any:
+    """
+    Cast a literal to the type of the values it is compared with
+
+    :param values: Series of a column, or a scalar
+    :param literal: literal value of the filter
+
+    :returns: the literal, as a Timestamp of the same timezone awareness
+              if the values are datetimes
+    """
+    if not isinstance(values, pandas.Series) or not (
+        pandas.api.types.is_datetime64_any_dtype(values.dtype)
+    ):
+        return literal
+    if not isinstance(literal, (datetime.date, str)):
+        return literal
+
+    timestamp = pandas.Timestamp(literal)
+    if values.dt.tz is not None and timestamp.tz is None:
+        return timestamp.tz_localize('UTC')
+    if values.dt.tz is None and timestamp.tz is not None:
+        return timestamp.tz_convert(None)
+    return timestamp
+
+
+def _compile_filter(node: any) -> Callable[['GeoPandasProvider'], any]:
+    """
+    Compile a CQL2 AST to a function evaluating it over a whole dataset
+
+    Predicates evaluate to boolean masks over the rows of the provider's
+    GeoDataFrame, expressions to columns or scalars. Everything that does
+    not depend on the data, like LIKE patterns and literal geometries, is
+    prepared once here.
+
+    :param node: pygeofilter AST node
+
+    :returns: function of a provider returning the value of the node
+    """
+    if isinstance(node, cql.Attribute):
+        name = node.name
+
+        def attribute(p):
+            if name not in p.gdf.columns:
+                raise ProviderQueryError(f'Unknown property {name}')
+            return p.gdf[name]
+
+        return attribute
+
+    if isinstance(node, (cql.And, cql.Or)):
+        lhs, rhs = _compile_filter(node.lhs), _compile_filter(node.rhs)
+        combine = operator.and_ if isinstance(node, cql.And) else operator.or_
+        return lambda p: combine(lhs(p), rhs(p))
+
+    if isinstance(node, cql.Not):
+        sub_node = _compile_filter(node.sub_node)
+        return lambda p: ~sub_node(p)
+
+    if isinstance(node, cql.Include):
+        return lambda p: numpy.full(len(p.gdf), not node.not_)
+
+    if isinstance(node, cql.Comparison):
+        lhs, rhs = _compile_filter(node.lhs), _compile_filter(node.rhs)
+        compare = COMPARISONS[node.op]
+
+        def comparison(p):
+            left, right = lhs(p), rhs(p)
+            right, left = _coerce(left, right), _coerce(right, left)
+            return _as_mask(compare(left, right), len(p.gdf))
+
+        return comparison
+
+    if isinstance(node, cql.Between):
+        lhs = _compile_filter(node.lhs)
+        low, high = _compile_filter(node.low), _compile_filter(node.high)
+
+        def between(p):
+            values = lhs(p)
+            mask = _as_mask(
+                (values >= _coerce(values, low(p)))
+                & (values <= _coerce(values, high(p))),
+                len(p.gdf),
+            )
+            return ~mask if node.not_ else mask
+
+        return between
+
+    if isinstance(node, cql.Like):
+        lhs = _compile_filter(node.lhs)
+        pattern = like_pattern_to_re(
+            node.pattern,
+            node.nocase,
+            node.wildcard,
+            node.singlechar,
+            node.escapechar or '\\',
+        )
+
+        # Patterns with wildcards only around a literal are matched by
+        # substring, which is considerably faster than a regex
+        core = node.pattern.strip(node.wildcard)
+        simple = not any(
+            char in core
+            for char in (node.wildcard, node.singlechar, node.escapechar)
+            if char
+        )
+        if node.nocase:
+            core = core.lower()
+        starts = node.pattern.startswith(node.wildcard)
+        ends = node.pattern.endswith(node.wildcard)
+
+        def like(p):
+            values = lhs(p).astype('string')
+            if not simple:
+                matched = values.str.fullmatch(pattern)
+            else:
+                if node.nocase:
+                    values = values.str.lower()
+                if starts and ends:
+                    matched = values.str.contains(core, regex=False)
+                elif ends:
+                    matched = values.str.startswith(core)
+                elif starts:
+                    matched = values.str.endswith(core)
+                else:
+                    matched = values == core
+            mask = _as_mask(matched, len(p.gdf))
+            return ~mask if node.not_ else mask
+
+        return like
+
+    if isinstance(node, cql.In):
+        lhs = _compile_filter(node.lhs)
+        options = [_compile_filter(option) for option in node.sub_nodes]
+
+        def in_(p):
+            values = lhs(p)
+            mask = _as_mask(
+                values.isin([_coerce(values, o(p)) for o in options]),
+                len(p.gdf),
+            )
+            return ~mask if node.not_ else mask
+
+        return in_
+
+    if isinstance(node, cql.IsNull):
+        lhs = _compile_filter(node.lhs)
+
+        def null(p):
+            mask = _as_mask(pandas.isna(lhs(p)), len(p.gdf))
+            return ~mask if node.not_ else mask
+
+        return null
+
+    if isinstance(node, cql.TemporalPredicate):
+        return _compile_temporal(node)
+
+    if isinstance(node, cql.SpatialComparisonPredicate):
+        lhs, rhs = node.lhs, node.rhs
+        op = node.op
+        if isinstance(lhs, cql_values.SpatialValueType.__args__):
+            # The literal comes first, so swap the operands
+            lhs, rhs = rhs, lhs
+            op = SPATIAL_CONVERSES.get(op, op)
+        if not isinstance(lhs, cql.Attribute):
+            raise ProviderQueryError(f'Unsupported filter: {node}')
+
+        geometry = shapely.geometry.shape(rhs)
+        predicate = SPATIAL_PREDICATES[op]
+
+        def spatial(p):
+            positions = p._spatial_positions(geometry, predicate)
+            if op == cql.SpatialComparisonOp.EQUALS:
+                geoms = p._geometries(positions)
+                positions = positions[shapely.equals(geoms, geometry)]
+            mask = numpy.zeros(len(p.gdf), dtype=bool)
+            mask[positions] = True
+            return ~mask if op == cql.SpatialComparisonOp.DISJOINT else mask
+
+        return spatial
+
+    if isinstance(node, cql.SpatialDistancePredicate):
+        geometry = shapely.geometry.shape(node.rhs)
+
+        def distance(p):
+            positions = p._spatial_positions(
+                geometry, 'dwithin', distance=node.distance
+            )
+            mask = numpy.zeros(len(p.gdf), dtype=bool)
+            mask[positions] = True
+            return ~mask if isinstance(node, cql.DistanceBeyond) else mask
+
+        return distance
+
+    if isinstance(node, cql.BBox):
+        geometry = box(node.minx, node.miny, node.maxx, node.maxy)
+
+        def bbox(p):
+            mask = numpy.zeros(len(p.gdf), dtype=bool)
+            mask[p._spatial_positions(geometry, 'intersects')] = True
+            return mask
+
+        return bbox
+
+    if isinstance(node, cql.Arithmetic):
+        lhs, rhs = _compile_filter(node.lhs), _compile_filter(node.rhs)
+        compute = ARITHMETIC[node.op]
+        return lambda p: compute(lhs(p), rhs(p))
+
+    if isinstance(node, cql.Function) and node.name == 'lower':
+        (argument,) = [_compile_filter(a) for a in node.arguments]
+
+        def lower(p):
+            value = argument(p)
+            if isinstance(value, pandas.Series):
+                return value.astype('string').str.lower()
+            return str(value).lower()
+
+        return lower
+
+    if isinstance(node, (cql.Node, cql_values.Interval, list)):
+        raise ProviderQueryError(f'Unsupported filter: {node}')
+
+    # Anything else is a literal
+    return lambda p: node
+
+
+def _compile_temporal(
+    node: cql.TemporalPredicate,
+) -> Callable[['GeoPandasProvider'], numpy.ndarray]:
+    """
+    Compile a temporal predicate of instants to a row mask function
+
+    The rows hold instants. An instant literal is the interval from and to
+    itself, and open interval bounds are unbounded.
+
+    :param node: pygeofilter temporal predicate
+
+    :returns: function of a provider returning the mask of matching rows
+    """
+    if not isinstance(node.lhs, cql.Attribute):
+        raise ProviderQueryError(f'Unsupported filter: {node}')
+
+    lhs = _compile_filter(node.lhs)
+    if isinstance(node.rhs, cql_values.Interval):
+        start, end = node.rhs.start, node.rhs.end
+    else:
+        start = end = node.rhs
+    if isinstance(start, datetime.timedelta) or isinstance(
+        end, datetime.timedelta
+    ):
+        raise ProviderQueryError(f'Unsupported filter: {node}')
+
+    op = cql.TemporalComparisonOp
+
+    def temporal(p):
+        values = lhs(p)
+        size = len(p.gdf)
+        low = _coerce(values, start) if start is not None else None
+        high = _coerce(values, end) if end is not None else None
+
+        def after(bound, strict=True):
+            if bound is None:
+                return numpy.ones(size, dtype=bool)
+            return _as_mask(
+                values > bound if strict else values >= bound, size
+            )
+
+        def before(bound, strict=True):
+            if bound is None:
+                return numpy.ones(size, dtype=bool)
+            return _as_mask(
+                values < bound if strict else values <= bound, size
+            )
+
+        if node.op == op.AFTER:
+            # Nothing is after an interval without end
+            return after(high) if high is not None else ~after(None)
+        if node.op == op.BEFORE:
+            return before(low) if low is not None else ~before(None)
+        if node.op == op.DURING:
+            return after(low) & before(high)
+        if node.op == op.BEFORE_OR_DURING:
+            return before(high, strict=False)
+        if node.op == op.DURING_OR_AFTER:
+            return after(low, strict=False)
+        if node.op == op.DISJOINT:
+            return ~(after(low, strict=False) & before(high, strict=False))
+        if node.op == op.TEQUALS:
+            return _as_mask(values == low, size) & _as_mask(
+                values == high, size
+            )
+        if node.op in (op.MEETS, op.BEGINS):
+            return _as_mask(values == low, size)
+        if node.op in (op.METBY, op.ENDS):
+            return _as_mask(values == high, size)
+
+        # An instant cannot contain or overlap an interval
+        return numpy.zeros(size, dtype=bool)
+
+    return temporal
+
+
+def _compiled_filter(filterq: any) -> Callable[['GeoPandasProvider'], any]:
+    """
+    Compile a CQL2 filter, or reuse its compiled function
+
+    :param filterq: pygeofilter AST, or CQL2 text
+
+    :returns: function of a provider returning the mask of matching rows
+    """
+    key = filterq if isinstance(filterq, str) else cql.get_repr(filterq)
+    with _FILTERS_LOCK:
+        compiled = _FILTERS.get(key)
+        if compiled is not None:
+            _FILTERS.move_to_end(key)
+            return compiled
+
+    if isinstance(filterq, str):
+        try:
+            filterq = parse_cql2_text(filterq)
+        except Exception as ex:
+            raise ProviderQueryError(f'Bad CQL text: {ex}')
+
+    compiled = _compile_filter(filterq)
+    with _FILTERS_LOCK:
+        _FILTERS[key] = compiled
+        while len(_FILTERS) > FILTER_CACHE_SIZE:
+            _FILTERS.popitem(last=False)
+
+    return compiled
+
+
 class GeoPandasProvider(BaseProvider):
     """GeoPandas provider"""
 
-    gdf: geopandas.GeoDataFrame
+    @property
+    def gdf(self) -> geopandas.GeoDataFrame:
+        """The GeoDataFrame backing this provider"""
+        if self._dataset['delta_size']:
+            self._compact()
+
+        return self._dataset['gdf']
+
+    @gdf.setter
+    def gdf(self, gdf: geopandas.GeoDataFrame):
+        """Replace the GeoDataFrame with one private to this provider"""
+        self._key = None
+        self._dataset = _new_dataset(gdf)
+
+    @property
+    def _dataset(self) -> SharedDataset:
+        """The version of the dataset this provider reads, loaded on use"""
+        if self._version is None:
+            self._load()
+
+        return self._version
+
+    @_dataset.setter
+    def _dataset(self, dataset: SharedDataset):
+        self._version = dataset
+
+    @property
+    def _ids(self) -> dict[str, int]:
+        """Map of identifier to its row position in self.gdf"""
+        return self._build_ids()
+
+    def _build_ids(self) -> dict[str, int]:
+        """
+        Build the id index of the dataset version, unless it already has one
+
+        :returns: map of identifier to its row position in self.gdf
+        """
+        gdf = self.gdf
+        if self._dataset['ids'] is None:
+            ids = gdf[self.id_field].astype(str).tolist()
+            # Iterate backwards so the first row of a duplicated id wins
+            self._dataset['ids'] = dict(
+                zip(reversed(ids), range(len(ids) - 1, -1, -1))
+            )
+
+        return self._dataset['ids']
+
+    @property
+    def _times(self) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """Row positions of self.gdf in time order and their sorted times"""
+        return self._build_times()
+
+    def _build_times(self) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Build the time index of the dataset version, unless it already has
+        one
+
+        :returns: row positions of self.gdf in time order and their sorted
+                  times
+        """
+        gdf = self.gdf
+        if self._dataset['times'] is None:
+            times = gdf[self.time_field]
+            if times.dt.tz is not None:
+                times = times.dt.tz_convert(None)
+
+            # Python datetimes have microsecond precision, so comparing at
+            # that precision is exact and keeps year 1 and 9999 in range
+            values = times.to_numpy(dtype='datetime64[us]')
+            positions = numpy.flatnonzero(~numpy.isnat(values))
+            order = positions[numpy.argsort(values[positions], kind='stable')]
+            self._dataset['times'] = (order, values[order])
+
+        return self._dataset['times']
+
+    @property
+    def _terms(self) -> tuple[dict[str, int], numpy.ndarray, numpy.ndarray]:
+        """Inverted index of the words of the q fields of self.gdf"""
+        return self._build_terms()
+
+    def _build_terms(
+        self,
+    ) -> tuple[dict[str, int], numpy.ndarray, numpy.ndarray]:
+        """
+        Build the text index of the dataset version, unless it already has
+        one
+
+        :returns: inverted index of the words of the q fields of self.gdf
+        """
+        gdf = self.gdf
+        if self._dataset['terms'] is None:
+            self._dataset['terms'] = self._index_words(
+                ({}, numpy.zeros(1, dtype=int), numpy.array([], dtype=int)),
+                gdf,
+                dropped=numpy.array([], dtype=bool),
+                added=numpy.arange(len(gdf)),
+            )
+
+        return self._dataset['terms']
+
+    def _build_sindex(self) -> geopandas.sindex.SpatialIndex:
+        """
+        Build the spatial index of the geometries of self.gdf, unless they
+        already have one
+
+        :returns: the spatial index
+        """
+        return self.gdf[self.geometry_col].sindex
+
+    def _build_envelopes(
+        self,
+    ) -> tuple[numpy.ndarray, numpy.ndarray, float, numpy.ndarray]:
+        """
+        Build the index of the envelope columns of self.gdf, unless the
+        dataset version already has one
+
+        Rows are sorted by their min x, so a bbox only checks the rows
+        whose min x lies within an envelope width of it. The widest
+        envelopes, which would widen that for every row, are checked
+        apart. The index takes 16 bytes a row, far less than an R-tree of
+        the envelopes as shapely geometries.
+
+        :returns: row positions sorted by min x and their min x, the
+                  widest envelope among them, and the positions of the
+                  wider envelopes
+        """
+        gdf = self.gdf
+        if self._dataset['envelopes'] is None:
+            xmin, _, xmax, _ = (
+                gdf[col].to_numpy() for col in ENVELOPE_COLUMNS
+            )
+            width = xmax - xmin
+            # Empty geometries have no envelope
+            positions = numpy.flatnonzero(~numpy.isnan(width))
+            limit = (
+                float(numpy.quantile(width[positions], WIDE_ENVELOPES))
+                if len(positions)
+                else 0.0
+            )
+            wide = width[positions] > limit
+            narrow = positions[~wide]
+            order = narrow[numpy.argsort(xmin[narrow], kind='stable')]
+            self._dataset['envelopes'] = (
+                order,
+                xmin[order],
+                limit,
+                positions[wide],
+            )
+
+        return self._dataset['envelopes']
+
+    def _q_fields(self, gdf: geopandas.GeoDataFrame) -> list[str]:
+        """
+        Columns of a frame q searches
+
+        :param gdf: frame of the dataset
+
+        :returns: the configured q fields, or else its string columns
+        """
+        if self.q_fields:
+            return self.q_fields
+
+        return [
+            col
+            for col in gdf.columns
+            if pandas.api.types.is_string_dtype(gdf[col].dtype)
+            and col not in self._exclude_from_fields
+        ]
+
+    def _index_words(
+        self,
+        terms: tuple[dict[str, int], numpy.ndarray, numpy.ndarray],
+        gdf: geopandas.GeoDataFrame,
+        dropped: numpy.ndarray,
+        added: numpy.ndarray,
+        moved: Optional[numpy.ndarray] = None,
+    ) -> tuple[dict[str, int], numpy.ndarray, numpy.ndarray]:
+        """
+        Build the inverted index of a version from that of the version before
+
+        :param terms: inverted index of the version before
+        :param gdf: frame of the new version
+        :param dropped: mask of the rows before whose words are dropped
+        :param added: positions in gdf of the rows whose words are added
+        :param moved: position in gdf of each row before, if rows were
+                      deleted
+
+        :returns: inverted index of the new version
+        """
+        vocabulary, offsets, positions = terms
+        ids = numpy.repeat(numpy.arange(len(offsets) - 1), numpy.diff(offsets))
+
+        kept = ~dropped[positions]
+        ids, positions = ids[kept], positions[kept]
+        if moved is not None:
+            positions = moved[positions]
+
+        # Words of each added row, case folded and counted once per row
+        columns = [
+            pandas.Series(gdf[col].iloc[added].to_numpy(), index=added)
+            .dropna()
+            .astype(str)
+            .str.casefold()
+            .str.findall(WORD)
+            .explode()
+            .dropna()
+            for col in self._q_fields(gdf)
+        ]
+        words = pandas.concat(columns) if columns else pandas.Series()
+        pairs = pandas.DataFrame(
+            {'position': words.index.to_numpy(dtype=int), 'word': words}
+        ).drop_duplicates()
+
+        codes, uniques = pandas.factorize(pairs['word'].to_numpy())
+        if any(word not in vocabulary for word in uniques):
+            # Copy, earlier versions may still be read
+            vocabulary = dict(vocabulary)
+        word_ids = numpy.array(
+            [vocabulary.setdefault(word, len(vocabulary)) for word in uniques],
+            dtype=int,
+        )
+
+        ids = numpy.concatenate([ids, word_ids[codes]])
+        positions = numpy.concatenate([positions, pairs['position']])
+        order = numpy.lexsort((positions, ids))
+        offsets = numpy.searchsorted(
+            ids[order], numpy.arange(len(vocabulary) + 1)
+        )
+
+        return vocabulary, offsets, positions[order]
+
+    def _q_positions(self, q: str) -> numpy.ndarray:
+        """
+        Find the rows of self.gdf holding every word of a search
+
+        :param q: full-text search term(s)
+
+        :returns: sorted positions of the rows in self.gdf
+        """
+        words = set(re.findall(WORD, q.casefold()))
+        if not words:
+            return numpy.arange(len(self.gdf))
+
+        vocabulary, offsets, positions = self._terms
+        found = []
+        for word in words:
+            word_id = vocabulary.get(word)
+            if word_id is None:
+                return numpy.array([], dtype=int)
+            found.append(positions[offsets[word_id] : offsets[word_id + 1]])
+
+        # Intersect the rarest words first to keep the intermediates small
+        found.sort(key=len)
+        return functools.reduce(
+            lambda a, b: numpy.intersect1d(a, b, assume_unique=True), found
+        )
+
+    def _compact(self):
+        """
+        Merge the rows created since the frame was built into a new frame
+
+        The new version replaces the shared one, unless another provider
+        published a newer version meanwhile
+        """
+        dataset = self._dataset
+        self._publish(dataset, self._compacted(dataset))
+
+    def _publish(self, previous: SharedDataset, dataset: SharedDataset):
+        """
+        Replace a shared version of the dataset by an equivalent one
+
+        :param previous: version the new one was built from
+        :param dataset: new version, also read by this provider from now on
+        """
+        with _DATASETS_LOCK:
+            if self._key and _DATASETS.get(self._key) is previous:
+                _DATASETS[self._key] = dataset
+
+        self._dataset = dataset
+
+    def _compacted(self, dataset: SharedDataset) -> SharedDataset:
+        """
+        Build the version of a dataset with its created rows merged in
+
+        :param dataset: dataset version with created rows
+
+        :returns: the dataset version without created rows
+        """
+        gdf = dataset['gdf']
+        rows = self._rows_like(gdf, dataset['delta'][: dataset['delta_size']])
+        merged = pandas.concat([gdf, rows], ignore_index=True)
+
+        ids = dataset['ids']
+        if ids is not None:
+            # Extend a copy, earlier versions may still be read
+            ids = dict(ids)
+            created = merged[self.id_field].iloc[len(gdf) :].astype(str)
+            for position, identifier in enumerate(created.tolist(), len(gdf)):
+                ids.setdefault(identifier, position)
+
+        geojson = dataset['geojson']
+        if geojson is not None:
+            # Created rows are serialized the first time they are returned
+            geojson = numpy.concatenate(
+                [geojson, numpy.full(len(merged) - len(gdf), None, object)]
+            )
+
+        terms = dataset['terms']
+        if terms is not None:
+            terms = self._index_words(
+                terms,
+                merged,
+                dropped=numpy.zeros(len(gdf), dtype=bool),
+                added=numpy.arange(len(gdf), len(merged)),
+            )
+
+        return _new_dataset(
+            merged, ids=ids, wal=dataset['wal'], geojson=geojson, terms=terms
+        )
+
+    @staticmethod
+    def _rows_like(
+        gdf: geopandas.GeoDataFrame, items: list[dict[str, any]]
+    ) -> geopandas.GeoDataFrame:
+        """
+        Build a frame of items to concatenate with a frame
+
+        :param gdf: frame the items are added to
+        :param items: list of `dict` of items
+
+        :returns: frame of the same type and CRS as gdf
+        """
+        if isinstance(gdf, geopandas.GeoDataFrame):
+            return geopandas.GeoDataFrame(items, crs=gdf.crs)
+
+        # Point CSV sources are read as plain DataFrames
+        return pandas.DataFrame(items)
+
+    def _write(
+        self,
+        change: Callable[[SharedDataset], tuple[SharedDataset, any]],
+        entry: Optional[dict] = None,
+    ) -> any:
+        """
+        Apply a change to the latest version of the dataset and publish it
+
+        With a write-ahead log, the writes other processes logged are
+        replayed first and the change is logged before it is published.
+
+        :param change: function of a dataset version returning the changed
+                       version and the result of the change
+        :param entry: log entry replaying the change
+
+        :returns: the result of the change
+        """
+        if self._version is None:
+            self._load()
+
+        with self._write_lock(), self._wal_lock():
+            with _DATASETS_LOCK:
+                latest = _DATASETS.get(self._key) if self._key else None
+            if latest is None:
+                # The dataset is private, or its source changed since
+                latest = self._dataset
+
+            dataset = self._replay(latest) if self.wal else latest
+            dataset, result = change(dataset)
+
+            logged = self.wal and entry is not None
+            if logged:
+                dataset = self._log(dataset, entry)
+
+            while self._key:
+                with _DATASETS_LOCK:
+                    current = _DATASETS.get(self._key)
+                    if current is None or current is latest:
+                        if current is not None:
+                            _DATASETS[self._key] = dataset
+                        break
+
+                # Another provider published a version meanwhile, e.g. by
+                # compacting it, so build on top of that one instead
+                latest = current
+                if self.wal:
+                    # The log already holds the change
+                    dataset = self._replay(current)
+                else:
+                    dataset, result = change(current)
+
+        self._dataset = dataset
+        if logged and dataset['wal'][1] >= self.wal_compact_size:
+            # Writing the checkpoint takes a while, and needs no lock
+            # until the log is restarted
+            self._publish(dataset, self._checkpoint(dataset))
+
+        return result
+
+    def _write_lock(self) -> contextlib.AbstractContextManager:
+        """
+        Lock of the writers of the shared dataset
+
+        :returns: the lock of the dataset key, a no-op for private datasets
+        """
+        if not self._key:
+            return contextlib.nullcontext()
+
+        with _DATASETS_LOCK:
+            return _WRITE_LOCKS.setdefault(self._key, threading.Lock())
+
+    @contextlib.contextmanager
+    def _wal_lock(self):
+        """
+        Hold the lock of the write-ahead log, shared by all processes
+        """
+        if not self.wal:
+            yield
+            return
+
+        with _file_lock(f'{self.wal}.lock'):
+            yield
+
+    @property
+    def _wal_source(self) -> Optional[list]:
+        """The version of the source, as the write-ahead log records it"""
+        return json.loads(json.dumps(self._source_key[2]))
+
+    def _wal_header(self) -> dict:
+        """
+        Read the header of the write-ahead log
+
+        :returns: the generation of the log and the version of the source
+                  it applies to, empty if nothing was logged yet
+        """
+        try:
+            with open(self.wal, 'rb') as wal:
+                return json.loads(wal.readline() or '{}')
+        except FileNotFoundError:
+            return {}
+
+    def _read_checkpoint(self, generation: int) -> geopandas.GeoDataFrame:
+        """
+        Read the frame the writes up to a generation were checkpointed to
+
+        :param generation: generation of the write-ahead log
+
+        :returns: GeoDataFrame of the checkpoint
+        """
+        path = f'{self.wal}.{generation}.parquet'
+        try:
+            return geopandas.read_parquet(path)
+        except ValueError:
+            # Point CSV sources are checkpointed without geo metadata
+            return pandas.read_parquet(path)
+
+    def _replay(self, dataset: SharedDataset) -> SharedDataset:
+        """
+        Apply the writes logged after a dataset version
+
+        Only the log past the offset the version includes is read, unless
+        the log was checkpointed since, then the version is replaced by
+        the checkpoint.
+
+        :param dataset: dataset version
+
+        :returns: the version including every logged write
+        """
+        generation, offset = dataset['wal'] or (0, None)
+
+        try:
+            wal = open(self.wal, 'rb')
+        except FileNotFoundError:
+            return dataset
+
+        with wal:
+            header = wal.readline()
+            current = json.loads(header or '{}').get('generation', 0)
+            if current != generation:
+                dataset = _new_dataset(
+                    self._prepare(self._read_checkpoint(current))
+                )
+                generation, offset = current, None
+
+            wal.seek(offset or len(header))
+            for line in wal:
+                if not line.endswith(b'\n'):
+                    # A write still being logged
+                    break
+
+                try:
+                    entry = json.loads(line, object_hook=_wal_object_hook)
+                    if entry['op'] == 'create':
+                        dataset, _ = self._append(dataset, entry['items'])
+                    elif entry['op'] == 'update':
+                        items = dict(entry['items'])
+                        dataset, _ = self._replace(dataset, items)
+                    elif entry['op'] == 'delete':
+                        identifiers = entry['identifiers']
+                        dataset, _ = self._remove(dataset, identifiers)
+                except Exception as ex:
+                    # Skipping the entry would leave this process serving
+                    # other data than the processes which applied it
+                    raise ProviderInvalidDataError(
+                        f'Failed to replay {self.wal}: {ex}'
+                    )
+                offset = wal.tell()
+
+        if dataset['wal'] == (generation, offset):
+            return dataset
+
+        return {**dataset, 'wal': (generation, offset)}
+
+    def _log(self, dataset: SharedDataset, entry: dict) -> SharedDataset:
+        """
+        Append the entry of a write to the write-ahead log
+
+        :param dataset: dataset version including the write
+        :param entry: log entry replaying the write
+
+        :returns: the version including the log up to the entry
+        """
+        generation, _ = dataset['wal']
+        line = json.dumps(entry, default=_wal_default).encode() + b'\n'
+
+        with open(self.wal, 'ab') as wal:
+            if wal.tell() == 0:
+                header = {'generation': generation, 'source': self._wal_source}
+                wal.write(json.dumps(header).encode() + b'\n')
+            wal.write(line)
+            wal.flush()
+            os.fsync(wal.fileno())
+            offset = wal.tell()
+
+        return {**dataset, 'wal': (generation, offset)}
+
+    def _checkpoint(self, dataset: SharedDataset) -> SharedDataset:
+        """
+        Write a dataset version to a GeoParquet sidecar and restart the log
+
+        The sidecar is written without holding the lock of the log. The
+        writes other processes logged meanwhile are carried over to the
+        restarted log.
+
+        :param dataset: dataset version including the log up to its offset
+
+        :returns: the version as the start of the next generation
+        """
+        if dataset['delta_size']:
+            dataset = self._compacted(dataset)
+
+        generation, offset = dataset['wal']
+        checkpoint = self._write_checkpoint(dataset['gdf'])
+        if checkpoint is None:
+            return dataset
+
+        with self._wal_lock():
+            header = self._wal_header()
+            if header.get('generation', 0) != generation:
+                # Another provider checkpointed the log first
+                os.remove(checkpoint)
+                return dataset
+
+            with open(self.wal, 'rb') as wal:
+                wal.seek(offset)
+                logged = wal.read()
+
+            source = header.get('source', self._wal_source)
+            self._start_generation(checkpoint, generation + 1, source, logged)
+
+        return {**dataset, 'wal': (generation + 1, None)}
+
+    def _write_checkpoint(self, gdf: geopandas.GeoDataFrame) -> Optional[str]:
+        """
+        Write a frame to a temporary GeoParquet file next to the log
+
+        :param gdf: frame to write
+
+        :returns: path of the file, None if it could not be written
+        """
+        path = f'{self.wal}.{os.getpid()}.{threading.get_ident()}.parquet.tmp'
+        try:
+            gdf.to_parquet(path, index=False)
+        except Exception as ex:
+            LOGGER.error(f'Failed to checkpoint {self.wal}: {ex}')
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            return None
+
+        return path
+
+    def _start_generation(
+        self, checkpoint: str, generation: int, source: any, logged: bytes
+    ):
+        """
+        Make a checkpoint the start of a generation of the log
+
+        Must be called holding the lock of the log.
+
+        :param checkpoint: path of the checkpoint written for it
+        :param generation: generation of the log
+        :param source: version of the source the log applies to
+        :param logged: entries logged after the checkpoint
+        """
+        os.replace(checkpoint, f'{self.wal}.{generation}.parquet')
+
+        header = {'generation': generation, 'source': source}
+        with open(f'{self.wal}.tmp', 'wb') as wal:
+            wal.write(json.dumps(header).encode() + b'\n')
+            wal.write(logged)
+            wal.flush()
+            os.fsync(wal.fileno())
+        os.replace(f'{self.wal}.tmp', self.wal)
+
+        # Keep the previous checkpoint for providers still reading it
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(f'{self.wal}.{generation - 2}.parquet')
+
+    def _restart_wal(self):
+        """
+        Start the write-ahead log over from the source, after it changed
+
+        A log which was never checkpointed holds every write since the
+        source was first read, so they are replayed onto the source as read
+        now, which becomes the checkpoint of the next generation. Logs
+        checkpointed before hold only part of the writes, and the provider
+        refuses to start rather than dropping the others.
+        """
+        with self._write_lock(), self._wal_lock():
+            header = self._wal_header()
+            if header.get('source') == self._wal_source:
+                # Another provider restarted the log first
+                return
+            if header.get('generation'):
+                raise self._wal_source_error()
+
+            LOGGER.warning(
+                f'{self.data} changed, replaying the writes logged to '
+                f'{self.wal} onto it'
+            )
+            previous = self._dataset
+            dataset = self._replay(previous)
+            if dataset['delta_size']:
+                dataset = self._compacted(dataset)
+
+            # Written holding the lock, so no write is logged in between
+            checkpoint = self._write_checkpoint(dataset['gdf'])
+            if checkpoint is None:
+                raise ProviderInvalidDataError(f'Failed to restart {self.wal}')
+
+            self._start_generation(checkpoint, 1, self._wal_source, b'')
+            self._publish(previous, {**dataset, 'wal': (1, None)})
+
+    def _wal_source_error(self) -> ProviderInvalidDataError:
+        """
+        Error of a source changed after its log was checkpointed
+
+        :returns: the error to raise
+        """
+        return ProviderInvalidDataError(
+            f'{self.data} changed after the writes logged to {self.wal} were '
+            'checkpointed. Restore it, or remove the log and its '
+            'checkpoints to serve it without those writes'
+        )
+
+    def _wal_behind(self, dataset: SharedDataset) -> bool:
+        """
+        Whether writes were logged after a dataset version
+
+        Only the header and size of the log are read, without its lock.
+
+        :param dataset: dataset version
+
+        :returns: `bool` of whether the version misses logged writes
+        """
+        generation, offset = dataset['wal'] or (0, None)
+        try:
+            with open(self.wal, 'rb') as wal:
+                header = wal.readline()
+                size = os.fstat(wal.fileno()).st_size
+        except FileNotFoundError:
+            return False
+
+        current = json.loads(header or '{}').get('generation', 0)
+        return current != generation or size != (offset or len(header))
+
+    def _set_time_field(self, provider_def: dict):
+        """
+        Set time field and check if there is a specific "LOADDATE" column or not
+        """
+        if 'time_field' in provider_def:
+            self.time_field = provider_def['time_field']
+        # else look for a column named LOADDATE
+        elif 'LOADDATE' in self.gdf.columns:
+            self.time_field = 'LOADDATE'
+        else:
+            for col in self.gdf.columns:
+                if isinstance(
+                    self.gdf[col].iloc[0], (datetime.date, datetime.datetime)
+                ):
+                    self.time_field = col
+                    break
+            else:
+                LOGGER.warning('No time field found')
+                return
+
+    def _filter_by_date(
+        self, df: geopandas.GeoDataFrame, datetime_: str
+    ) -> geopandas.GeoDataFrame:
+        """
+        Filter by date
+        """
+        return self._take(df, self._date_positions(datetime_))
+
+    def _date_positions(self, datetime_: str) -> numpy.ndarray:
+        """
+        Find the rows of self.gdf matching a date or date range
+
+        Dates are resolved against the time index of self.gdf with a binary
+        search, so only the matching rows are ever touched
+
+        :param datetime_: temporal (datestamp or extent)
+
+        :returns: sorted positions of the matching rows in self.gdf
+        """
+        dateRange = datetime_.split('/')
+
+        if _START_AND_END := len(dateRange) == 2:  # noqa F841
+            start, end = dateRange
+
+            # Each bound covers the interval of its precision, so 2019/2020
+            # runs from the start of 2019 to the end of 2020
+            if start in ('', '..'):
+                start = datetime.datetime.min
+            else:
+                start, _ = self._date_interval(start)
+
+            if end in ('', '..'):
+                end = datetime.datetime.max
+            else:
+                _, end = self._date_interval(end)
+
+            if _to_index_time(start) >= _to_index_time(end):
+                raise ProviderInvalidQueryError(
+                    'Start date must be before end date but got {}'.format(
+                        datetime_
+                    )
+                )
+
+            return self._time_positions(start, end)
+
+        elif _ONLY_MATCH_ONE_DATE := len(dateRange) == 1:  # noqa
+            # We want 2019-10 to match 2019-10-01, 2019-10-02, etc.
+            start, end = self._date_interval(datetime_)
+            return self._time_positions(start, end)
+        else:
+            raise ProviderInvalidQueryError(
+                "datetime_ must be a date or date range with two dates separated by '/' but got {}".format(
+                    datetime_
+                )
+            )
+
+    def _date_interval(
+        self, datetime_: str
+    ) -> tuple[pandas.Timestamp, pandas.Timestamp]:
+        """
+        Expand a date of any precision into the interval it covers
+
+        '2019' covers all of 2019, '2019-10' all of October 2019 and
+        '2019-10-10T20:08:56.6' covers a tenth of a second. Dates without a
+        UTC offset are in the time zone of the time field.
+
+        :param datetime_: ISO 8601 date or datetime, possibly partial
+
+        :returns: tuple of the start (inclusive) and end (exclusive)
+        """
+        match = PARTIAL_ISO_DATETIME.match(datetime_)
+        if match is None:
+            raise ProviderInvalidQueryError(
+                'datetime_ must be an ISO 8601 date or datetime but got '
+                f'{datetime_}'
+            )
+
+        parts = match.groupdict()
+        fraction = parts['fraction'] or ''
+        try:
+            start = pandas.Timestamp(
+                year=int(parts['year']),
+                month=int(parts['month'] or 1),
+                day=int(parts['day'] or 1),
+                hour=int(parts['hour'] or 0),
+                minute=int(parts['minute'] or 0),
+                second=int(parts['second'] or 0),
+                microsecond=int(fraction[1:7].ljust(6, '0')),
+            )
+        except ValueError as ex:
+            # Well formed, but out of range, like 2019-02-30
+            raise ProviderInvalidQueryError(
+                'datetime_ must be a valid date or datetime but got '
+                f'{datetime_}: {ex}'
+            )
+
+        if fraction:
+            step = pandas.Timedelta(seconds=10 ** -(len(fraction) - 1))
+        elif parts['second']:
+            step = pandas.Timedelta(seconds=1)
+        elif parts['minute']:
+            step = pandas.Timedelta(minutes=1)
+        elif parts['hour']:
+            step = pandas.Timedelta(hours=1)
+        elif parts['day']:
+            step = pandas.DateOffset(days=1)
+        elif parts['month']:
+            step = pandas.DateOffset(months=1)
+        else:
+            step = pandas.DateOffset(years=1)
+
+        try:
+            end = start + step
+        except (OverflowError, ValueError):
+            # The interval runs to the end of year 9999
+            end = pandas.Timestamp(datetime.datetime.max)
+
+        if parts['tz']:
+            tz = 'UTC' if parts['tz'] == 'Z' else parts['tz']
+            start, end = start.tz_localize(tz), end.tz_localize(tz)
+        elif self.gdf[self.time_field].dt.tz is not None:
+            tz = self.gdf[self.time_field].dt.tz
+            start, end = start.tz_localize(tz), end.tz_localize(tz)
+
+        return start, end
+
+    def _time_positions(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        closed: bool = False,
+    ) -> numpy.ndarray:
+        """
+        Find the rows of self.gdf with a time between start and end
+
+        :param start: inclusive start of the interval
+        :param end: end of the interval
+        :param closed: bool of whether the end is inclusive (default False)
+
+        :returns: sorted positions of the matching rows in self.gdf
+        """
+        order, times = self._times
+
+        lo = numpy.searchsorted(times, _to_index_time(start), side='left')
+        hi = numpy.searchsorted(
+            times, _to_index_time(end), side='right' if closed else 'left'
+        )
+
+        return numpy.sort(order[lo:hi])
+
+    def _plan_filters(
+        self,
+        identifier: Optional[str] = None,
+        bbox: list[float] = [],
+        datetime_: Optional[str] = None,
+        properties: list[tuple[str, str]] = [],
+        q: Optional[str] = None,
+        filterq: any = None,
+    ) -> list[QueryFilter]:
+        """
+        Build the filters of a query, most selective first
+
+        Identifier, bbox, datetime, q and CQL2 filters are resolved through
+        their index or a compiled mask up front, which gives their exact
+        number of rows for free.
+        Property filters are estimated from a sample of self.gdf. Applying
+        the most selective filter first leaves every later filter with the
+        fewest rows to check.
+
+        :param identifier: feature id
+        :param bbox: bounding box [minx,miny,maxx,maxy]
+        :param datetime_: temporal (datestamp or extent)
+        :param properties: list of tuples (name, value)
+        :param q: full-text search term(s)
+        :param filterq: CQL2 filter, as pygeofilter AST or CQL2 text
+
+        :returns: list of filters ordered by estimated number of rows
+        """
+        positions: list[numpy.ndarray] = []
+
+        if identifier is not None:
+            position = self._ids.get(str(identifier))
+            positions.append(
+                numpy.array([] if position is None else [position], int)
+            )
+
+        if _BBOX_DEFINED := len(bbox) == 4:  # noqa
+            positions.append(self._bbox_positions(bbox))
+        elif _INVALID_BBOX := (len(bbox) != 4 and len(bbox) != 0):  # noqa
+            raise ProviderQueryError(
+                'bbox must be a list of 4 values got {}'.format(len(bbox))
+            )
+
+        if datetime_ is not None:
+            positions.append(self._date_positions(datetime_))
+
+        if q is not None:
+            positions.append(self._q_positions(q))
+
+        if filterq is not None:
+            positions.append(self._filter_positions(filterq))
+
+        filters: list[QueryFilter] = [
+            {
+                'estimate': len(found),
+                'apply': functools.partial(self._take, positions=found),
+            }
+            for found in positions
+        ]
+
+        # With a single filter there is nothing to order
+        planned = len(filters) + len(properties) > 1
+
+        for column_name, value in properties:
+            filters.append(
+                {
+                    'estimate': self._estimate_property(column_name, value)
+                    if planned
+                    else len(self.gdf),
+                    'apply': functools.partial(
+                        self._filter_by_property,
+                        column_name=column_name,
+                        value=value,
+                    ),
+                }
+            )
+
+        return sorted(
+            filters, key=lambda query_filter: query_filter['estimate']
+        )
+
+    def _estimate_property(self, column_name: str, value: str) -> int:
+        """
+        Estimate the number of rows of self.gdf a property filter keeps
+
+        :param column_name: name of the column to filter on
+        :param value: string value the column must be equal to
+
+        :returns: estimated number of matching rows
+        """
+        step = max(1, len(self.gdf) // PLANNER_SAMPLE_SIZE)
+        sample = self.gdf[column_name].iloc[::step]
+        if len(sample) == 0:
+            return 0
+
+        matched = int(self._property_mask(sample, value).sum())
+        return round(matched * len(self.gdf) / len(sample))
+
+    def _filter_by_property(
+        self, df: geopandas.GeoDataFrame, column_name: str, value: str
+    ) -> geopandas.GeoDataFrame:
+        """
+        Filter by a property value
+
+        :param df: dataframe to filter
+        :param column_name: name of the column to filter on
+        :param value: string value the column must be equal to
+
+        :returns: rows of df where the column equals the value
+        """
+        return df[self._property_mask(df[column_name], value)]
+
+    def _property_mask(
+        self, column: pandas.Series, value: str
+    ) -> pandas.Series | numpy.ndarray:
+        """
+        Compare a column to a property value
+
+        Property values always arrive as strings. Rather than casting the
+        whole column to strings, the value is cast once to the column dtype.
+        A value only matches if it is exactly how the column value would be
+        written as a string, so '35.0' does not match the integer 35.
+
+        :param column: column to compare
+        :param value: string value the column must be equal to
+
+        :returns: boolean mask of the rows equal to the value
+        """
+        kind = column.dtype.kind
+
+        try:
+            if kind in 'iu':
+                typed = int(value)
+            elif kind == 'f' and column.dtype == 'float64':
+                typed = float(value)
+            elif kind == 'b':
+                typed = {'True': True, 'False': False}[value]
+            elif isinstance(column.dtype, pandas.StringDtype):
+                return column == value
+            else:
+                return column.astype(str) == value
+        except (KeyError, ValueError):
+            return numpy.zeros(len(column), dtype=bool)
+
+        if str(typed) != value:
+            return numpy.zeros(len(column), dtype=bool)
+
+        mask = column == typed
+        if typed == 0 and kind == 'f':
+            # 0.0 and -0.0 are equal but are written differently
+            mask &= numpy.signbit(column) == numpy.signbit(typed)
+
+        return mask
+
+    def _bbox_positions(self, bbox: list[float]) -> numpy.ndarray:
+        """
+        Find the rows of self.gdf whose geometry intersects a bbox
+
+        :param bbox: bounding box [minx,miny,maxx,maxy]
+
+        :returns: sorted positions of the intersecting rows in self.gdf
+        """
+        return self._spatial_positions(box(*bbox), 'intersects')
+
+    def _spatial_positions(
+        self,
+        geometry: shapely.Geometry,
+        predicate: str,
+        distance: Optional[float] = None,
+    ) -> numpy.ndarray:
+        """
+        Find the rows of self.gdf whose geometry relates to a geometry
+
+        :param geometry: geometry to relate the rows to
+        :param predicate: shapely predicate of the geometry and a row, e.g.
+                          'within' finds the rows containing the geometry
+        :param distance: distance of the 'dwithin' predicate
+
+        :returns: sorted positions of the related rows in self.gdf
+        """
+        points = hasattr(self, 'geometry_x') and hasattr(self, 'geometry_y')
+        if not points and not hasattr(self, 'geometry_col'):
+            raise ProviderQueryError('No geometry column to filter on')
+        elif not points and not self._wkb:
+            # The spatial index yields candidates by envelope and then
+            # refines them with the exact predicate, so only nearby rows
+            # are tested
+            sindex = self._build_sindex()
+            return numpy.sort(
+                sindex.query(geometry, predicate=predicate, distance=distance)
+            )
+
+        minx, miny, maxx, maxy = shapely.bounds(geometry)
+        margin = distance or 0
+        if points:
+            # Points are their own envelopes
+            x, y = self._coordinates()
+            candidates = numpy.flatnonzero(
+                (x <= maxx + margin)
+                & (x >= minx - margin)
+                & (y <= maxy + margin)
+                & (y >= miny - margin)
+            )
+        else:
+            # Only rows with a min x close enough to the bbox can intersect
+            # it, compare their envelopes, then decode only the geometries
+            # they keep
+            order, xmins, limit, wide = self._build_envelopes()
+            lo = numpy.searchsorted(xmins, minx - margin - limit, 'left')
+            hi = numpy.searchsorted(xmins, maxx + margin, 'right')
+            rows = numpy.concatenate([order[lo:hi], wide])
+            xmin, ymin, xmax, ymax = (
+                self.gdf[col].to_numpy()[rows] for col in ENVELOPE_COLUMNS
+            )
+            candidates = numpy.sort(
+                rows[
+                    (xmin <= maxx + margin)
+                    & (xmax >= minx - margin)
+                    & (ymin <= maxy + margin)
+                    & (ymax >= miny - margin)
+                ]
+            )
+
+        if (
+            predicate == 'intersects'
+            and points
+            and geometry.equals(shapely.envelope(geometry))
+        ):
+            # Points within a bbox need no refining
+            return candidates
+
+        geoms = self._geometries(candidates)
+        if predicate == 'dwithin':
+            return candidates[shapely.dwithin(geometry, geoms, distance)]
+        return candidates[getattr(shapely, predicate)(geometry, geoms)]
+
+    def _coordinates(
+        self, df: Optional[pandas.DataFrame] = None
+    ) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Coordinates of the points of a frame with x and y columns
 
-    def _set_time_field(self, provider_def: dict):
+        Those of self.gdf are converted once per dataset version and kept.
+
+        :param df: self.gdf or a subset of it, self.gdf by default
+
+        :returns: float64 arrays of the x and y of each row, NaN if missing
         """
-        Set time field and check if there is a specific "LOADDATE" column or not
+        if df is None or df is self.gdf:
+            gdf = self.gdf
+            if self._dataset['coordinates'] is None:
+                self._dataset['coordinates'] = self._to_coordinates(gdf)
+            return self._dataset['coordinates']
+
+        return self._to_coordinates(df)
+
+    def _to_coordinates(
+        self, df: pandas.DataFrame
+    ) -> tuple[numpy.ndarray, numpy.ndarray]:
         """
-        if 'time_field' in provider_def:
-            self.time_field = provider_def['time_field']
-        # else look for a column named LOADDATE
-        elif 'LOADDATE' in self.gdf.columns:
-            self.time_field = 'LOADDATE'
+        Convert the x and y columns of a frame to float64 arrays
+
+        :param df: self.gdf or a subset of it
+
+        :returns: float64 arrays of the x and y of each row, NaN if missing
+        """
+        return tuple(
+            pandas.to_numeric(df[col], errors='coerce').to_numpy(
+                dtype='float64', na_value=numpy.nan
+            )
+            for col in (self.geometry_x, self.geometry_y)
+        )
+
+    def _geometries(self, positions: numpy.ndarray) -> numpy.ndarray:
+        """
+        Geometries of rows of self.gdf, decoded if they are kept as WKB
+
+        :param positions: positions of rows in self.gdf
+
+        :returns: array of shapely geometries
+        """
+        if not hasattr(self, 'geometry_col'):
+            x, y = self._coordinates()
+            return shapely.points(x[positions], y[positions])
+
+        geoms = self.gdf[self.geometry_col].iloc[positions].to_numpy()
+        return shapely.from_wkb(geoms) if self._wkb else geoms
+
+    def _filter_positions(self, filterq: any) -> numpy.ndarray:
+        """
+        Find the rows of self.gdf matching a CQL2 filter
+
+        :param filterq: pygeofilter AST, or CQL2 text
+
+        :returns: sorted positions of the matching rows in self.gdf
+        """
+        try:
+            mask = _compiled_filter(filterq)(self)
+        except (TypeError, ValueError) as ex:
+            raise ProviderQueryError(f'Failed to apply filter: {ex}')
+        if not isinstance(mask, numpy.ndarray) or mask.dtype != bool:
+            raise ProviderQueryError(f'Filter is not a predicate: {filterq}')
+
+        return numpy.flatnonzero(mask)
+
+    def _take(
+        self, df: geopandas.GeoDataFrame, positions: numpy.ndarray
+    ) -> geopandas.GeoDataFrame:
+        """
+        Restrict a filtered view of self.gdf to rows found through an index
+
+        :param df: self.gdf or a filtered subset of it
+        :param positions: sorted positions of rows in self.gdf
+
+        :returns: rows of df at the given positions, in df order
+        """
+        if df is self.gdf:
+            return df.iloc[positions]
+
+        return df[df.index.isin(self.gdf.index[positions])]
+
+    def _set_geometry_fields(self, provider_def: dict):
+        """
+        Set geometry fields and check both if there is a point-based csv or a shapely geometry column
+        """
+        # Check if it was specified in the config, try the CSV geo style and otherwise use the standard shapely geo format
+        if 'geometry' in provider_def:
+            if (
+                provider_def['geometry']['x_field']
+                and provider_def['geometry']['y_field']
+            ):
+                self.geometry_x = provider_def['geometry']['x_field']
+                self.geometry_y = provider_def['geometry']['y_field']
+                self._exclude_from_fields.append(self.geometry_x)
+                self._exclude_from_fields.append(self.geometry_y)
+
+            # Unclear if there can be other types of geometries manually specified in the config
+            # Otherwise we would just read it in as a shapely geometry\
+            # else:
+            #     self.geometry_col = provider_def["geometry"]
+            #     self._exclude_from_fields.append(self.geometry_col)
+
+        # If we don't have x,y coords as separate columns then look for a geometry column
+        elif 'geometry' in self.gdf.columns:
+            self.geometry_col = 'geometry'
+            self._exclude_from_fields.append(self.geometry_col)
+
+        # If we don't have any of the above, find the first geometry column and assume that is where the geometry is
         else:
             for col in self.gdf.columns:
-                if isinstance(
-                    self.gdf[col].iloc[0], (datetime.date, datetime.datetime)
-                ):
-                    self.time_field = col
+                if hasattr(col, 'geom_type'):
+                    self.geometry_col = col
+                    self._exclude_from_fields.append(self.geometry_col)
                     break
             else:
-                LOGGER.warning('No time field found')
-                return
-
-        self.gdf[self.time_field] = pandas.to_datetime(
-            self.gdf[self.time_field]
-        )
+                # Assuming that there is no reason to read in geometric data without geometry
+                LOGGER.warning('No geometry column found')
 
-    def _filter_by_date(
-        self, df: geopandas.GeoDataFrame, datetime_: str
-    ) -> geopandas.GeoDataFrame:
+    def __init__(self, provider_def: dict):
         """
-        Filter by date
+        Initialize object
+
+        :param provider_def: provider definition
+
+        :returns: pygeoapi.provider.base.GeoPandasProvider
         """
-        dateRange = datetime_.split('/')
 
-        if _START_AND_END := len(dateRange) == 2:  # noqa F841
-            start, end = dateRange
+        super().__init__(provider_def)
 
-            # python does not accept Z at the end of the datetime even though that is a valid ISO 8601 datetime
-            if start.endswith('Z'):
-                start = start.replace('Z', '+00:00')
+        # Lazy providers keep nothing but a sample row resident and read
+        # only the rows and columns each query needs from the source
+        self.lazy: bool = provider_def.get('lazy', False)
 
-            if end.endswith('Z'):
-                end = end.replace('Z', '+00:00')
+        # GeoParquet is read with pyarrow, which prunes row groups using
+        # their statistics, the bbox covering columns included
+        self.parquet: bool = str(provider_def['data']).endswith(
+            ('.parquet', '.geoparquet')
+        )
 
-            start = (
-                datetime.datetime.min
-                if start == '..'
-                else datetime.datetime.fromisoformat(start)
-            )
-            end = (
-                datetime.datetime.max
-                if end == '..'
-                else datetime.datetime.fromisoformat(end)
+        # Writes are appended to this log, and replayed from it by every
+        # process serving the source, until they are checkpointed to a
+        # GeoParquet sidecar of the log
+        self.wal: Optional[str] = provider_def.get('wal')
+        self.wal_compact_size: int = provider_def.get(
+            'wal_compact_size', WAL_COMPACT_SIZE
+        )
+        # Geometries are serialized to GeoJSON once and kept until their
+        # row is updated, optionally rounded to this many decimals
+        self.geometry_cache: bool = provider_def.get(
+            'geometry_cache', False
+        ) and not provider_def.get('lazy', False)
+        self.geometry_precision: Optional[int] = provider_def.get(
+            'geometry_precision'
+        )
+
+        # Columns q searches for words, all string columns by default
+        self.q_fields: list[str] = provider_def.get('q_fields', [])
+
+        # The prepared dataset is written to this Arrow file once and
+        # memory-mapped by every process, which share its pages
+        self.shared_memory: Optional[str] = provider_def.get('shared_memory')
+
+        # When the source changes, keep serving the version read before
+        # while the new one is read in the background, instead of reading
+        # it in the request which noticed the change
+        self.hot_reload: bool = provider_def.get('hot_reload', False)
+        self._provider_def = provider_def
+
+        if self.wal and (self.lazy or self.shared_memory):
+            raise ProviderInvalidDataError(
+                'Read-only providers cannot have a wal'
             )
-            start, end = (
-                start.replace(tzinfo=datetime.timezone.utc),
-                end.replace(tzinfo=datetime.timezone.utc),
+        if self.lazy and self.shared_memory:
+            raise ProviderInvalidDataError(
+                'Lazy providers cannot share their dataset'
             )
 
-            if start > end:
-                raise ProviderQueryError(
-                    'Start date must be before end date but got {} and {}'.format(
-                        start, end
+        # The schema cache keeps what the first read of the source inferred,
+        # so later providers only read the source once a query needs it
+        self.schema_cache: Optional[str] = provider_def.get('schema_cache')
+
+        self._source_key = None if self.lazy else _dataset_key(provider_def)
+        self._key: Optional[tuple] = None
+        self._version: Optional[SharedDataset] = None
+
+        # These fields should not be returned in the property list for a query
+        self._exclude_from_fields: list[str] = []
+
+        self._fields = None  # Initialize _fields attribute before it is set
+
+        schema = self._read_schema()
+        if schema is not None:
+            self._set_schema(schema)
+        else:
+            self._load(provider_def)
+
+        self._exclude_from_properties: list[str] = (
+            self._exclude_from_fields + [self.id_field]
+        )
+
+        self.fields = (
+            self.get_fields()
+        )  # Assign initial fields using get_fields()
+
+        if schema is None:
+            self._write_schema()
+
+    def _load(self, provider_def: Optional[dict] = None):
+        """
+        Read the dataset, or find the version another provider read
+
+        :param provider_def: provider definition to infer the time and
+                             geometry fields from, if they are not known
+        """
+        key = self._source_key
+        with _DATASETS_LOCK:
+            shared = _DATASETS.get(key) if key else None
+            if shared is None and key and self.hot_reload:
+                stale = [k for k in _DATASETS if k[:2] == key[:2]]
+                if stale:
+                    shared = _DATASETS[stale[0]]
+                    self._reload(key, shared)
+                    key = stale[0]
+
+        # Processes which find no shared file hold its lock until they have
+        # written one, so the others wait to attach instead of reading too
+        sharing = contextlib.ExitStack()
+        attached = restart = False
+        if shared is not None:
+            self._key, self._dataset = key, shared
+        else:
+            generation, header = 0, self._wal_header() if self.wal else {}
+            # Logs of an earlier version of the source are restarted
+            restart = 'source' in header and (
+                header['source'] != self._wal_source
+            )
+            if restart and header.get('generation'):
+                raise self._wal_source_error()
+            try:
+                if self.shared_memory and (frame := self._attach(key)) is None:
+                    sharing.enter_context(self._shared_lock())
+                    frame = self._attach(key)
+
+                if self.shared_memory and frame is not None:
+                    self.gdf, attached = frame, True
+                    sharing.close()
+                elif header.get('generation'):
+                    # Writes up to the generation are in its checkpoint
+                    generation = header['generation']
+                    self.gdf = self._read_checkpoint(generation)
+                elif self.parquet:
+                    self._set_parquet_schema()
+                    self.gdf = self._read_parquet(
+                        filters=self._parquet_sample() if self.lazy else None
+                    )
+                elif self.lazy:
+                    info = pyogrio.read_info(self.data)
+                    self._source_dtypes: dict[str, str] = dict(
+                        zip(info['fields'], info['dtypes'])
                     )
+                    self.gdf = pyogrio.read_dataframe(
+                        self.data, max_features=1, use_arrow=True
+                    )
+                else:
+                    self.gdf = geopandas.read_file(self.data)
+            except FileNotFoundError as ex:
+                sharing.close()
+                raise ProviderNoDataError(
+                    f'Tried to read GeoDataFrame: {ex} but it does not exist'
+                )
+            except Exception as ex:
+                sharing.close()
+                raise ProviderInvalidDataError(
+                    f'Failed to read GeoDataFrame: {ex}'
                 )
 
-            # If the user just passes in 2019/.. this still handles the match for all days in 2019
-            # since the iso format will create the start as 2019-01-01
-            return df[
-                (df[self.time_field] >= start) & (df[self.time_field] <= end)
+        if provider_def is not None:
+            self._set_time_field(provider_def)
+            self._set_geometry_fields(provider_def)
+            self._exclude_from_fields += [
+                col for col in ENVELOPE_COLUMNS if col in self.gdf.columns
             ]
 
-        elif _ONLY_MATCH_ONE_DATE := len(dateRange) == 1:  # noqa
-            dates: geopandas.GeoSeries = df[self.time_field]
+        if shared is None and not attached:
+            self.gdf = self._prepare(self.gdf)
+            if self.wal:
+                self._dataset['wal'] = (generation, None)
+            with sharing:
+                frame = self._share(key) if self.shared_memory else None
+                if frame is not None:
+                    # Drop the private copy for the shared pages
+                    self.gdf = frame
+                    self._exclude_from_fields += [
+                        col
+                        for col in ENVELOPE_COLUMNS
+                        if col not in self._exclude_from_fields
+                    ]
 
-            # By casting to a string we can use .str.contains to coarsely check.
-            # We want 2019-10 to match 2019-10-01, 2019-10-02, etc.
-            return df[dates.astype(str).str.startswith(datetime_)]
-        else:
-            raise ProviderQueryError(
-                "datetime_ must be a date or date range with two dates separated by '/' but got {}".format(
-                    datetime_
+        if key and shared is None:
+            # Build the spatial index once so bbox queries only have to
+            # refine the candidates whose envelopes intersect the bbox
+            if hasattr(self, 'geometry_col') and self._wkb:
+                self._build_envelopes()
+            elif hasattr(self, 'geometry_col'):
+                self._build_sindex()
+
+            self._build_ids()
+            if self.time_field:
+                self._build_times()
+            if hasattr(self, 'geometry_x') and hasattr(self, 'geometry_y'):
+                self._coordinates()
+
+            self._key = key
+            with _DATASETS_LOCK:
+                for stale in [k for k in _DATASETS if k[:2] == key[:2]]:
+                    del _DATASETS[stale]
+                    _WRITE_LOCKS.pop(stale, None)
+                _DATASETS[key] = self._dataset
+
+        if self.wal:
+            if restart:
+                self._restart_wal()
+            if self._wal_behind(self._dataset):
+                # Catch up with the writes logged since the version was read
+                self._write(lambda dataset: (dataset, None))
+
+        if self.geometry_cache and hasattr(self, 'geometry_col'):
+            # Serialize the geometries the dataset has not cached yet
+            self._geojson(numpy.arange(len(self.gdf)))
+        if self.q_fields and not self.lazy:
+            self._build_terms()
+
+    @property
+    def _schema_key(self) -> Optional[list]:
+        """
+        The key of the source as stored in the schema cache
+
+        Sources without a version, like remote ones, are not cached.
+        """
+        if not self.schema_cache or not self._source_key:
+            return None
+        if self._source_key[2] is None:
+            return None
+
+        return json.loads(json.dumps(self._source_key))
+
+    def _reload(self, key: tuple, previous: SharedDataset):
+        """
+        Read the version of the source keyed by key in the background
+
+        The version is published once it is prepared, so providers created
+        from then on read it, while those reading the previous version keep
+        it until they are done. Must be called holding _DATASETS_LOCK.
+
+        :param key: key of the new version of the source
+        :param previous: version served until then
+        """
+        if key in _RELOADS:
+            return
+
+        def reload():
+            start = time.perf_counter()
+            try:
+                p = GeoPandasProvider(
+                    {**self._provider_def, 'hot_reload': False}
+                )
+                gdf = p.gdf
+            except Exception as ex:
+                # Not retried until the source changes again
+                LOGGER.error(f'Failed to reload {self.data}: {ex}')
+                return
+
+            seconds = time.perf_counter() - start
+            size, previous_size = (
+                frame.memory_usage(deep=True).sum() / 2**20
+                for frame in (gdf, previous['gdf'])
+            )
+            LOGGER.info(
+                f'Reloaded {self.data} in {seconds:.2f}s: {size:.1f} MB, '
+                f'the previous version held {previous_size:.1f} MB until '
+                'its readers finished'
+            )
+            with _DATASETS_LOCK:
+                del _RELOADS[key]
+
+        LOGGER.info(f'{self.data} changed, reloading it in the background')
+        _RELOADS[key] = threading.Thread(target=reload, daemon=True)
+        _RELOADS[key].start()
+
+    def _read_schema(self) -> Optional[dict]:
+        """
+        Read the schema the schema cache holds for the current source
+
+        :returns: the schema, or None if it is missing or stale
+        """
+        key = self._schema_key
+        if key is None:
+            return None
+
+        schema = _SCHEMAS.get(self.schema_cache)
+        if schema is None or schema['key'] != key:
+            try:
+                with open(self.schema_cache) as fh:
+                    schema = json.load(fh)
+            except (OSError, ValueError):
+                return None
+            if schema.get('key') != key:
+                LOGGER.debug(f'Schema cache {self.schema_cache} is stale')
+                return None
+            _SCHEMAS[self.schema_cache] = schema
+
+        return schema
+
+    def _set_schema(self, schema: dict):
+        """
+        Set the time field, geometry fields and fields of a cached schema
+        """
+        self.time_field = schema['time_field']
+        for name, value in schema['geometry'].items():
+            setattr(self, name, value)
+        self._exclude_from_fields += schema['exclude_from_fields']
+        self._fields = schema['fields']
+
+    def _write_schema(self):
+        """
+        Write the inferred schema to the schema cache
+        """
+        if self._schema_key is None or self._key != self._source_key:
+            # Nor is one inferred from the version read before a reload
+            return
+
+        schema = {
+            'key': self._schema_key,
+            'time_field': self.time_field,
+            'geometry': {
+                name: getattr(self, name)
+                for name in ('geometry_col', 'geometry_x', 'geometry_y')
+                if hasattr(self, name)
+            },
+            'exclude_from_fields': self._exclude_from_fields,
+            'fields': self._fields,
+        }
+        try:
+            tmp = f'{self.schema_cache}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as fh:
+                json.dump(schema, fh)
+            os.replace(tmp, self.schema_cache)
+        except OSError as ex:
+            LOGGER.warning(f'Failed to write schema cache: {ex}')
+            return
+        _SCHEMAS[self.schema_cache] = schema
+
+    @property
+    def _wkb(self) -> bool:
+        """Whether the geometry of self.gdf is kept as WKB"""
+        return hasattr(self, 'geometry_col') and not isinstance(
+            self.gdf[self.geometry_col].dtype, geopandas.array.GeometryDtype
+        )
+
+    @contextlib.contextmanager
+    def _shared_lock(self):
+        """
+        Hold the lock of the shared Arrow file, shared by all processes
+        """
+        with _file_lock(f'{self.shared_memory}.lock'):
+            yield
+
+    def _share(self, key: tuple) -> Optional[pandas.DataFrame]:
+        """
+        Write the prepared dataset to the shared Arrow file and attach it
+
+        Geometries are written as WKB along with their envelopes, so that
+        processes filter by bbox without decoding every geometry.
+
+        :param key: dataset key the file is written for
+
+        :returns: DataFrame attached to the file, None if it failed
+        """
+        frame = pandas.DataFrame(self.gdf)
+        if hasattr(self, 'geometry_col'):
+            geometry = self.gdf[self.geometry_col].to_numpy()
+            bounds = shapely.bounds(geometry)
+            frame[self.geometry_col] = shapely.to_wkb(geometry)
+            for i, col in enumerate(ENVELOPE_COLUMNS):
+                frame[col] = bounds[:, i]
+
+        try:
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        except (pyarrow.ArrowException, TypeError, ValueError) as ex:
+            LOGGER.error(f'Failed to share {self.data}: {ex}')
+            return None
+
+        # pandas only reads large_string columns without copying them
+        schema = pyarrow.schema(
+            [
+                field.with_type(pyarrow.large_string())
+                if pyarrow.types.is_string(field.type)
+                else field
+                for field in table.schema
+            ],
+            metadata={
+                **(table.schema.metadata or {}),
+                b'pygeoapi_dataset': json.dumps(key).encode(),
+            },
+        )
+        table = table.cast(schema)
+
+        path = f'{self.shared_memory}.{os.getpid()}.tmp'
+        with pyarrow.OSFile(path, 'wb') as sink:
+            with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(path, self.shared_memory)
+
+        return self._attach(key)
+
+    def _attach(self, key: tuple) -> Optional[pandas.DataFrame]:
+        """
+        Memory-map the shared Arrow file of the dataset
+
+        Every column, strings, WKB geometries and numbers alike, is a view
+        of the mapped pages rather than a copy, so processes attached to
+        the same file share their memory.
+
+        :param key: dataset key the file must have been written for
+
+        :returns: DataFrame of the dataset, None if the file is missing
+                  or was written for another version of the source
+        """
+        try:
+            source = pyarrow.memory_map(self.shared_memory)
+            table = pyarrow.ipc.open_file(source).read_all()
+        except (FileNotFoundError, pyarrow.ArrowInvalid):
+            return None
+
+        metadata = table.schema.metadata or {}
+        if metadata.get(b'pygeoapi_dataset') != json.dumps(key).encode():
+            return None
+
+        def types_mapper(arrow_type: pyarrow.DataType):
+            if pyarrow.types.is_binary(arrow_type):
+                return pandas.ArrowDtype(arrow_type)
+
+        # Consolidating the numeric columns into blocks would copy them
+        return table.to_pandas(types_mapper=types_mapper, split_blocks=True)
+
+    def _prepare(self, gdf: geopandas.GeoDataFrame) -> geopandas.GeoDataFrame:
+        """
+        Convert the columns of a freshly read frame to the types queried
+
+        :param gdf: GeoDataFrame as read from the source
+
+        :returns: the same GeoDataFrame with converted columns
+        """
+        if self.time_field and not pandas.api.types.is_datetime64_any_dtype(
+            gdf[self.time_field]
+        ):
+            gdf[self.time_field] = pandas.to_datetime(gdf[self.time_field])
+
+        gdf[self.id_field] = gdf[self.id_field].astype(str)
+
+        if hasattr(self, 'geometry_x') and hasattr(self, 'geometry_y'):
+            # Parse the coordinates once rather than for every page or bbox
+            for col in (self.geometry_x, self.geometry_y):
+                gdf[col] = pandas.to_numeric(gdf[col], errors='coerce')
+
+        # Without below, the CSV reads std_id as an object dtype
+        # And fails the CSV provider tests. Maybe a way to do this better
+        # that is more generalizable?
+        if 'stn_id' in gdf.columns:
+            gdf['stn_id'] = gdf['stn_id'].astype('int64')
+        if 'value' in gdf.columns:
+            gdf['value'] = gdf['value'].astype('float64')
+
+        return gdf
+
+    def _lazy_view(
+        self,
+        columns: Optional[list[str]] = None,
+        bbox: list[float] = [],
+        identifier: Optional[str] = None,
+        properties: list[tuple[str, str]] = [],
+        datetime_: Optional[str] = None,
+        read_geometry: bool = True,
+        skip_features: int = 0,
+        max_features: Optional[int] = None,
+    ) -> 'GeoPandasProvider':
+        """
+        Read the rows a query may match into a provider of their own
+
+        The bbox and the property filters the source can evaluate are pushed
+        down to it, and only the needed columns are read through the Arrow
+        interface. The returned provider then applies the exact filters.
+
+        :param columns: list of columns to read, None to read all of them
+        :param bbox: bounding box [minx,miny,maxx,maxy]
+        :param identifier: feature id
+        :param properties: list of tuples (name, value)
+        :param datetime_: temporal (datestamp or extent)
+        :param read_geometry: bool of whether to read the geometry
+        :param skip_features: number of rows to skip, without filters
+        :param max_features: number of rows to read at most, without
+                             filters, None to read all of them
+
+        :returns: GeoPandasProvider holding the rows read
+        """
+        if columns is not None:
+            required = [
+                self.id_field,
+                self.time_field,
+                getattr(self, 'geometry_x', None),
+                getattr(self, 'geometry_y', None),
+            ]
+            columns = [
+                col
+                for col in dict.fromkeys([*required, *columns])
+                if col in self._source_dtypes
+            ]
+
+        filters = list(properties)
+        if identifier is not None:
+            filters.append((self.id_field, str(identifier)))
+
+        try:
+            if self.parquet:
+                gdf = self._read_parquet(
+                    columns=columns,
+                    bbox=bbox,
+                    filters=self._parquet_filter(filters, datetime_),
+                    read_geometry=read_geometry,
+                    skip_features=skip_features,
+                    max_features=max_features,
+                )
+            else:
+                gdf = pyogrio.read_dataframe(
+                    self.data,
+                    columns=columns,
+                    bbox=tuple(bbox) if len(bbox) == 4 else None,
+                    where=self._where_clause(filters),
+                    read_geometry=read_geometry,
+                    skip_features=skip_features,
+                    max_features=max_features,
+                    use_arrow=True,
                 )
+        except Exception as ex:
+            raise ProviderQueryError(f'Failed to read GeoDataFrame: {ex}')
+
+        view = copy.copy(self)
+        view.lazy = False
+        view.gdf = self._prepare(gdf)
+        return view
+
+    def _set_parquet_schema(self):
+        """
+        Read the schema of a GeoParquet source and its geo metadata
+        """
+        schema = pyarrow.parquet.read_schema(self.data)
+        geo = json.loads((schema.metadata or {}).get(b'geo', b'{}'))
+
+        self._parquet_geometry: Optional[str] = geo.get('primary_column')
+
+        # The bbox covering columns are only read to prune row groups
+        self._parquet_bbox: Optional[dict[str, list[str]]] = (
+            geo.get('columns', {})
+            .get(self._parquet_geometry, {})
+            .get('covering', {})
+            .get('bbox')
+        )
+        covering = {path[0] for path in (self._parquet_bbox or {}).values()}
+
+        self._parquet_schema: pyarrow.Schema = schema
+        self._source_dtypes = {
+            field.name: str(field.type)
+            for field in schema
+            if field.name not in covering
+        }
+
+    def _parquet_sample(self) -> pyarrow.compute.Expression:
+        """
+        Filter matching the first feature of a GeoParquet source
+
+        :returns: filter expression on the id field
+        """
+        batches = pyarrow.parquet.ParquetFile(self.data).iter_batches(
+            batch_size=1, columns=[self.id_field]
+        )
+        batch = next(batches, None)
+        if batch is None or batch.num_rows == 0:
+            raise ProviderNoDataError('No data found to get fields from')
+
+        return pyarrow.compute.field(self.id_field) == batch.column(0)[0]
+
+    def _read_parquet(
+        self,
+        columns: Optional[list[str]] = None,
+        bbox: list[float] = [],
+        filters: Optional[pyarrow.compute.Expression] = None,
+        read_geometry: bool = True,
+        skip_features: int = 0,
+        max_features: Optional[int] = None,
+    ) -> geopandas.GeoDataFrame:
+        """
+        Read a GeoParquet source, skipping the row groups filtered out
+
+        :param columns: list of columns to read, None to read all of them
+        :param bbox: bounding box [minx,miny,maxx,maxy]
+        :param filters: filter expression
+        :param read_geometry: bool of whether to read the geometry
+        :param skip_features: number of rows to skip, without filters
+        :param max_features: number of rows to read at most, without
+                             filters, None to read all of them
+
+        :returns: GeoDataFrame of the rows matching the filters
+        """
+        if columns is None:
+            columns = list(self._source_dtypes)
+        columns = [col for col in columns if col != self._parquet_geometry]
+
+        if max_features is not None:
+            if read_geometry and self._parquet_geometry:
+                columns = [*columns, self._parquet_geometry]
+            table = self._parquet_rows(columns, skip_features, max_features)
+            if read_geometry and self._parquet_geometry:
+                return geopandas.GeoDataFrame.from_arrow(table)
+            return geopandas.GeoDataFrame(table.to_pandas())
+
+        if not (read_geometry and self._parquet_geometry):
+            table = pyarrow.parquet.read_table(
+                self.data, columns=columns, filters=filters
             )
+            return geopandas.GeoDataFrame(table.to_pandas())
+
+        return geopandas.read_parquet(
+            self.data,
+            columns=[*columns, self._parquet_geometry],
+            bbox=tuple(bbox)
+            if len(bbox) == 4 and self._parquet_bbox
+            else None,
+            filters=filters,
+        )
+
+    def _parquet_rows(
+        self, columns: list[str], skip_features: int, max_features: int
+    ) -> pyarrow.Table:
+        """
+        Read a range of rows of a GeoParquet source
+
+        Only the row groups holding rows of the range are read.
+
+        :param columns: list of columns to read
+        :param skip_features: number of rows to skip
+        :param max_features: number of rows to read at most
+
+        :returns: Arrow table of the rows
+        """
+        source = pyarrow.parquet.ParquetFile(self.data)
+        metadata = source.metadata
+
+        groups, start = [], None
+        first = 0
+        for group in range(metadata.num_row_groups):
+            last = first + metadata.row_group(group).num_rows
+            if last > skip_features and first < skip_features + max_features:
+                groups.append(group)
+                start = first if start is None else start
+            first = last
+
+        table = source.read_row_groups(groups, columns=columns)
+        return table.slice(skip_features - (start or 0), max_features)
+
+    def _source_count(self) -> int:
+        """
+        Number of rows of the source, as its metadata records it
 
-    def _set_geometry_fields(self, provider_def: dict):
+        :returns: the number of rows
         """
-        Set geometry fields and check both if there is a point-based csv or a shapely geometry column
+        try:
+            if self.parquet:
+                return pyarrow.parquet.ParquetFile(self.data).metadata.num_rows
+
+            count = pyogrio.read_info(self.data)['features']
+            if count < 0:
+                # Sources without a stored count are counted by OGR
+                count = pyogrio.read_info(self.data, force_feature_count=True)[
+                    'features'
+                ]
+        except Exception as ex:
+            raise ProviderQueryError(f'Failed to read GeoDataFrame: {ex}')
+
+        return count
+
+    def _parquet_filter(
+        self, filters: list[tuple[str, str]], datetime_: Optional[str] = None
+    ) -> Optional[pyarrow.compute.Expression]:
         """
-        # Check if it was specified in the config, try the CSV geo style and otherwise use the standard shapely geo format
-        if 'geometry' in provider_def:
-            if (
-                provider_def['geometry']['x_field']
-                and provider_def['geometry']['y_field']
-            ):
-                self.geometry_x = provider_def['geometry']['x_field']
-                self.geometry_y = provider_def['geometry']['y_field']
-                self._exclude_from_fields.append(self.geometry_x)
-                self._exclude_from_fields.append(self.geometry_y)
+        Translate property and time filters into a pyarrow filter expression
 
-            # Unclear if there can be other types of geometries manually specified in the config
-            # Otherwise we would just read it in as a shapely geometry\
-            # else:
-            #     self.geometry_col = provider_def["geometry"]
-            #     self._exclude_from_fields.append(self.geometry_col)
+        Like `_where_clause`, a filter only prunes rows when the source
+        stores its column with the type the provider compares it as, and
+        dates only bound the time field loosely.
 
-        # If we don't have x,y coords as separate columns then look for a geometry column
-        elif 'geometry' in self.gdf.columns:
-            self.geometry_col = 'geometry'
-            self._exclude_from_fields.append(self.geometry_col)
+        :param filters: list of tuples (name, value)
+        :param datetime_: temporal (datestamp or extent)
 
-        # If we don't have any of the above, find the first geometry column and assume that is where the geometry is
-        else:
-            for col in self.gdf.columns:
-                if hasattr(col, 'geom_type'):
-                    self.geometry_col = col
-                    self._exclude_from_fields.append(self.geometry_col)
-                    break
+        :returns: filter expression, None if no filter can be pushed down
+        """
+        schema = self._parquet_schema
+        expressions = []
+
+        for column_name, value in filters:
+            if column_name not in self._source_dtypes:
+                continue
+
+            field_type = schema.field(column_name).type
+            if pyarrow.types.is_string(field_type) or (
+                pyarrow.types.is_large_string(field_type)
+            ):
+                literal = value
+            elif pyarrow.types.is_integer(field_type):
+                if not value.lstrip('-').isdigit() or str(int(value)) != value:
+                    continue
+                literal = int(value)
+            elif column_name == self.id_field and (
+                pyarrow.types.is_float64(field_type)
+            ):
+                literal = _float_id(value)
+                if literal is None:
+                    continue
             else:
-                # Assuming that there is no reason to read in geometric data without geometry
-                LOGGER.warning('No geometry column found')
+                continue
+
+            expressions.append(pyarrow.compute.field(column_name) == literal)
+
+        if (
+            datetime_
+            and self.time_field in self._source_dtypes
+            and pyarrow.types.is_timestamp(schema.field(self.time_field).type)
+        ):
+            field = pyarrow.compute.field(self.time_field)
+            time_type = pyarrow.timestamp(
+                'us', tz=schema.field(self.time_field).type.tz
+            )
+            start, end = self._date_bounds(datetime_)
+            if start is not None:
+                expressions.append(
+                    field >= pyarrow.scalar(start.to_pydatetime(), time_type)
+                )
+            if end is not None:
+                expressions.append(
+                    field <= pyarrow.scalar(end.to_pydatetime(), time_type)
+                )
 
-    def __init__(self, provider_def: dict):
-        """
-        Initialize object
+        if not expressions:
+            return None
 
-        :param provider_def: provider definition
+        return functools.reduce(operator.and_, expressions)
 
-        :returns: pygeoapi.provider.base.GeoPandasProvider
+    def _date_bounds(
+        self, datetime_: str
+    ) -> tuple[Optional[pandas.Timestamp], Optional[pandas.Timestamp]]:
         """
+        Bound a date or date range loosely in UTC
 
-        super().__init__(provider_def)
+        A day of slack on either side covers any UTC offset, so the bounds
+        can prune rows at the source before the exact date filter runs.
+
+        :param datetime_: temporal (datestamp or extent)
 
+        :returns: tuple of UTC start and end, None where unbounded
+        """
         try:
-            self.gdf = geopandas.read_file(provider_def['data'])
-        except FileNotFoundError as ex:
-            raise ProviderNoDataError(
-                f'Tried to read GeoDataFrame: {ex} but it does not exist'
-            )
-        except Exception as ex:
-            raise ProviderInvalidDataError(
-                f'Failed to read GeoDataFrame: {ex}'
-            )
+            if '/' in datetime_:
+                start, end = datetime_.split('/')
+                start = (
+                    None
+                    if start in ('', '..')
+                    else self._date_interval(start)[0]
+                )
+                end = (
+                    None if end in ('', '..') else self._date_interval(end)[1]
+                )
+            else:
+                start, end = self._date_interval(datetime_)
+        except (ProviderInvalidQueryError, ValueError):
+            return None, None
+
+        slack = pandas.Timedelta(days=1)
+        bounds = []
+        for bound, shift in ((start, -slack), (end, slack)):
+            try:
+                if bound is not None and bound.tzinfo is not None:
+                    bound = bound.tz_convert(None)
+                bound = None if bound is None else bound + shift
+            except (OverflowError, ValueError):
+                bound = None
+            bounds.append(bound)
+
+        return tuple(bounds)
+
+    def _where_clause(self, filters: list[tuple[str, str]]) -> Optional[str]:
+        """
+        Translate property filters into an OGR SQL WHERE clause
 
-        # These fields should not be returned in the property list for a query
-        self._exclude_from_fields: list[str] = []
+        A filter is only pushed down when the source stores its column with
+        the same type the provider compares it as, so the source can never
+        drop a row the provider would keep.
+
+        :param filters: list of tuples (name, value)
 
-        self._set_time_field(provider_def)
-        self._set_geometry_fields(provider_def)
+        :returns: WHERE clause, None if no filter can be pushed down
+        """
+        clauses = []
 
-        self.gdf[self.id_field] = self.gdf[self.id_field].astype(str)
+        for column_name, value in filters:
+            source_dtype = self._source_dtypes.get(column_name)
+            kind = self.gdf[column_name].dtype.kind
 
-        # Without below, the CSV reads std_id as an object dtype
-        # And fails the CSV provider tests. Maybe a way to do this better
-        # that is more generalizable?
-        if 'stn_id' in self.gdf.columns:
-            self.gdf['stn_id'] = self.gdf['stn_id'].astype('int64')
-        if 'value' in self.gdf.columns:
-            self.gdf['value'] = self.gdf['value'].astype('float64')
+            # Identifiers are compared as text, whatever their source type
+            is_id = column_name == self.id_field
 
-        self._exclude_from_properties: list[str] = (
-            self._exclude_from_fields + [self.id_field]
-        )
+            if source_dtype == 'object' and isinstance(
+                self.gdf[column_name].dtype, pandas.StringDtype
+            ):
+                literal = "'{}'".format(value.replace("'", "''"))
+            elif source_dtype in ('int32', 'int64') and (
+                kind in 'iu' or is_id
+            ):
+                if not value.lstrip('-').isdigit() or str(int(value)) != value:
+                    continue
+                literal = value
+            elif source_dtype == 'float64' and is_id:
+                if _float_id(value) is None:
+                    continue
+                literal = value
+            else:
+                continue
 
-        self._fields = None  # Initialize _fields attribute before it is set
+            clauses.append(
+                '"{}" = {}'.format(column_name.replace('"', '""'), literal)
+            )
 
-        self.fields = (
-            self.get_fields()
-        )  # Assign initial fields using get_fields()
+        return ' AND '.join(clauses) or None
 
     def get_fields(self) -> dict[str, any]:
         """
@@ -329,6 +2868,7 @@ class GeoPandasProvider(BaseProvider):
         sortby: list[SortDict] = [],
         skip_geometry=False,
         q=None,
+        filterq=None,
         **kwargs,
     ) -> FeatureCollection:
         """
@@ -344,16 +2884,10 @@ class GeoPandasProvider(BaseProvider):
         :param sortby: How to return the sorted features list of dicts (property, order)
         :param skip_geometry: bool of whether to skip geometry (default False)
         :param q: full-text search term(s)
+        :param filterq: CQL2 filter, as pygeofilter AST or CQL2 text
 
         :returns: dict of GeoJSON FeatureCollection
         """
-
-        if q is not None:
-            raise NotImplementedError(
-                'q not implemented for GeoPandasProvider'
-            )
-
-        found, result = False, False
         feature_collection: FeatureCollection = {
             'type': 'FeatureCollection',
             'features': [],
@@ -361,42 +2895,72 @@ class GeoPandasProvider(BaseProvider):
             'numberReturned': 0,
         }
 
-        if identifier is not None:
-            # If we are querying for just one feature, we may have a different limit than the default
-            # TODO should this be min? So min or this limit and limit in the function call?
-            limit = self.query(resulttype='hits')['numberMatched']
-
-        # Create a dummy backup that we can overwrite
-        df: geopandas.GeoDataFrame = self.gdf
-
-        if properties:
-            for prop in properties:
-                (column_name, val_to_filter_by) = prop
-
-                # Only keep rows where the property is the right value
-
-                # We need to convert this to a string since it appears the properties are always strings,
-                # but our dataframe contains integers or floats
-                df = df[df[column_name].astype(str) == val_to_filter_by]
-
-        if resulttype == 'hits':
-            # If we are querying for just the number matched, we don't
-            # datetime_obj to further process the df and can simply return len
-            feature_collection['numberMatched'] = len(df)
-            return feature_collection
+        if self.lazy:
+            if filterq is not None or (q is not None and not self.q_fields):
+                # The columns filtered on are only known once they are read
+                columns = None
+            elif resulttype == 'hits':
+                columns = [name for name, _ in properties]
+            elif self.properties:
+                columns = [
+                    *self.properties,
+                    *select_properties,
+                    *(name for name, _ in properties),
+                    *(sort_key['property'] for sort_key in sortby),
+                ]
+            else:
+                columns = None
+            if columns is not None and q is not None:
+                columns += self.q_fields
 
-        if _BBOX_DEFINED := len(bbox) == 4:  # noqa
-            minx, miny, maxx, maxy = bbox
-            bbox_geom = box(minx, miny, maxx, maxy)
-            df = df[df['geometry'].intersects(bbox_geom)]
-        elif _INVALID_BBOX := (len(bbox) != 4 and len(bbox) != 0):  # noqa
-            raise ProviderQueryError(
-                'bbox must be a list of 4 values got {}'.format(len(bbox))
+            if not (bbox or datetime_ or properties or sortby) and (
+                identifier is None and q is None and filterq is None
+            ):
+                # Nothing has to be evaluated in memory, so the source
+                # counts the rows and only those of the page are read
+                feature_collection['numberMatched'] = self._source_count()
+                if resulttype == 'hits':
+                    return feature_collection
+
+                view = self._lazy_view(
+                    columns=columns,
+                    read_geometry=not skip_geometry,
+                    skip_features=offset,
+                    max_features=limit,
+                )
+                page = view.query(
+                    limit=limit,
+                    select_properties=select_properties,
+                    skip_geometry=skip_geometry,
+                )
+                page['numberMatched'] = feature_collection['numberMatched']
+                return page
+
+            view = self._lazy_view(
+                columns=columns,
+                bbox=bbox,
+                identifier=identifier,
+                properties=properties,
+                datetime_=datetime_,
+                read_geometry=len(bbox) == 4
+                or (resulttype == 'results' and not skip_geometry),
+            )
+            return view.query(
+                offset=offset,
+                limit=limit,
+                resulttype=resulttype,
+                identifier=identifier,
+                bbox=bbox,
+                datetime_=datetime_,
+                properties=properties,
+                select_properties=select_properties,
+                sortby=sortby,
+                skip_geometry=skip_geometry,
+                q=q,
+                filterq=filterq,
             )
 
         if sortby:
-            sort_keys = [sort_key['property'] for sort_key in sortby]
-
             for sort_specifier in sortby:
                 if (
                     '+' != sort_specifier['order']
@@ -408,72 +2972,39 @@ class GeoPandasProvider(BaseProvider):
                         )
                     )
 
-            sort_directions = [
-                True if sort_key['order'] == '+' else False
-                for sort_key in sortby
-            ]
-
-            df = df.sort_values(by=sort_keys, ascending=sort_directions)
-
-        if datetime_ is not None:
-            df = self._filter_by_date(df, datetime_)
-
-        for _, row in df.iterrows():
-            feature: Feature = {
-                'type': 'Feature',
-                'id': str(row[self.id_field]),
-                'properties': OrderedDict(),
-                'geometry': {'type': None, 'coordinates': None},
-            }
-
-            if skip_geometry:
-                feature['geometry'] = None
-            else:
-                if hasattr(self, 'geometry_x') and hasattr(self, 'geometry_y'):
-                    feature['geometry']['coordinates'] = [
-                        float(row[self.geometry_x]),
-                        float(row[self.geometry_y]),
-                    ]
-                    feature['geometry']['type'] = 'Point'
-                elif hasattr(self, 'geometry_col'):
-                    feature['geometry']['coordinates'] = shapely.to_geojson(
-                        row[self.geometry_col]
-                    )
-                    feature['geometry']['type'] = row[
-                        self.geometry_col
-                    ].geom_type
-                else:
-                    raise ProviderQueryError(
-                        'The config passed in does not specify which geometry column to use'
-                    )
-
-            for key, value in row.items():
-                properties_to_keep = set(self.properties) | (
-                    set(select_properties)
-                )
+        # Create a dummy backup that we can overwrite
+        df: geopandas.GeoDataFrame = self.gdf
 
-                # If no properties are specified to filter by, we have a no-op filter
-                KEEP_ALL = len(properties_to_keep) == 0
+        for query_filter in self._plan_filters(
+            identifier, bbox, datetime_, properties, q, filterq
+        ):
+            if len(df) == 0:
+                break
+            df = query_filter['apply'](df)
 
-                if KEEP_ALL or key in properties_to_keep:
-                    if key not in self._exclude_from_properties:
-                        feature['properties'][key] = value
+        feature_collection['numberMatched'] = len(df)
 
-            if identifier and feature[self.id_field] == identifier:
-                found = True
-                result = feature
+        if resulttype == 'hits':
+            # If we are querying for just the number matched, there is
+            # no need to sort or serialize anything
+            return feature_collection
 
-            feature_collection['features'].append(feature)
-            feature_collection['numberMatched'] = len(
-                feature_collection['features']
-            )
+        if identifier is not None:
+            features = self._to_features(df, select_properties, skip_geometry)
+            return features[0] if features else None
 
-        if identifier:
-            return None if not found else result
+        if sortby:
+            # Only the rows up to the end of the page need to be ordered
+            positions = self._sort_positions(df, sortby, offset + limit)
+            page = df.iloc[positions[offset : offset + limit]]
+        else:
+            page = df.iloc[offset : offset + limit]
 
-        feature_collection['features'] = feature_collection['features'][
-            offset : offset + limit
-        ]
+        # Only serialize the requested page so that memory and latency
+        # scale with limit rather than with the number of matched rows
+        feature_collection['features'] = self._to_features(
+            page, select_properties, skip_geometry
+        )
         feature_collection['numberReturned'] = len(
             feature_collection['features']
         )
@@ -487,6 +3018,250 @@ class GeoPandasProvider(BaseProvider):
 
         return feature_collection
 
+    def _sort_positions(
+        self, df: geopandas.GeoDataFrame, sortby: list[SortDict], count: int
+    ) -> numpy.ndarray:
+        """
+        Find the first rows of a dataframe in sort order
+
+        Sorting all of self.gdf is done once per sortby and kept, so paging
+        through sorted results does not sort again for every page. Filtered
+        frames reuse a kept order if there is one and are otherwise only
+        partially sorted.
+
+        :param df: self.gdf or a filtered subset of it
+        :param sortby: list of dicts (property, order)
+        :param count: number of rows needed from the start of the order
+
+        :returns: positions in df of its first count rows in sort order
+        """
+        key = tuple(
+            (sort_key['property'], sort_key['order']) for sort_key in sortby
+        )
+        sorts = self._dataset['sorts']
+        order = sorts.get(key)
+
+        if order is None:
+            if df is not self.gdf:
+                return self._argsort(df, sortby, count)
+
+            order = self._argsort(df, sortby, len(df))
+            if len(sorts) >= SORT_CACHE_SIZE:
+                sorts.pop(next(iter(sorts), None), None)
+            sorts[key] = order
+
+        if df is self.gdf:
+            return order[:count]
+
+        # Walk the order of self.gdf and keep the rows that are in df
+        in_df = numpy.zeros(len(self.gdf), dtype=bool)
+        in_df[self.gdf.index.get_indexer(df.index)] = True
+        first = order[in_df[order]][:count]
+        return df.index.get_indexer(self.gdf.index[first])
+
+    def _argsort(
+        self, df: geopandas.GeoDataFrame, sortby: list[SortDict], count: int
+    ) -> numpy.ndarray:
+        """
+        Stable sort of a dataframe that only orders its first rows
+
+        Every sort key is factorized into integer ranks, missing values last,
+        and the ranks and row position are combined into a single unique
+        key. The first count keys are selected in linear time with
+        argpartition and only those are sorted.
+
+        :param df: dataframe to sort
+        :param sortby: list of dicts (property, order)
+        :param count: number of rows needed from the start of the order
+
+        :returns: positions in df of its first count rows in sort order
+        """
+        size = len(df)
+        count = min(count, size)
+        if count == 0:
+            return numpy.array([], dtype=numpy.int64)
+
+        combined = numpy.zeros(size, dtype=numpy.int64)
+        width = 1
+        try:
+            for sort_key in sortby:
+                codes, uniques = pandas.factorize(
+                    df[sort_key['property']], sort=True
+                )
+                cardinality = len(uniques) + 1
+                if sort_key['order'] == '-':
+                    codes = numpy.where(
+                        codes < 0, -1, len(uniques) - 1 - codes
+                    )
+                codes = numpy.where(codes < 0, len(uniques), codes)
+
+                width *= cardinality
+                combined = combined * cardinality + codes
+        except TypeError:
+            # Values that cannot be ranked against each other
+            width = None
+
+        if width is None or width * size >= numpy.iinfo(numpy.int64).max:
+            return self._full_sort(df, sortby)[:count]
+
+        # Breaking ties by position keeps the sort stable
+        combined = combined * size + numpy.arange(size)
+
+        if count < size:
+            first = numpy.argpartition(combined, count - 1)[:count]
+            return first[numpy.argsort(combined[first])]
+
+        return numpy.argsort(combined)
+
+    def _full_sort(
+        self, df: geopandas.GeoDataFrame, sortby: list[SortDict]
+    ) -> numpy.ndarray:
+        """
+        Stable sort of a whole dataframe with pandas
+
+        :param df: dataframe to sort
+        :param sortby: list of dicts (property, order)
+
+        :returns: positions in df in sort order
+        """
+        sort_keys = [sort_key['property'] for sort_key in sortby]
+
+        sort_directions = [
+            True if sort_key['order'] == '+' else False for sort_key in sortby
+        ]
+
+        ordered = df.reset_index(drop=True).sort_values(
+            by=sort_keys, ascending=sort_directions, kind='stable'
+        )
+        return ordered.index.to_numpy()
+
+    def _to_features(
+        self,
+        df: geopandas.GeoDataFrame,
+        select_properties: list[str] = [],
+        skip_geometry: bool = False,
+    ) -> list[Feature]:
+        """
+        Serialize a dataframe into GeoJSON features column by column
+
+        :param df: dataframe holding the rows to serialize
+        :param select_properties: list of properties to keep
+        :param skip_geometry: bool of whether to skip geometry
+
+        :returns: list of GeoJSON features in dataframe order
+        """
+        properties_to_keep = set(self.properties) | set(select_properties)
+
+        # If no properties are specified to filter by, we have a no-op filter
+        KEEP_ALL = len(properties_to_keep) == 0
+
+        columns = [
+            col
+            for col in df.columns
+            if (KEEP_ALL or col in properties_to_keep)
+            and col not in self._exclude_from_properties
+        ]
+
+        ids = [str(id_) for id_ in df[self.id_field].tolist()]
+        # Converting whole columns to python lists and zipping them back
+        # together is considerably faster than DataFrame.to_dict('records')
+        if columns:
+            properties = [
+                OrderedDict(zip(columns, values))
+                for values in zip(*(df[col].tolist() for col in columns))
+            ]
+        else:
+            properties = [OrderedDict() for _ in range(len(df))]
+
+        if skip_geometry:
+            geometries = [None] * len(df)
+        elif hasattr(self, 'geometry_x') and hasattr(self, 'geometry_y'):
+            coordinates = numpy.column_stack(self._coordinates(df))
+            missing = numpy.isnan(coordinates).any(axis=1)
+            geometries = [
+                None if absent else {'type': 'Point', 'coordinates': coords}
+                for coords, absent in zip(
+                    coordinates.tolist(), missing.tolist()
+                )
+            ]
+        elif hasattr(self, 'geometry_col'):
+            positions = None
+            if self.geometry_cache and self.gdf.index.is_unique:
+                positions = self.gdf.index.get_indexer(df.index)
+            if positions is not None and (positions >= 0).all():
+                encoded = self._geojson(positions)
+            else:
+                encoded = self._encode(df[self.geometry_col])
+            geometries = [
+                {'type': geom_type, 'coordinates': geojson}
+                for geom_type, geojson in encoded
+            ]
+        else:
+            raise ProviderQueryError(
+                'The config passed in does not specify which geometry column '
+                'to use'
+            )
+
+        return [
+            {
+                'type': 'Feature',
+                'id': id_,
+                'properties': props,
+                'geometry': geometry,
+            }
+            for id_, props, geometry in zip(ids, properties, geometries)
+        ]
+
+    def _encode(self, geoms: geopandas.GeoSeries) -> list[tuple[str, str]]:
+        """
+        Serialize geometries to GeoJSON
+
+        :param geoms: geometries to serialize, WKB if the dataset is shared
+
+        :returns: list of geometry type and GeoJSON of each geometry
+        """
+        values = geoms.to_numpy()
+        if self._wkb:
+            values = shapely.from_wkb(values)
+        if self.geometry_precision is not None:
+            values = shapely.transform(
+                values, lambda coords: coords.round(self.geometry_precision)
+            )
+
+        return list(
+            zip(
+                geopandas.GeoSeries(values).geom_type.tolist(),
+                shapely.to_geojson(values).tolist(),
+            )
+        )
+
+    def _geojson(self, positions: numpy.ndarray) -> list[tuple[str, str]]:
+        """
+        Serialized geometries of rows of self.gdf, from the geometry cache
+
+        Rows not serialized yet, or updated since, are serialized once and
+        cached for the other providers reading this dataset version.
+
+        :param positions: positions of rows in self.gdf
+
+        :returns: list of geometry type and GeoJSON of each row
+        """
+        gdf = self.gdf
+        if self._dataset['geojson'] is None:
+            self._dataset['geojson'] = numpy.full(len(gdf), None, object)
+
+        cache = self._dataset['geojson']
+        encoded = cache[positions].tolist()
+        missing = [p for p, e in zip(positions, encoded) if e is None]
+        if missing:
+            missing = numpy.unique(missing)
+            geoms = gdf[self.geometry_col].iloc[missing]
+            for position, entry in zip(missing, self._encode(geoms)):
+                cache[position] = entry
+            encoded = cache[positions].tolist()
+
+        return encoded
+
     @crs_transform
     def get(self, identifier: str, **kwargs):
         """
@@ -496,15 +3271,20 @@ class GeoPandasProvider(BaseProvider):
 
         :returns: dict of single GeoJSON feature
         """
-        #
-        res: geopandas.GeoSeries = self.gdf[
-            self.gdf[self.id_field].astype(str) == identifier
-        ].squeeze(axis=0)
-        if res.empty:
+        if self.lazy:
+            return self._lazy_view(identifier=identifier).get(identifier)
+
+        position = self._ids.get(str(identifier))
+        if position is None:
             err = f'item {identifier} not found'
             LOGGER.error(err)
             raise ProviderItemNotFoundError(err)
 
+        res: geopandas.GeoSeries = self.gdf.iloc[position]
+        if self._wkb:
+            res = res.drop(list(ENVELOPE_COLUMNS))
+            res[self.geometry_col] = shapely.from_wkb(res[self.geometry_col])
+
         feature: Feature = {}
         feature['type'] = 'Feature'
         feature['id'] = res[self.id_field]
@@ -519,16 +3299,30 @@ class GeoPandasProvider(BaseProvider):
 
         :returns: identifier of created item
         """
+        return self.create_many([item])[0]
+
+    def create_many(self, items: list[dict[str, any]]) -> list:
+        """
+        Create new items
+
+        :param items: list of `dict` of new items
+
+        :returns: list of identifiers of created items
+        """
+        if self.lazy or self.shared_memory:
+            raise NotImplementedError('Provider is read-only')
 
-        if len(item) != len(self.gdf.columns):
+        items = list(items)
+        columns = len(self._dataset['gdf'].columns)
+        if any(len(item) != columns for item in items):
             raise ProviderQueryError(
                 'Item to update does not match dataframe shape'
             )
 
-        new_row = geopandas.GeoDataFrame([item], crs=self.gdf.crs)
-        self.gdf = pandas.concat([self.gdf, new_row], ignore_index=True)
-
-        return self.gdf[self.id_field].iloc[-1]
+        return self._write(
+            functools.partial(self._append, items=items),
+            entry={'op': 'create', 'items': items},
+        )
 
     def update(self, identifier, item: dict[str, any]):
         """
@@ -539,27 +3333,32 @@ class GeoPandasProvider(BaseProvider):
 
         :returns: `bool` of update result
         """
+        return self.update_many({identifier: item})[identifier]
+
+    def update_many(self, items: dict[str, dict[str, any]]) -> dict[str, bool]:
+        """
+        Updates existing items
+
+        :param items: `dict` of feature id to `dict` of partial or full item
+
+        :returns: `dict` of feature id to `bool` of update result
+        """
+        if self.lazy or self.shared_memory:
+            raise NotImplementedError('Provider is read-only')
 
         if len(self.gdf) == 0:
             raise ProviderNoDataError('No data in provider')
 
-        if len(item) != len(self.gdf.columns):
+        columns = len(self.gdf.columns)
+        if any(len(item) != columns for item in items.values()):
             raise ProviderQueryError(
                 'Item to update does not match dataframe shape'
             )
 
-        if identifier not in self.gdf[self.id_field].values:
-            return False
-
-        # Find the index of the row that matches the identifier
-        index = self.gdf[self.gdf[self.id_field] == identifier].index[0]
-
-        # Update the row with the new item values
-        for key, value in item.items():
-            self.gdf.at[index, key] = value
-
-        # Return True to indicate successful update
-        return True
+        return self._write(
+            functools.partial(self._replace, items=items),
+            entry={'op': 'update', 'items': list(items.items())},
+        )
 
     def delete(self, identifier):
         """
@@ -569,12 +3368,197 @@ class GeoPandasProvider(BaseProvider):
 
         :returns: `bool` of deletion result
         """
+        return self.delete_many([identifier])
+
+    def delete_many(self, identifiers: list) -> bool:
+        """
+        Deletes existing items
+
+        :param identifiers: list of item ids
+
+        :returns: `bool` of deletion result
+        """
+        if self.lazy or self.shared_memory:
+            raise NotImplementedError('Provider is read-only')
+
         try:
-            self.gdf = self.gdf[self.gdf[self.id_field] != identifier]
-            return True
+            return self._write(
+                functools.partial(self._remove, identifiers=identifiers),
+                entry={'op': 'delete', 'identifiers': list(identifiers)},
+            )
         except Exception as e:
             LOGGER.error(e)
             return False
 
+    def _append(
+        self, dataset: SharedDataset, items: list[dict[str, any]]
+    ) -> tuple[SharedDataset, list]:
+        """
+        Add items to the created rows of a dataset version
+
+        :param dataset: dataset version
+        :param items: list of `dict` of new items
+
+        :returns: the changed version and the identifiers of the items
+        """
+        delta = dataset['delta']
+        if len(delta) != dataset['delta_size']:
+            # Another version was appended to, so branch off from it
+            delta = delta[: dataset['delta_size']]
+        delta.extend(items)
+
+        dataset = {**dataset, 'delta': delta, 'delta_size': len(delta)}
+        if len(delta) >= max(len(dataset['gdf']), DELTA_COMPACT_SIZE):
+            dataset = self._compacted(dataset)
+
+        return dataset, [item[self.id_field] for item in items]
+
+    def _replace(
+        self, dataset: SharedDataset, items: dict[str, dict[str, any]]
+    ) -> tuple[SharedDataset, dict[str, bool]]:
+        """
+        Update rows of a dataset version
+
+        :param dataset: dataset version
+        :param items: `dict` of feature id to `dict` of partial or full item
+
+        :returns: the changed version and the update result of each item
+        """
+        if dataset['delta_size']:
+            dataset = self._compacted(dataset)
+
+        self._dataset = dataset
+        ids = self._ids
+
+        positions = {
+            identifier: ids.get(str(identifier)) for identifier in items
+        }
+        updates = {
+            position: items[identifier]
+            for identifier, position in positions.items()
+            if position is not None
+        }
+        result = {
+            identifier: position is not None
+            for identifier, position in positions.items()
+        }
+        if not updates:
+            return dataset, result
+
+        # Published frames are never modified, so update a shallow copy
+        # with its own copy of each column updated. Without copy on write
+        # (pandas < 3), setting values in place would otherwise write into
+        # the published frame
+        gdf = dataset['gdf']
+        updated = gdf.copy(deep=False)
+        positions = list(updates)
+        index = gdf.index[positions]
+        owned = set()
+
+        def own(key: str):
+            if key not in owned and key in updated.columns:
+                updated[key] = updated[key].copy()
+            owned.add(key)
+
+        if len(updates) < BATCH_UPDATE_SIZE:
+            # Update the rows with the new item values
+            for label, item in zip(index, updates.values()):
+                for key, value in item.items():
+                    own(key)
+                    updated.at[label, key] = value
+        else:
+            # Update the rows one column at a time
+            keys = dict.fromkeys(
+                key for item in updates.values() for key in item
+            )
+            for key in keys:
+                values = [item.get(key) for item in updates.values()]
+                try:
+                    column = updated[key].copy()
+                    column.iloc[positions] = values
+                    updated[key] = column
+                except (KeyError, TypeError):
+                    # New columns, and values the column only accepts
+                    # one at a time (e.g. Python ints in an int32 column)
+                    own(key)
+                    for label, value in zip(index, values):
+                        updated.at[label, key] = value
+
+        # Row positions are unchanged, so the index only needs to be
+        # rebuilt when an update changes the identifier itself
+        before = gdf[self.id_field].iloc[positions].astype(str)
+        after = updated[self.id_field].iloc[positions].astype(str)
+        if (before.to_numpy() != after.to_numpy()).any():
+            ids = None
+
+        geojson = dataset['geojson']
+        if geojson is not None and hasattr(self, 'geometry_col'):
+            changed = [
+                position
+                for position, item in updates.items()
+                if self.geometry_col in item
+            ]
+            if changed:
+                geojson = geojson.copy()
+                geojson[changed] = None
+
+        terms = dataset['terms']
+        if terms is not None:
+            fields = set(self._q_fields(gdf))
+            changed = [
+                position
+                for position, item in updates.items()
+                if fields.intersection(item)
+            ]
+            if changed:
+                dropped = numpy.zeros(len(gdf), dtype=bool)
+                dropped[changed] = True
+                terms = self._index_words(
+                    terms, updated, dropped=dropped, added=numpy.array(changed)
+                )
+
+        dataset = _new_dataset(
+            updated, ids=ids, wal=dataset['wal'], geojson=geojson, terms=terms
+        )
+        return dataset, result
+
+    def _remove(
+        self, dataset: SharedDataset, identifiers: list
+    ) -> tuple[SharedDataset, bool]:
+        """
+        Delete rows of a dataset version
+
+        :param dataset: dataset version
+        :param identifiers: list of item ids
+
+        :returns: the changed version and the deletion result
+        """
+        if dataset['delta_size']:
+            dataset = self._compacted(dataset)
+
+        gdf = dataset['gdf']
+        kept = ~gdf[self.id_field].isin(list(identifiers))
+
+        kept = kept.to_numpy()
+
+        geojson = dataset['geojson']
+        if geojson is not None:
+            geojson = geojson[kept]
+
+        terms = dataset['terms']
+        if terms is not None:
+            terms = self._index_words(
+                terms,
+                gdf[kept],
+                dropped=~kept,
+                added=numpy.array([], dtype=int),
+                moved=numpy.cumsum(kept) - 1,
+            )
+
+        dataset = _new_dataset(
+            gdf[kept], wal=dataset['wal'], geojson=geojson, terms=terms
+        )
+        return dataset, True
+
     def __repr__(self):
         return f'<GeoPandasProvider> {self.type}'
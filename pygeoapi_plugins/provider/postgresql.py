@@ -35,39 +35,90 @@
 #
 # =================================================================
 
+import json
 import logging
+import threading
+import time
+from collections import OrderedDict
 
 import os
-from sqlalchemy import text, select
+from pygeofilter.ast import get_repr
+from sqlalchemy import and_, false, func, or_, select, text, tuple_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.sql.visitors import InternalTraversal
 
 from pygeoapi.provider.sql import PostgreSQLProvider
-from pygeoapi.provider.base import ProviderQueryError
-
-PSUEDO_COUNT_LIMIT = os.getenv('PSUEDO_COUNT_LIMIT', 5000000)
-COUNT_FUNCTION = """
-DROP FUNCTION IF EXISTS count_estimate;
-CREATE FUNCTION count_estimate(query text)
-  RETURNS integer
-  LANGUAGE plpgsql AS
-$func$
-DECLARE
-    rec   record;
-    rows  integer;
-BEGIN
-    FOR rec IN EXECUTE 'EXPLAIN ' || query LOOP
-        rows := substring(rec."QUERY PLAN" FROM ' rows=([[:digit:]]+)');
-        EXIT WHEN rows IS NOT NULL;
-    END LOOP;
-
-    RETURN rows;
-END
-$func$;
-"""
+from pygeoapi.provider.base import (
+    ProviderInvalidDataError,
+    ProviderQueryError,
+)
+
+PSUEDO_COUNT_LIMIT = int(os.getenv('PSUEDO_COUNT_LIMIT', 5000000))
+
+# How numberMatched is counted: "pseudo" estimates it and counts precisely
+# below PSUEDO_COUNT_LIMIT and for CQL and hits, "exact" always counts
+# precisely, "estimate" never does, "none" leaves it out, and
+# "exact-with-statement-timeout" counts precisely unless that takes longer
+# than count_timeout, and estimates it then
+COUNT_STRATEGIES = (
+    'pseudo',
+    'exact',
+    'estimate',
+    'none',
+    'exact-with-statement-timeout',
+)
+
+# Milliseconds the precise count of exact-with-statement-timeout may take
+COUNT_TIMEOUT = 1000
+
+# Counts are reused by requests of the same filters for this many seconds,
+# unless the provider config sets count_cache_ttl
+COUNT_CACHE_TTL = 60
+
+# Number of counts kept, least recently used first
+COUNT_CACHE_SIZE = int(os.getenv('COUNT_CACHE_SIZE', 1024))
+
+_COUNTS: OrderedDict[tuple, tuple[float, int]] = OrderedDict()
+_COUNTS_LOCK = threading.Lock()
+
+# Number of queries keyset pagination positions are kept for, least
+# recently used first, and number of positions kept for each of them.
+# Positions expire like counts, after count_cache_ttl seconds. They are kept
+# per process, so writes made elsewhere shift the rows an offset seeks to
+# until then
+KEYSET_CACHE_SIZE = int(os.getenv('KEYSET_CACHE_SIZE', 1024))
+KEYSET_POSITIONS = 64
+
+_KEYSETS: OrderedDict[tuple, dict[int, tuple[float, tuple]]] = OrderedDict()
+_KEYSETS_LOCK = threading.Lock()
+
+# Rows of a table as last estimated by VACUUM or ANALYZE
+RELTUPLES = text(
+    'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)'
+)
 
 LOGGER = logging.getLogger(__name__)
 
 
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement, with its parameters bound"""
+
+    inherit_cache = True
+    _traverse_internals = [('statement', InternalTraversal.dp_clauseelement)]
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element, compiler, **kw):
+    statement = compiler.process(element.statement, **kw)
+    return f'EXPLAIN (FORMAT JSON) {statement}'
+
+
 class PseudoPostgreSQLProvider(PostgreSQLProvider):
     """Generic provider for Postgresql based on psycopg2
     using sync approach and server side
@@ -88,6 +139,31 @@ class PseudoPostgreSQLProvider(PostgreSQLProvider):
         LOGGER.debug('Initialising Pseudo-count PostgreSQL provider.')
         super().__init__(provider_def)
 
+        self.count_cache_ttl = provider_def.get(
+            'count_cache_ttl', COUNT_CACHE_TTL
+        )
+
+        self.count_strategy = provider_def.get('count_strategy', 'pseudo')
+        if self.count_strategy not in COUNT_STRATEGIES:
+            raise ProviderInvalidDataError(
+                f'Invalid count_strategy {self.count_strategy}, expected '
+                f'one of {", ".join(COUNT_STRATEGIES)}'
+            )
+        self.count_timeout = int(
+            provider_def.get('count_timeout', COUNT_TIMEOUT)
+        )
+
+        # With keyset pagination, pages are ordered by the sortby columns
+        # and then the id field, and a page following one served before
+        # seeks past the last row of that page instead of skipping offset
+        # rows
+        self.pagination = provider_def.get('pagination', 'offset')
+        if self.pagination not in ('offset', 'keyset'):
+            raise ProviderInvalidDataError(
+                f'Invalid pagination {self.pagination}, expected '
+                'offset or keyset'
+            )
+
     def query(
         self,
         offset=0,
@@ -131,6 +207,12 @@ class PseudoPostgreSQLProvider(PostgreSQLProvider):
         bbox_filter = self._get_bbox_filter(bbox)
         time_filter = self._get_datetime_filter(datetime_)
         order_by_clauses = self._get_order_by_clauses(sortby, self.table_model)
+        if self.pagination == 'keyset':
+            keyset = self._get_keyset(sortby)
+            order_by_clauses = [
+                column.desc() if desc else column.asc()
+                for column, desc in keyset
+            ]
         selected_properties = self._select_properties_clause(
             select_properties, skip_geometry
         )
@@ -147,21 +229,14 @@ class PseudoPostgreSQLProvider(PostgreSQLProvider):
                 .options(selected_properties)
             )
 
-            try:
-                if filterq:
-                    raise ProviderQueryError('No Pseudo-count during CQL')
-                elif resulttype == 'hits':
-                    raise ProviderQueryError('No Pseudo-count during hits')
-
-                matched = self._get_pseudo_count(results)
-
-            except ProviderQueryError as err:
-                LOGGER.warning(f'Warning during psuedo-count {err}')
-                matched = results.count()
-
-            except Exception as err:
-                LOGGER.warning(f'Error during psuedo-count {err}')
-                matched = results.count()
+            filtered = bool(filterq or properties or bbox or datetime_)
+            key = self._count_key(
+                resulttype, bbox, datetime_, properties, filterq
+            )
+            matched = self._cached_count(key)
+            if matched is None and self.count_strategy != 'none':
+                matched = self._count(results, resulttype, filterq, filtered)
+                self._cache_count(key, matched)
 
             LOGGER.debug(f'Found {matched} result(s)')
 
@@ -172,42 +247,422 @@ class PseudoPostgreSQLProvider(PostgreSQLProvider):
                 'numberMatched': matched,
                 'numberReturned': 0,
             }
+            if matched is None:
+                del response['numberMatched']
 
             if resulttype == 'hits' or not results:
                 return response
 
             crs_transform_out = self._get_crs_transform(crs_transform_spec)
 
-            for item in (
-                results.order_by(*order_by_clauses).offset(offset).limit(limit)
-            ):
+            page = results.order_by(*order_by_clauses)
+            position, start = None, 0
+            if self.pagination == 'keyset':
+                position = self._filters_key(
+                    bbox, datetime_, properties, filterq
+                ) + (tuple((column.key, desc) for column, desc in keyset),)
+                start, after = self._get_position(position, offset)
+                if after is not None:
+                    # Seek past the last row of the nearest page served
+                    # before, rather than skipping every row up to offset
+                    page = page.filter(self._get_seek_filter(keyset, after))
+
+            item = None
+            for item in page.offset(offset - start).limit(limit):
                 response['numberReturned'] += 1
                 response['features'].append(
                     self._sqlalchemy_to_feature(item, crs_transform_out)
                 )
 
+            if position is not None and item is not None:
+                self._keep_position(
+                    position,
+                    offset + response['numberReturned'],
+                    tuple(getattr(item, column.key) for column, _ in keyset),
+                )
+
         return response
 
-    def _get_pseudo_count(self, results):
+    def _filters_key(self, bbox, datetime_, properties, filterq):
         """
-        This function calculates the pseudo-count by executing a SQL query on
-        the PostGIS database. If the obtained pseudo-count is less than a
-        predefined limit, the function falls back to using the precise count.
+        Key a query by its table and filters
 
-        :param results: Results object containing the query results
+        :param bbox: bounding box [minx,miny,maxx,maxy]
+        :param datetime_: temporal (datestamp or extent)
+        :param properties: list of tuples (name, value)
+        :param filterq: CQL query
 
-        :returns matched: `int` of the pseudo-count for the given results
+        :returns: `tuple` of the table and the normalized filters
         """
-        LOGGER.debug('Getting pseudo-count')
-        compiled = results.statement.compile(
-            self._engine, compile_kwargs={'literal_binds': True}
+        if filterq is not None and not isinstance(filterq, str):
+            filterq = get_repr(filterq)
+
+        return (
+            repr(self._engine.url),
+            self.table,
+            tuple(float(coord) for coord in bbox or []),
+            datetime_,
+            tuple(sorted((name, str(value)) for name, value in properties)),
+            filterq,
+        )
+
+    def _count_key(self, resulttype, bbox, datetime_, properties, filterq):
+        """
+        Key the count of a query by its filters
+
+        :param resulttype: return results or hit limit
+        :param bbox: bounding box [minx,miny,maxx,maxy]
+        :param datetime_: temporal (datestamp or extent)
+        :param properties: list of tuples (name, value)
+        :param filterq: CQL query
+
+        :returns: `tuple` of the table, the normalized filters and how
+                  they are counted
+        """
+        return self._filters_key(bbox, datetime_, properties, filterq) + (
+            self.count_strategy,
+            # Hits are counted precisely by the pseudo strategy
+            resulttype == 'hits',
         )
 
-        with Session(self._engine) as s:
-            s.execute(COUNT_FUNCTION)
-            compiled_query = select(text(f"count_estimate('{compiled}')"))
-            matched = s.execute(compiled_query).scalar()
+    def _cached_count(self, key):
+        """
+        Count of a query made within the count cache TTL
+
+        :param key: count key of the query
+
+        :returns: `int` of the count, or None if there is none
+        """
+        with _COUNTS_LOCK:
+            cached = _COUNTS.get(key)
+            if cached is None:
+                return None
+
+            expires, matched = cached
+            if expires < time.monotonic():
+                del _COUNTS[key]
+                return None
+
+            _COUNTS.move_to_end(key)
+            return matched
+
+    def _cache_count(self, key, matched):
+        """
+        Keep the count of a query for the count cache TTL
+
+        :param key: count key of the query
+        :param matched: `int` of the count
+        """
+        if not self.count_cache_ttl:
+            return
+
+        with _COUNTS_LOCK:
+            _COUNTS[key] = (time.monotonic() + self.count_cache_ttl, matched)
+            _COUNTS.move_to_end(key)
+            while len(_COUNTS) > COUNT_CACHE_SIZE:
+                _COUNTS.popitem(last=False)
+
+    def _clear_cache(self):
+        """
+        Drop the cached counts and keyset positions of the table, after it
+        is written to
+        """
+        table = (repr(self._engine.url), self.table)
+        with _COUNTS_LOCK:
+            for key in [key for key in _COUNTS if key[:2] == table]:
+                del _COUNTS[key]
+        # Rows created or deleted shift the offsets of the rows after them
+        with _KEYSETS_LOCK:
+            for key in [key for key in _KEYSETS if key[:2] == table]:
+                del _KEYSETS[key]
+
+    def create(self, item):
+        """
+        Create a new item, dropping the cached counts and keyset positions
+        of the table
+
+        :param item: `dict` of new item
+
+        :returns: identifier of created item
+        """
+        identifier = super().create(item)
+        self._clear_cache()
+        return identifier
+
+    def update(self, identifier, item):
+        """
+        Update an existing item, dropping the cached counts and keyset
+        positions of the table
+
+        :param identifier: feature id
+        :param item: `dict` of partial or full item
+
+        :returns: `bool` of update result
+        """
+        updated = super().update(identifier, item)
+        self._clear_cache()
+        return updated
+
+    def delete(self, identifier):
+        """
+        Delete an existing item, dropping the cached counts and keyset
+        positions of the table
+
+        :param identifier: item id
 
+        :returns: `bool` of deletion result
+        """
+        deleted = super().delete(identifier)
+        self._clear_cache()
+        return deleted
+
+    def _get_keyset(self, sortby):
+        """
+        Columns pages are ordered by with keyset pagination
+
+        :param sortby: list of dicts (property, order)
+
+        :returns: list of tuples (column, `bool` of descending order),
+                  ending with the id field so the order is unique
+        """
+        keyset = [
+            (getattr(self.table_model, sort['property']), sort['order'] == '-')
+            for sort in sortby
+        ]
+        if self.id_field not in [sort['property'] for sort in sortby]:
+            keyset.append((getattr(self.table_model, self.id_field), False))
+
+        return keyset
+
+    def _get_seek_filter(self, keyset, after):
+        """
+        Filter the rows following a row in the keyset order
+
+        PostgreSQL sorts nulls after every value in ascending order and
+        before them in descending order, and the filter follows suit.
+
+        :param keyset: list of tuples (column, `bool` of descending order)
+        :param after: `tuple` of the keyset values of the row
+
+        :returns: SQL Alchemy filter of the following rows
+        """
+        columns = self.table_model.__table__.columns
+        nullable = any(columns[column.key].nullable for column, _ in keyset)
+        if len({desc for _, desc in keyset}) == 1 and not nullable:
+            # A row comparison can be answered by a single index scan
+            columns = tuple_(*(column for column, _ in keyset))
+            if keyset[0][1]:
+                return columns < tuple_(*after)
+            return columns > tuple_(*after)
+
+        # Otherwise, the rows equal on the first columns and after the row
+        # on the next one
+        clauses = []
+        for i, (column, desc) in enumerate(keyset):
+            value = after[i]
+            if value is None:
+                if not desc:
+                    # Nothing follows nulls in ascending order
+                    continue
+                following = column.is_not(None)
+            elif desc:
+                following = column < value
+            else:
+                following = or_(column > value, column.is_(None))
+
+            equal = [
+                previous.is_not_distinct_from(previous_value)
+                for (previous, _), previous_value in zip(keyset[:i], after)
+            ]
+            clauses.append(and_(*equal, following))
+
+        return or_(false(), *clauses)
+
+    def _get_position(self, position, offset):
+        """
+        Nearest position at or before an offset a page of the query ended
+
+        Workers each keep the positions of the pages they served, so a
+        client paging through several workers is only a few pages ahead
+        of the last position the worker it reaches knows.
+
+        :param position: `tuple` of the filters and keyset columns
+        :param offset: starting record of the page
+
+        :returns: `tuple` of the offset of the position and the keyset
+                  values of the row before it, (0, None) if there is none
+        """
+        with _KEYSETS_LOCK:
+            offsets = _KEYSETS.get(position)
+            if offsets is None:
+                return 0, None
+
+            now = time.monotonic()
+            for expired in [
+                o for o, (expires, _) in offsets.items() if expires < now
+            ]:
+                del offsets[expired]
+
+            _KEYSETS.move_to_end(position)
+            start = max((o for o in offsets if o <= offset), default=None)
+            if start is None:
+                return 0, None
+
+            _, after = offsets[start]
+            return start, after
+
+    def _keep_position(self, position, offset, after):
+        """
+        Keep the keyset values of the last row of a page
+
+        :param position: `tuple` of the filters and keyset columns
+        :param offset: starting record of the page following the row
+        :param after: `tuple` of the keyset values of the row
+        """
+        if not self.count_cache_ttl:
+            return
+
+        with _KEYSETS_LOCK:
+            offsets = _KEYSETS.setdefault(position, {})
+            offsets.pop(offset, None)
+            offsets[offset] = (time.monotonic() + self.count_cache_ttl, after)
+            while len(offsets) > KEYSET_POSITIONS:
+                del offsets[next(iter(offsets))]
+
+            _KEYSETS.move_to_end(position)
+            while len(_KEYSETS) > KEYSET_CACHE_SIZE:
+                _KEYSETS.popitem(last=False)
+
+    def _count(self, results, resulttype, filterq, filtered):
+        """
+        Count the results with the count strategy of the provider
+
+        :param results: Results object containing the query results
+        :param resulttype: return results or hit limit
+        :param filterq: CQL query
+        :param filtered: `bool` of whether the results are filtered
+
+        :returns matched: `int` of the count of the results, or None if
+                          it is left out
+        """
+        if self.count_strategy == 'exact':
+            return results.count()
+        elif self.count_strategy in (
+            'estimate',
+            'exact-with-statement-timeout',
+        ):
+            # These strategies exist to never scan the whole result, so
+            # rather than counting precisely when they fail, the count is
+            # left out
+            try:
+                with results.session.begin_nested():
+                    matched = None
+                    if self.count_strategy != 'estimate':
+                        matched = self._get_timed_count(results)
+                    if matched is None:
+                        matched = self._get_estimate(results, filtered)
+            except Exception as err:
+                LOGGER.warning(f'Error during count, leaving it out: {err}')
+                return None
+
+            return matched
+
+        try:
+            if filterq:
+                raise ProviderQueryError('No Pseudo-count during CQL')
+            elif resulttype == 'hits':
+                raise ProviderQueryError('No Pseudo-count during hits')
+
+            # A failed lookup only rolls back to the savepoint, leaving the
+            # transaction usable for the exact count
+            with results.session.begin_nested():
+                return self._get_pseudo_count(results, filtered)
+
+        except ProviderQueryError as err:
+            LOGGER.warning(f'Warning during psuedo-count {err}')
+            return results.count()
+
+        except Exception as err:
+            LOGGER.warning(f'Error during psuedo-count {err}')
+            return results.count()
+
+    def _get_timed_count(self, results):
+        """
+        Count the results precisely, unless it takes longer than
+        count_timeout
+
+        :param results: Results object containing the query results
+
+        :returns matched: `int` of the count, or None if it timed out
+        """
+        session = results.session
+        timeout = session.execute(
+            select(func.current_setting('statement_timeout'))
+        ).scalar()
+
+        try:
+            # A cancelled count only rolls back to the savepoint, which
+            # also resets the timeout
+            with session.begin_nested():
+                session.execute(
+                    select(
+                        func.set_config(
+                            'statement_timeout', str(self.count_timeout), True
+                        )
+                    )
+                )
+                matched = results.count()
+                session.execute(
+                    select(func.set_config('statement_timeout', timeout, True))
+                )
+        except OperationalError as err:
+            LOGGER.warning(f'Precise count timed out, estimating it: {err}')
+            return None
+
+        return matched
+
+    def _get_estimate(self, results, filtered=True):
+        """
+        Estimate the count of the results without counting them
+
+        :param results: Results object containing the query results
+        :param filtered: `bool` of whether the results are filtered
+
+        :returns matched: `int` of the estimated count
+        """
+        matched = None
+        if not filtered:
+            # The statistics of the table estimate all of its rows, -1 if
+            # it has not been analyzed yet
+            table = self.table_model.__table__.fullname
+            matched = results.session.execute(
+                RELTUPLES, {'table': table}
+            ).scalar()
+        if matched is None or matched < 0:
+            # The planner estimates the rows of the statement as it is run,
+            # with its parameters bound rather than rendered into the SQL
+            explain = Explain(results.statement)
+            plan = results.session.execute(explain).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            matched = plan[0]['Plan']['Plan Rows']
+
+        return matched
+
+    def _get_pseudo_count(self, results, filtered=True):
+        """
+        This function calculates the pseudo-count from the row estimate of
+        the plan PostGIS makes for the query. If the obtained pseudo-count is
+        less than a predefined limit, the function falls back to using the
+        precise count.
+
+        :param results: Results object containing the query results
+        :param filtered: `bool` of whether the results are filtered
+
+        :returns matched: `int` of the pseudo-count for the given results
+        """
+        LOGGER.debug('Getting pseudo-count')
+        matched = self._get_estimate(results, filtered)
         if matched < PSUEDO_COUNT_LIMIT:
             LOGGER.debug('Using precise count')
             matched = results.count()
@@ -0,0 +1,795 @@
+# =================================================================
+#
+# Authors: Colton Loftus
+#
+# Copyright (c) 2025 Colton Loftus
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+# Benchmarks for the GeoPandas provider. These are not collected by pytest,
+# run them from the repository root with:
+#
+#     python tests/benchmark_geopandas_provider.py
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from pygeoapi_plugins.provider.geopandas_ import GeoPandasProvider
+
+SIZES = [1_000, 10_000, 100_000]
+
+GPKG_CONFIG = {
+    'name': 'gpkg',
+    'type': 'feature',
+    'data': 'tests/data/hu02.gpkg',
+    'id_field': 'HUC2',
+}
+
+
+def synthetic_frame(size: int, seed: int = 0) -> gpd.GeoDataFrame:
+    """Build a frame with the hu02.gpkg schema and random point geometry"""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(-125, -66, size)
+    y = rng.uniform(24, 50, size)
+    return gpd.GeoDataFrame(
+        {
+            'uri': [f'https://example.com/{i}' for i in range(size)],
+            'NAME': rng.choice(['Alpha', 'Bravo', 'Charlie'], size),
+            'gnis_url': ['_'] * size,
+            'GNIS_ID': rng.integers(0, 1_000_000, size),
+            'HUC2': [str(i) for i in range(size)],
+            'LOADDATE': gpd.pd.to_datetime(
+                rng.integers(1.2e9, 1.7e9, size), unit='s', utc=True
+            ),
+            'geometry': shapely.points(x, y),
+        },
+        crs='EPSG:4326',
+    )
+
+
+def synthetic_provider(size: int) -> GeoPandasProvider:
+    p = GeoPandasProvider(GPKG_CONFIG)
+    p.gdf = synthetic_frame(size)
+    return p
+
+
+def timeit(func, repeat: int = 3) -> float:
+    """Best wall clock time of `repeat` runs in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def iterrows_features(p: GeoPandasProvider, df: gpd.GeoDataFrame) -> list:
+    """The row by row serialization GeoPandasProvider.query used to do"""
+    features = []
+    for _, row in df.iterrows():
+        feature = {
+            'type': 'Feature',
+            'id': str(row[p.id_field]),
+            'properties': OrderedDict(),
+            'geometry': {'type': None, 'coordinates': None},
+        }
+        feature['geometry']['coordinates'] = shapely.to_geojson(
+            row[p.geometry_col]
+        )
+        feature['geometry']['type'] = row[p.geometry_col].geom_type
+        for key, value in row.items():
+            if key not in p._exclude_from_properties:
+                feature['properties'][key] = value
+        features.append(feature)
+    return features
+
+
+def bench_serialization():
+    print('## Feature serialization (iterrows vs columnar)')
+    print(f'{"rows":>10} {"iterrows ms":>12} {"columnar ms":>12} {"x":>6}')
+    for size in SIZES:
+        p = synthetic_provider(size)
+        df = p.gdf
+
+        expected = json.dumps(iterrows_features(p, df), default=str)
+        assert json.dumps(p._to_features(df), default=str) == expected
+
+        before = timeit(lambda: iterrows_features(p, df), repeat=1)
+        after = timeit(lambda: p._to_features(df))
+        print(
+            f'{size:>10} {before:>12.1f} {after:>12.1f} {before / after:>6.1f}'
+        )
+
+
+def bench_paging():
+    print('## /items page of 10 features')
+    print(f'{"rows":>10} {"first page ms":>14} {"deep page ms":>14}')
+    for size in SIZES:
+        p = synthetic_provider(size)
+        first = timeit(lambda: p.query(limit=10))
+        deep = timeit(lambda: p.query(offset=size - 10, limit=10))
+        print(f'{size:>10} {first:>14.2f} {deep:>14.2f}')
+
+
+def bench_bbox():
+    print('## bbox filter (GeoSeries.intersects vs spatial index)')
+    print(f'{"rows":>10} {"intersects ms":>14} {"sindex ms":>10} {"x":>6}')
+    bbox = (-74.881, 40.566, -71.249, 41.27)
+    bbox_geom = shapely.box(*bbox)
+    frames = [('hu02.gpkg', GeoPandasProvider(GPKG_CONFIG))]
+    frames += [(size, synthetic_provider(size)) for size in SIZES]
+    for name, p in frames:
+        df = p.gdf
+        p._bbox_positions(bbox)  # the provider builds its index up front
+
+        expected = np.flatnonzero(df['geometry'].intersects(bbox_geom))
+        assert (p._bbox_positions(bbox) == expected).all()
+
+        before = timeit(lambda: df[df['geometry'].intersects(bbox_geom)])
+        after = timeit(lambda: p._take(df, p._bbox_positions(bbox)))
+        print(
+            f'{name:>10} {before:>14.2f} {after:>10.2f} {before / after:>6.1f}'
+        )
+
+
+def bench_get():
+    print('## get by id (column scan vs id index)')
+    print(f'{"rows":>10} {"scan ms":>10} {"index ms":>10} {"x":>8}')
+    for size in SIZES:
+        p = synthetic_provider(size)
+        df = p.gdf
+        identifier = str(size // 2)
+        p.get(identifier)  # the provider builds its index up front
+
+        def scan():
+            return df[df[p.id_field].astype(str) == identifier].squeeze(axis=0)
+
+        before = timeit(scan)
+        after = timeit(lambda: p.get(identifier))
+        print(
+            f'{size:>10} {before:>10.3f} {after:>10.3f} {before / after:>8.1f}'
+        )
+
+
+def bench_property_filter():
+    print('## property filter (astype(str) vs typed comparison)')
+    print(
+        f'{"rows":>10} {"column":>8} {"astype ms":>10} {"typed ms":>10} '
+        f'{"x":>6}'
+    )
+    for size in SIZES:
+        p = synthetic_provider(size)
+        df = p.gdf
+        for column in ['GNIS_ID', 'NAME']:
+            value = str(df[column].iloc[size // 2])
+
+            expected = df[df[column].astype(str) == value]
+            assert p._filter_by_property(df, column, value).equals(expected)
+
+            before = timeit(lambda: df[df[column].astype(str) == value])
+            after = timeit(lambda: p._filter_by_property(df, column, value))
+            print(
+                f'{size:>10} {column:>8} {before:>10.2f} {after:>10.2f} '
+                f'{before / after:>6.1f}'
+            )
+
+
+def bench_date_filter():
+    print('## single date filter (str.startswith vs time index)')
+    print(
+        f'{"rows":>10} {"date":>10} {"startswith ms":>14} {"index ms":>10} '
+        f'{"x":>6}'
+    )
+    for size in SIZES:
+        p = synthetic_provider(size)
+        df = p.gdf
+        p._filter_by_date(df, '2019')  # the provider builds its index up front
+        for date in ['2019', '2019-10', '2019-10-10']:
+
+            def startswith():
+                return df[df['LOADDATE'].astype(str).str.startswith(date)]
+
+            assert p._filter_by_date(df, date).equals(startswith())
+
+            before = timeit(startswith)
+            after = timeit(lambda: p._filter_by_date(df, date))
+            print(
+                f'{size:>10} {date:>10} {before:>14.2f} {after:>10.2f} '
+                f'{before / after:>6.1f}'
+            )
+
+
+def bench_planner():
+    print(
+        '## hits with property, bbox and date filters (fixed order vs planned)'
+    )
+    print(f'{"rows":>10} {"fixed ms":>10} {"planned ms":>11} {"x":>6}')
+    bbox = (-80, 35, -75, 40)
+    for size in SIZES:
+        p = synthetic_provider(size)
+        p.query(bbox=bbox, datetime_='2019')  # the provider builds its indexes
+
+        def fixed():
+            df = p._filter_by_property(p.gdf, 'NAME', 'Alpha')
+            df = p._take(df, p._bbox_positions(bbox))
+            return p._filter_by_date(df, '2019-10')
+
+        def planned():
+            return p.query(
+                resulttype='hits',
+                bbox=bbox,
+                datetime_='2019-10',
+                properties=[('NAME', 'Alpha')],
+            )
+
+        assert planned()['numberMatched'] == len(fixed())
+
+        before = timeit(fixed)
+        after = timeit(planned)
+        print(
+            f'{size:>10} {before:>10.2f} {after:>11.2f} {before / after:>6.1f}'
+        )
+
+
+def bench_sort():
+    print(
+        '## sorted page of 10 features (sort_values vs top-k and kept order)'
+    )
+    print(
+        f'{"rows":>10} {"sort_values ms":>15} {"top-k ms":>9} '
+        f'{"kept order ms":>14}'
+    )
+    sortby = [
+        {'property': 'NAME', 'order': '+'},
+        {'property': 'LOADDATE', 'order': '-'},
+    ]
+    for size in SIZES:
+        p = synthetic_provider(size)
+        df = p.gdf
+        offset = size // 2
+
+        def sort_values():
+            ordered = df.sort_values(
+                by=['NAME', 'LOADDATE'], ascending=[True, False]
+            )
+            return ordered.iloc[offset : offset + 10]
+
+        def top_k():
+            return df.iloc[p._argsort(df, sortby, offset + 10)[offset:]]
+
+        before = timeit(sort_values)
+        partial = timeit(top_k)
+        p.query(sortby=sortby)  # keeps the sort order for later pages
+        kept = timeit(lambda: p.query(offset=offset, sortby=sortby))
+        print(f'{size:>10} {before:>15.2f} {partial:>9.2f} {kept:>14.2f}')
+
+
+LOAD_SCRIPT = """
+import sys, time
+from pygeoapi_plugins.provider.geopandas_ import GeoPandasProvider
+start = time.perf_counter()
+p = GeoPandasProvider({
+    'name': 'gpkg', 'type': 'feature', 'data': sys.argv[1],
+    'id_field': 'HUC2', 'lazy': sys.argv[2] == 'lazy',
+})
+startup = time.perf_counter() - start
+start = time.perf_counter()
+p.query(bbox=[-100, 30, -99, 31], properties=[('NAME', 'Alpha')])
+query = time.perf_counter() - start
+# ru_maxrss survives exec, so read the high water mark of this image
+with open('/proc/self/status') as status:
+    hwm = next(line for line in status if line.startswith('VmHWM'))
+rss = int(hwm.split()[1]) / 1024
+print(startup * 1000, query * 1000, rss)
+"""
+
+
+def bench_lazy():
+    print('\nstartup, bbox query and peak RSS of a fresh process')
+    print(
+        f'{"rows":>10} {"mode":>6} {"startup ms":>11} {"query ms":>9} '
+        f'{"RSS MB":>7}'
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            data = os.path.join(tmp, f'{size}.gpkg')
+            synthetic_frame(size).to_file(data)
+            for mode in ('eager', 'lazy'):
+                output = subprocess.run(
+                    [sys.executable, '-c', LOAD_SCRIPT, data, mode],
+                    capture_output=True,
+                    check=True,
+                    text=True,
+                ).stdout
+                startup, query, rss = map(float, output.split())
+                print(
+                    f'{size:>10} {mode:>6} {startup:>11.2f} '
+                    f'{query:>9.2f} {rss:>7.1f}'
+                )
+
+
+def bench_parquet():
+    print('\nGeoParquet with 10k row groups, clustered by the filtered column')
+    print(
+        f'{"rows":>10} {"load ms":>8} {"eager bbox":>11} {"lazy bbox":>10} '
+        f'{"eager date":>11} {"lazy date":>10}'
+    )
+    queries = {
+        'x': {'bbox': [-100, 30, -99, 31]},
+        'LOADDATE': {'datetime_': '2012-06-01'},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES[1:] + [1_000_000]:
+            frame = synthetic_frame(size)
+            frame['x'] = frame.geometry.x
+            timings = []
+            for column, kwargs in queries.items():
+                data = os.path.join(tmp, f'{size}_{column}.parquet')
+                frame.sort_values(column).drop(columns='x').to_parquet(
+                    data, write_covering_bbox=True, row_group_size=10_000
+                )
+                config = {**GPKG_CONFIG, 'data': data}
+
+                start = time.perf_counter()
+                eager = GeoPandasProvider(config)
+                load = (time.perf_counter() - start) * 1000
+                lazy = GeoPandasProvider({**config, 'lazy': True})
+
+                timings += [
+                    timeit(lambda: p.query(**kwargs)) for p in (eager, lazy)
+                ]
+            print(
+                f'{size:>10} {load:>8.0f} {timings[0]:>11.2f} '
+                f'{timings[1]:>10.2f} {timings[2]:>11.2f} {timings[3]:>10.2f}'
+            )
+
+
+def bench_create():
+    print('\ncreate 1000 rows, then query: ms per created row')
+    print(f'{"rows":>10} {"concat per row":>15} {"buffered":>9}')
+    for size in SIZES:
+        frame = synthetic_frame(size)
+        rows = synthetic_frame(1000, seed=1).to_dict('records')
+
+        def concat_per_row():
+            gdf = frame
+            for row in rows:
+                new_row = gpd.GeoDataFrame([row], crs=gdf.crs)
+                gdf = gpd.pd.concat([gdf, new_row], ignore_index=True)
+
+        def buffered():
+            p = synthetic_provider(0)
+            p.gdf = frame
+            for row in rows:
+                p.create(row)
+            p.query(limit=1)
+
+        before = timeit(concat_per_row, repeat=1) / len(rows)
+        after = timeit(buffered, repeat=1) / len(rows)
+        print(f'{size:>10} {before:>15.3f} {after:>9.3f}')
+
+
+def bench_batch():
+    print('\n1000 updates and deletes: one call per item vs one batch, ms')
+    print(
+        f'{"rows":>10} {"update":>9} {"update_many":>12} '
+        f'{"delete":>9} {"delete_many":>12}'
+    )
+    for size in SIZES:
+        frame = synthetic_frame(size)
+        rows = frame.iloc[: min(size, 1000)].to_dict('records')
+        updates = {row['HUC2']: {**row, 'NAME': 'Delta'} for row in rows}
+
+        def provider():
+            p = synthetic_provider(0)
+            p.gdf = frame
+            return p
+
+        def each(method, args):
+            p = provider()
+            for arg in args:
+                method(p, *arg)
+
+        timings = [
+            timeit(lambda: each(GeoPandasProvider.update, updates.items()), 1),
+            timeit(lambda: provider().update_many(updates), 1),
+            timeit(
+                lambda: each(GeoPandasProvider.delete, [[i] for i in updates]),
+                1,
+            ),
+            timeit(lambda: provider().delete_many(list(updates)), 1),
+        ]
+        print(
+            f'{size:>10} {timings[0]:>9.0f} {timings[1]:>12.1f} '
+            f'{timings[2]:>9.0f} {timings[3]:>12.1f}'
+        )
+
+
+def bench_wal():
+    import pygeoapi_plugins.provider.geopandas_ as module
+
+    print('\nwrite-ahead log of 1000 creates on a 100k row GeoPackage, ms')
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.path.join(tmp, 'source.gpkg')
+        frame = synthetic_frame(100_000)
+        frame.to_file(data)
+        rows = synthetic_frame(1000, seed=1).to_dict('records')
+        config = {**GPKG_CONFIG, 'data': data, 'wal': data + '.wal'}
+
+        p = GeoPandasProvider(config)
+        start = time.perf_counter()
+        for row in rows:
+            p.create(row)
+        create = (time.perf_counter() - start) * 1000 / len(rows)
+        print(f'create, logged and fsynced {create:>19.2f}')
+
+        shared = timeit(lambda: GeoPandasProvider(config))
+        print(f'new provider, log unchanged {shared:>18.2f}')
+
+        def restart():
+            module._DATASETS.clear()
+            GeoPandasProvider(config)
+
+        print(f'restart, source and 1000 entries {timeit(restart):>13.2f}')
+
+        p = GeoPandasProvider({**config, 'wal_compact_size': 1})
+        p.create(rows[0])
+        print(f'restart, from the checkpoint {timeit(restart):>17.2f}')
+
+
+WORKER_SCRIPT = """
+import sys
+from pygeoapi_plugins.provider.geopandas_ import GeoPandasProvider
+p = GeoPandasProvider({
+    'name': 'gpkg', 'type': 'feature', 'data': sys.argv[1],
+    'id_field': 'HUC2', 'shared_memory': sys.argv[2] or None,
+})
+p.query(bbox=[-100, 30, -99, 31], limit=100)
+print('ready', flush=True)
+sys.stdin.read()
+"""
+
+
+def memory(pid: int) -> tuple[float, float]:
+    """RSS and proportional set size of a process, in MB"""
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        fields = dict(line.split()[:2] for line in rollup if ':' in line)
+    return int(fields['Rss:']) / 1024, int(fields['Pss:']) / 1024
+
+
+def bench_shared_memory(workers: int = 4):
+    print(f'\nmemory of {workers} workers serving the same source')
+    print(
+        f'{"rows":>10} {"mode":>7} {"RSS MB":>8} {"PSS MB":>8} '
+        f'{"total PSS MB":>13}'
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            data = os.path.join(tmp, f'{size}.gpkg')
+            synthetic_frame(size).to_file(data)
+            shared_memory = os.path.join(tmp, f'{size}.arrow')
+            for mode, path in (('eager', ''), ('shared', shared_memory)):
+                procs = [
+                    subprocess.Popen(
+                        [sys.executable, '-c', WORKER_SCRIPT, data, path],
+                        stdin=subprocess.PIPE,
+                        stdout=subprocess.PIPE,
+                        text=True,
+                    )
+                    for _ in range(workers)
+                ]
+                for proc in procs:
+                    proc.stdout.readline()
+                usage = [memory(proc.pid) for proc in procs]
+                for proc in procs:
+                    proc.communicate('')
+                rss = sum(u[0] for u in usage) / workers
+                pss = sum(u[1] for u in usage)
+                print(
+                    f'{size:>10} {mode:>7} {rss:>8.1f} '
+                    f'{pss / workers:>8.1f} {pss:>13.1f}'
+                )
+
+
+def bench_geometry_cache():
+    print('## GeoJSON geometry cache (100 feature page)')
+    print(
+        f'{"dataset":>10} {"mode":>10} {"encode ms":>10} {"cache MB":>9} '
+        f'{"page ms":>8}'
+    )
+    datasets = [('hu02', GeoPandasProvider(GPKG_CONFIG).gdf)] + [
+        (str(size), synthetic_frame(size)) for size in SIZES
+    ]
+    for name, gdf in datasets:
+        for mode, cache, precision in [
+            ('off', False, None),
+            ('on', True, None),
+            ('on, 1e-5', True, 5),
+        ]:
+            p = GeoPandasProvider(GPKG_CONFIG)
+            p.gdf = gdf
+            p.geometry_cache, p.geometry_precision = cache, precision
+            positions = np.arange(len(gdf))
+            encode = timeit(lambda: p._geojson(positions), repeat=1)
+            if not cache:
+                encode, size = 0, 0
+            else:
+                size = sum(
+                    sys.getsizeof(geojson)
+                    for _, geojson in p._geojson(positions)
+                )
+            page = timeit(lambda: p.query(limit=100))
+            print(
+                f'{name:>10} {mode:>10} {encode:>10.1f} '
+                f'{size / 2**20:>9.1f} {page:>8.2f}'
+            )
+
+
+PLACES_CONFIG = {
+    'name': 'places',
+    'type': 'feature',
+    'data': 'tests/data/ne_110m_populated_places_simple.geojson',
+    'id_field': 'nameascii',
+    'q_fields': ['name', 'adm0name', 'adm1name'],
+}
+
+
+def scaled_places(size: int, seed: int = 0) -> gpd.GeoDataFrame:
+    """Repeat the populated places with random words added to their names"""
+    rng = np.random.default_rng(seed)
+    places = gpd.read_file(PLACES_CONFIG['data'])
+    gdf = places.iloc[np.arange(size) % len(places)].reset_index(drop=True)
+    syllables = np.array(['ka', 'lo', 'ri', 'ten', 'ba', 'mu', 'sa', 'vel'])
+    words = [
+        ''.join(word)
+        for word in rng.choice(syllables, size=(size * 2, 3)).tolist()
+    ]
+    gdf['name'] = gdf['name'] + ' ' + pd.Series(words[:size])
+    gdf['adm1name'] = pd.Series(words[size:])
+    gdf['nameascii'] = [str(i) for i in range(size)]
+    return gdf
+
+
+def naive_q(p: GeoPandasProvider, q: str) -> int:
+    """Scan every string column for every word of q"""
+    mask = np.ones(len(p.gdf), dtype=bool)
+    for word in q.lower().split():
+        found = np.zeros(len(p.gdf), dtype=bool)
+        for col in p.q_fields:
+            found |= p.gdf[col].str.lower().str.contains(word, regex=False)
+        mask &= found
+    return int(mask.sum())
+
+
+def bench_q():
+    print('## q full-text search (scan vs inverted index)')
+    print(
+        f'{"rows":>10} {"build ms":>9} {"index MB":>9} {"q":>18} '
+        f'{"scan ms":>8} {"lookup ms":>10} {"hits ms":>8} {"matched":>8}'
+    )
+    for size in SIZES:
+        p = GeoPandasProvider(PLACES_CONFIG)
+        p.gdf = scaled_places(size)
+        build = timeit(lambda: p._terms, repeat=1)
+        vocabulary, offsets, positions = p._terms
+        memory = (offsets.nbytes + positions.nbytes) / 2**20
+        for q in ['luxembourg', 'san marino karilo', 'city vatican']:
+            scan = timeit(lambda: naive_q(p, q))
+            lookup = timeit(lambda: p._q_positions(q))
+            hits = timeit(lambda: p.query(q=q, resulttype='hits'))
+            matched = p.query(q=q, resulttype='hits')['numberMatched']
+            print(
+                f'{size:>10} {build:>9.1f} {memory:>9.1f} {q:>18} '
+                f'{scan:>8.2f} {lookup:>10.3f} {hits:>8.2f} {matched:>8}'
+            )
+
+
+CQL_FILTERS = [
+    "NAME LIKE 'Br%' AND GNIS_ID > 900000",
+    "HUC2 IN ('1', '2', '3') OR GNIS_ID BETWEEN 10 AND 20",
+    'S_INTERSECTS(geometry, POLYGON((-100 30, -99 30, -99 31, -100 31, '
+    '-100 30)))',
+]
+
+
+def bench_cql():
+    from pygeofilter.backends.geopandas.evaluate import to_filter
+    from pygeofilter.parsers.cql2_text import parse
+
+    print('## CQL2 filter (pygeofilter evaluator vs compiled, cached mask)')
+    print(
+        f'{"rows":>10} {"filter":>7} {"parse ms":>9} {"evaluator ms":>13} '
+        f'{"compiled ms":>12} {"text ms":>8}'
+    )
+    for size in SIZES:
+        p = synthetic_provider(size)
+        for i, cql_text in enumerate(CQL_FILTERS):
+            ast = parse(cql_text)
+            expected = int(to_filter(p.gdf, ast).sum())
+            assert (
+                p.query(filterq=ast, resulttype='hits')['numberMatched']
+                == expected
+            )
+
+            parsing = timeit(lambda: parse(cql_text))
+            before = timeit(lambda: p.gdf[to_filter(p.gdf, ast)])
+            after = timeit(lambda: p.query(filterq=ast, resulttype='hits'))
+            text = timeit(lambda: p.query(filterq=cql_text, resulttype='hits'))
+            print(
+                f'{size:>10} {i:>7} {parsing:>9.2f} {before:>13.2f} '
+                f'{after:>12.2f} {text:>8.2f}'
+            )
+
+
+def bench_schema_cache():
+    import pygeoapi_plugins.provider.geopandas_ as module
+
+    print('\ncold provider construction and first query, schema cached or not')
+    print(
+        f'{"rows":>10} {"mode":>7} {"startup ms":>11} {"first query ms":>15}'
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            data = os.path.join(tmp, f'{size}.gpkg')
+            synthetic_frame(size).to_file(data)
+            schema_cache = os.path.join(tmp, f'{size}.json')
+            config = {**GPKG_CONFIG, 'data': data}
+            for mode, extra in (
+                ('off', {}),
+                ('cached', {'schema_cache': schema_cache}),
+            ):
+                GeoPandasProvider({**config, **extra})
+                startup = query = float('inf')
+                for _ in range(3):
+                    module._DATASETS.clear()
+                    module._SCHEMAS.clear()
+                    start = time.perf_counter()
+                    p = GeoPandasProvider({**config, **extra})
+                    startup = min(startup, time.perf_counter() - start)
+                    start = time.perf_counter()
+                    p.query(limit=10)
+                    query = min(query, time.perf_counter() - start)
+                    del p
+                print(
+                    f'{size:>10} {mode:>7} {startup * 1000:>11.2f} '
+                    f'{query * 1000:>15.2f}'
+                )
+
+
+def bench_hot_reload():
+    import pygeoapi_plugins.provider.geopandas_ as module
+
+    print('\nlatency of the first request after the source changed')
+    print(f'{"rows":>10} {"mode":>7} {"request ms":>11} {"reload ms":>10}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            data = os.path.join(tmp, f'{size}.gpkg')
+            config = {**GPKG_CONFIG, 'data': data}
+            for mode, hot_reload in (('sync', False), ('hot', True)):
+                module._DATASETS.clear()
+                synthetic_frame(size).to_file(data)
+                config['hot_reload'] = hot_reload
+                GeoPandasProvider(config)
+                synthetic_frame(size, seed=1).to_file(data)
+
+                start = time.perf_counter()
+                GeoPandasProvider(config).query(limit=10)
+                request = time.perf_counter() - start
+                for reload in list(module._RELOADS.values()):
+                    reload.join()
+                reload = time.perf_counter() - start
+                print(
+                    f'{size:>10} {mode:>7} {request * 1000:>11.2f} '
+                    f'{reload * 1000:>10.2f}'
+                )
+
+
+STATION_CONFIG = {
+    'name': 'CSV',
+    'type': 'feature',
+    'data': 'tests/data/station_list.csv',
+    'id_field': 'wigos_station_identifier',
+    'geometry': {'x_field': 'longitude', 'y_field': 'latitude'},
+}
+
+
+def bench_xy():
+    print('\nx/y CSV mode: bbox filter and 1000 feature page')
+    print(
+        f'{"rows":>10} {"bbox before":>12} {"bbox after":>11} '
+        f'{"page before":>12} {"page after":>11}'
+    )
+    bbox = [-100, 30, -90, 40]
+    for size in SIZES + [2_000_000]:
+        rng = np.random.default_rng(0)
+        # CSV columns are read as strings
+        frame = pd.DataFrame(
+            {
+                'wigos_station_identifier': [f'0-{i}' for i in range(size)],
+                'station_name': rng.choice(['Alpha', 'Bravo'], size),
+                'longitude': rng.uniform(-125, -66, size).astype(str),
+                'latitude': rng.uniform(24, 50, size).astype(str),
+            }
+        )
+        p = GeoPandasProvider(STATION_CONFIG)
+        p.gdf = p._prepare(frame.copy())
+
+        def bbox_before():
+            points = shapely.points(
+                frame['longitude'].to_numpy(dtype='float64'),
+                frame['latitude'].to_numpy(dtype='float64'),
+            )
+            return frame[shapely.intersects(shapely.box(*bbox), points)]
+
+        def page_before():
+            return [
+                {
+                    'type': 'Point',
+                    'coordinates': [
+                        float(row['longitude']),
+                        float(row['latitude']),
+                    ],
+                }
+                for _, row in frame.iloc[:1000].iterrows()
+            ]
+
+        print(
+            f'{size:>10} {timeit(bbox_before):>12.2f} '
+            f'{timeit(lambda: p.query(bbox=bbox, resulttype="hits")):>11.2f} '
+            f'{timeit(page_before):>12.2f} '
+            f'{timeit(lambda: p.query(limit=1000)):>11.2f}'
+        )
+
+
+if __name__ == '__main__':
+    bench_serialization()
+    bench_paging()
+    bench_bbox()
+    bench_get()
+    bench_property_filter()
+    bench_date_filter()
+    bench_planner()
+    bench_sort()
+    bench_lazy()
+    bench_parquet()
+    bench_create()
+    bench_batch()
+    bench_wal()
+    bench_shared_memory()
+    bench_geometry_cache()
+    bench_q()
+    bench_cql()
+    bench_schema_cache()
+    bench_hot_reload()
+    bench_xy()
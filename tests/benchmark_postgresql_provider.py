@@ -0,0 +1,216 @@
+# =================================================================
+#
+# Authors: Just van den Broecke <justb4@gmail.com>
+#          Tom Kralidis <tomkralidis@gmail.com>
+#          John A Stevenson <jostev@bgs.ac.uk>
+#          Colin Blackburn <colb@bgs.ac.uk>
+#          Francesco Bartoli <xbartolone@gmail.com>
+#
+# Copyright (c) 2019 Just van den Broecke
+# Copyright (c) 2024 Tom Kralidis
+# Copyright (c) 2022 John A Stevenson and Colin Blackburn
+# Copyright (c) 2023 Francesco Bartoli
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+# Benchmarks for the pseudo-count PostgreSQL provider. These are not
+# collected by pytest. They need the test database described in
+# tests/test_postgresql_provider.py, e.g. a local PostGIS container, and
+# are run from the repository root with:
+#
+#     python tests/benchmark_postgresql_provider.py
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from pygeoapi_plugins.provider.postgresql import (
+    Explain,
+    PseudoPostgreSQLProvider,
+)
+
+# The server-side estimator pseudo-counts were taken with before they
+# were read from EXPLAIN of the bound statement
+COUNT_FUNCTION = """
+CREATE OR REPLACE FUNCTION count_estimate(query text)
+  RETURNS integer
+  LANGUAGE plpgsql AS
+$func$
+DECLARE
+    rec   record;
+    rows  integer;
+BEGIN
+    FOR rec IN EXECUTE 'EXPLAIN ' || query LOOP
+        rows := substring(rec."QUERY PLAN" FROM ' rows=([[:digit:]]+)');
+        EXIT WHEN rows IS NOT NULL;
+    END LOOP;
+
+    RETURN rows;
+END
+$func$;
+"""
+
+PASSWORD = os.environ.get('POSTGRESQL_PASSWORD', 'postgres')
+
+CONFIG = {
+    'name': 'PostgreSQL',
+    'type': 'feature',
+    'data': {
+        'host': '127.0.0.1',
+        'dbname': 'test',
+        'user': 'postgres',
+        'password': PASSWORD,
+        'search_path': ['osm', 'public'],
+    },
+    'options': {'connect_timeout': 10, 'pool_size': 16},
+    'id_field': 'osm_id',
+    'table': 'hotosm_bdi_waterways',
+    'geom_field': 'foo_geom',
+}
+
+CONCURRENCY = [1, 4, 16]
+
+REQUESTS = 200
+
+
+def throughput(func, workers: int, requests: int = REQUESTS) -> float:
+    """Requests per second of `requests` calls spread over `workers`"""
+    start = time.perf_counter()
+    failures = 0
+    with ThreadPoolExecutor(workers) as pool:
+        for future in [pool.submit(func) for _ in range(requests)]:
+            try:
+                future.result()
+            except Exception:
+                failures += 1
+    if failures:
+        print(f'{failures} of {requests} requests failed')
+    return requests / (time.perf_counter() - start)
+
+
+def bench_pseudo_count():
+    print('\npseudo-count of an IN list filter, requests per second')
+    print(
+        f'{"ids":>6} {"workers":>8} {"DDL per query":>14} '
+        f'{"function":>9} {"EXPLAIN":>8}'
+    )
+    p = PseudoPostgreSQLProvider(CONFIG)
+    with p._engine.begin() as conn:
+        conn.exec_driver_sql(COUNT_FUNCTION)
+
+    def estimate(ids: list, mode: str):
+        with Session(p._engine) as s:
+            results = s.query(p.table_model).filter(
+                p.table_model.osm_id.in_(ids)
+            )
+            if mode == 'explain':
+                s.execute(Explain(results.statement)).scalar()
+                return
+
+            compiled = results.statement.compile(
+                p._engine, compile_kwargs={'literal_binds': True}
+            )
+            if mode == 'ddl':
+                s.connection().exec_driver_sql(COUNT_FUNCTION)
+            s.execute(select(func.count_estimate(str(compiled)))).scalar()
+            s.commit()
+
+    for size in [10, 1_000, 10_000]:
+        ids = list(range(13990765, 13990765 + size))
+        for workers in CONCURRENCY:
+            rates = [
+                throughput(lambda: estimate(ids, mode), workers)
+                for mode in ('ddl', 'function', 'explain')
+            ]
+            print(
+                f'{size:>6} {workers:>8} {rates[0]:>14.1f} '
+                f'{rates[1]:>9.1f} {rates[2]:>8.1f}'
+            )
+
+
+def bench_count_cache(pages: int = 50):
+    print(f'\npaging through {pages} pages of 100 features, ms per page')
+    print(f'{"filter":>10} {"uncached":>9} {"cached":>7}')
+    for name, properties in (
+        ('none', []),
+        ('waterway', [('waterway', 'stream')]),
+    ):
+        timings = []
+        for ttl in (0, 60):
+            p = PseudoPostgreSQLProvider({**CONFIG, 'count_cache_ttl': ttl})
+            start = time.perf_counter()
+            for page in range(pages):
+                p.query(offset=page * 100, limit=100, properties=properties)
+            timings.append((time.perf_counter() - start) * 1000 / pages)
+        print(f'{name:>10} {timings[0]:>9.2f} {timings[1]:>7.2f}')
+
+
+def bench_count_strategy():
+    from pygeofilter.parsers.ecql import parse
+
+    from pygeoapi_plugins.provider.postgresql import COUNT_STRATEGIES
+
+    print('\n/items latency of a selective unindexed CQL filter, ms')
+    print(f'{"strategy":>30} {"results":>8} {"hits":>8}')
+    filterq = parse("name LIKE '%a%' AND waterway = 'river'")
+    for strategy in COUNT_STRATEGIES:
+        p = PseudoPostgreSQLProvider(
+            {**CONFIG, 'count_strategy': strategy, 'count_cache_ttl': 0}
+        )
+        timings = []
+        for resulttype in ('results', 'hits'):
+            start = time.perf_counter()
+            for _ in range(20):
+                p.query(filterq=filterq, resulttype=resulttype)
+            timings.append((time.perf_counter() - start) * 1000 / 20)
+        print(f'{strategy:>30} {timings[0]:>8.2f} {timings[1]:>8.2f}')
+
+
+def bench_keyset(limit: int = 100):
+    print(f'\nms per page of {limit} features when walking to an offset')
+    print(f'{"offset":>8} {"offset paging":>14} {"keyset paging":>14}')
+    providers = [
+        PseudoPostgreSQLProvider({**CONFIG, 'pagination': pagination})
+        for pagination in ('offset', 'keyset')
+    ]
+    depths = [0, 1_000, 5_000, 10_000, 14_000]
+    timings = {depth: [] for depth in depths}
+    for p in providers:
+        for offset in range(0, depths[-1] + limit, limit):
+            start = time.perf_counter()
+            p.query(offset=offset, limit=limit, skip_geometry=True)
+            if offset in timings:
+                timings[offset].append((time.perf_counter() - start) * 1000)
+    for depth, (before, after) in timings.items():
+        print(f'{depth:>8} {before:>14.2f} {after:>14.2f}')
+
+
+if __name__ == '__main__':
+    bench_pseudo_count()
+    bench_count_cache()
+    bench_count_strategy()
+    bench_keyset()
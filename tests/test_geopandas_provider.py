@@ -28,17 +28,36 @@
 # =================================================================
 
 import datetime
+import json
+import os
+import threading
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import pytest
 import shapely
 
-from pygeoapi.provider.base import ProviderItemNotFoundError
+from pygeoapi.provider.base import (
+    ProviderInvalidDataError,
+    ProviderItemNotFoundError,
+    ProviderInvalidQueryError,
+    ProviderQueryError,
+)
+from pygeofilter.parsers.cql2_text import parse as parse_cql2_text
 
+from pygeoapi_plugins.provider import geopandas_
 from pygeoapi_plugins.provider.geopandas_ import GeoPandasProvider
 
 
+@pytest.fixture(autouse=True)
+def shared_datasets():
+    # Writes are shared with later providers of the same source
+    geopandas_._DATASETS.clear()
+    yield
+    geopandas_._DATASETS.clear()
+
+
 @pytest.fixture()
 def config():
     return {
@@ -128,6 +147,30 @@ def test_csv_query(config):
     assert len(results['features'][0]['properties']) == 2
 
 
+@pytest.mark.parametrize(
+    'column,value',
+    [
+        ('stn_id', '35'),
+        ('stn_id', '35.0'),
+        ('stn_id', '035'),
+        ('stn_id', 'abc'),
+        ('value', '93.9'),
+        ('value', '93.90'),
+        ('value', '89.9'),
+        ('value', 'nan'),
+        ('id', '964'),
+        ('datetime', '2001-10-30T14:24:55Z'),
+    ],
+)
+def test_csv_typed_property_filter(config, column, value):
+    p = GeoPandasProvider(config)
+
+    expected = p.gdf[p.gdf[column].astype(str) == value]
+    results = p.query(properties=[(column, value)])
+    assert results['numberMatched'] == len(expected)
+    assert [f['id'] for f in results['features']] == list(expected[p.id_field])
+
+
 def test_csv_get(config):
     p = GeoPandasProvider(config)
 
@@ -158,6 +201,39 @@ def test_csv_get_station(station_config):
     assert result['properties']['station_name'] == 'NAMITAMBO'
 
 
+def test_csv_bbox_query(config, station_config):
+    p = GeoPandasProvider(config)
+    results = p.query(bbox=[-80, 42, -70, 46])
+    assert [f['id'] for f in results['features']] == [
+        '371',
+        '377',
+        '238',
+        '297',
+    ]
+    assert results['features'][0]['geometry'] == {
+        'type': 'Point',
+        'coordinates': [-75.0, 45.0],
+    }
+    # Points on the edge of the bbox intersect it
+    assert p.query(bbox=[-79, 43, -75, 45])['numberMatched'] == 4
+
+    p = GeoPandasProvider(station_config)
+    x, y = p._coordinates()
+    # The coordinates are converted once and shared by later providers
+    assert GeoPandasProvider(station_config)._coordinates()[0] is x
+    expected = p.gdf['wigos_station_identifier'][
+        (x >= 0) & (x <= 20) & (y >= 30) & (y <= 50)
+    ].tolist()
+    results = p.query(bbox=[0, 30, 20, 50], limit=100)
+    assert [f['id'] for f in results['features']] == expected
+    triangle = 'POLYGON((0 30, 20 30, 0 50, 0 30))'
+    expected = p.gdf['wigos_station_identifier'][
+        shapely.intersects(shapely.from_wkt(triangle), shapely.points(x, y))
+    ].tolist()
+    results = p.query(filterq=f'S_INTERSECTS(geometry, {triangle})', limit=100)
+    assert [f['id'] for f in results['features']] == expected
+
+
 # Make sure the way we are filtering the dataframe works in general outside of the provider
 def test_intersection():
     gdf = gpd.read_file('tests/data/hu02.gpkg')
@@ -219,6 +295,177 @@ def test_gpkg_bbox_query(gpkg_config):
     assert results['features'][1]['id'] == '02'
 
 
+def test_gpkg_feature_serialization(gpkg_config):
+    p = GeoPandasProvider(gpkg_config)
+
+    feature = p.query(limit=1)['features'][0]
+    assert list(feature.keys()) == ['type', 'id', 'properties', 'geometry']
+    assert feature['id'] == '07'
+    assert list(feature['properties'].keys()) == [
+        'uri',
+        'NAME',
+        'gnis_url',
+        'GNIS_ID',
+        'LOADDATE',
+    ]
+    assert feature['geometry']['type'] == 'MultiPolygon'
+    assert feature['geometry']['coordinates'] == shapely.to_geojson(
+        p.gdf['geometry'].iloc[0]
+    )
+
+    results = p.query(offset=20, limit=5)
+    assert results['numberMatched'] == 22
+    assert results['numberReturned'] == 2
+
+    feature = p.query(identifier='01')
+    assert feature['id'] == '01'
+    assert feature['properties']['NAME'] == 'New England Region'
+    assert p.query(identifier='404') is None
+
+    results = p.query(select_properties=['does_not_exist'])
+    assert len(results['features']) == 10
+    assert results['features'][0]['properties'] == {}
+
+
+def test_gpkg_shared_dataset(gpkg_config):
+    p1 = GeoPandasProvider(gpkg_config)
+    p2 = GeoPandasProvider(gpkg_config)
+    assert p1.gdf is p2.gdf
+    assert p1.gdf.has_sindex
+
+    dummy_row = {
+        'uri': '_',
+        'NAME': '_',
+        'gnis_url': '_',
+        'GNIS_ID': '',
+        'HUC2': '1111',
+        'LOADDATE': datetime.datetime.fromisoformat(
+            '2019-10-31T16:20:07+00:00'
+        ),
+        'geometry': shapely.box(0, 0, 1, 1),
+    }
+
+    p1.create(dummy_row)
+    assert len(p1.gdf) == 23
+    # p2 keeps reading the version it started with, new providers read
+    # the version p1 published
+    assert len(p2.gdf) == 22
+    assert GeoPandasProvider(gpkg_config).gdf is p1.gdf
+
+    # The spatial index has to follow the writes
+    results = p1.query(bbox=(0.5, 0.5, 0.6, 0.6))
+    assert [f['id'] for f in results['features']] == ['1111']
+
+    dummy_row['geometry'] = shapely.box(10, 10, 11, 11)
+    p1.update('1111', dummy_row)
+    assert p1.query(bbox=(0.5, 0.5, 0.6, 0.6))['numberMatched'] == 0
+    assert p1.query(bbox=(10.5, 10.5, 10.6, 10.6))['numberMatched'] == 1
+
+    p1.delete('1111')
+    assert p1.query(bbox=(10.5, 10.5, 10.6, 10.6))['numberMatched'] == 0
+
+    p3 = GeoPandasProvider(gpkg_config)
+    assert p3.query(bbox=(10.5, 10.5, 10.6, 10.6))['numberMatched'] == 0
+    assert len(p2.gdf) == 22
+
+
+def test_gpkg_snapshot_writes(gpkg_config, monkeypatch):
+    monkeypatch.setattr(geopandas_, 'DELTA_COMPACT_SIZE', 4)
+    reader = GeoPandasProvider(gpkg_config)
+    writer = GeoPandasProvider(gpkg_config)
+    frame = reader.gdf
+
+    row = {
+        **reader.gdf.iloc[0].to_dict(),
+        'LOADDATE': datetime.datetime.fromisoformat(
+            '2019-10-31T16:20:07+00:00'
+        ),
+    }
+    for i in range(30):
+        writer.create({**row, 'HUC2': f'new{i}'})
+
+    # Created rows are buffered until there are as many as rows in the
+    # frame, so the frame was rebuilt once rather than 30 times
+    assert len(writer._dataset['gdf']) == 44
+    assert writer._dataset['delta_size'] == 8
+    assert writer.get('new29')['id'] == 'new29'
+    assert len(writer.gdf) == 52
+    assert writer._dataset['delta_size'] == 0
+
+    # Readers are unaffected until they start over
+    assert reader.gdf is frame
+    assert reader.query(resulttype='hits')['numberMatched'] == 22
+    other = GeoPandasProvider(gpkg_config)
+    assert other.query(resulttype='hits')['numberMatched'] == 52
+    assert other.gdf is writer.gdf
+
+    # Versions appended to concurrently branch off
+    reader.create({**row, 'HUC2': 'stale'})
+    assert len(writer.gdf) == 52
+
+    # Updates leave the frames of earlier versions as they were
+    frame = writer.gdf
+    names = frame['NAME'].copy()
+    writer.update('new0', {**row, 'HUC2': 'new0', 'NAME': 'Updated'})
+    assert writer.get('new0')['properties']['NAME'] == 'Updated'
+    assert frame['NAME'].equals(names)
+
+
+def test_gpkg_write_does_not_block_readers(gpkg_config, monkeypatch):
+    writer = GeoPandasProvider(gpkg_config)
+    building, release = threading.Event(), threading.Event()
+    replace = GeoPandasProvider._replace
+
+    def slow_replace(self, dataset, items):
+        building.set()
+        release.wait(10)
+        return replace(self, dataset, items)
+
+    monkeypatch.setattr(GeoPandasProvider, '_replace', slow_replace)
+    row = writer.get('02')['properties']
+    update = threading.Thread(
+        target=writer.update, args=('02', {**row, 'NAME': 'Updated'})
+    )
+    update.start()
+    assert building.wait(10)
+
+    # Readers are served while the next version is built
+    reader = GeoPandasProvider(gpkg_config)
+    assert reader.get('02')['properties']['NAME'] == 'Mid Atlantic Region'
+
+    # A version published meanwhile is built on rather than overwritten
+    created = {**row, 'HUC2': 'new'}
+    key = writer._key
+    geopandas_._DATASETS[key], _ = reader._append(reader._dataset, [created])
+    release.set()
+    update.join()
+
+    latest = GeoPandasProvider(gpkg_config)
+    assert latest.get('02')['properties']['NAME'] == 'Updated'
+    assert latest.get('new')['id'] == 'new'
+
+
+def test_gpkg_id_index(gpkg_config):
+    p = GeoPandasProvider(gpkg_config)
+
+    assert p.get('02')['properties']['NAME'] == 'Mid Atlantic Region'
+    assert p.query(identifier='02')['id'] == '02'
+    assert p.query(identifier='02', bbox=(0, 0, 1, 1)) is None
+
+    row = p.get('02')['properties']
+    row['HUC2'] = '0202'
+    assert p.update('02', row)
+    assert p.get('0202')['properties']['NAME'] == 'Mid Atlantic Region'
+    with pytest.raises(ProviderItemNotFoundError):
+        p.get('02')
+
+    p.delete('01')
+    assert p.get('0202')['id'] == '0202'
+    assert p.get('03')['id'] == '03'
+    with pytest.raises(ProviderItemNotFoundError):
+        p.get('01')
+
+
 def test_gpkg_date_query(gpkg_config):
     p = GeoPandasProvider(gpkg_config)
 
@@ -262,6 +509,12 @@ def test_gpkg_date_query(gpkg_config):
 
     results = p.query(datetime_='2016')
     assert len(results['features']) == 2
+
+    # Range bounds cover their precision and keep their UTC offset
+    assert p.query(datetime_='2016/2016')['numberMatched'] == 2
+    assert p.query(datetime_='2017/2018')['numberMatched'] == 15
+    interval = '2019-10-10T22:08:56+02:00/2019-10-10T22:08:56+02:00'
+    assert p.query(datetime_=interval)['numberMatched'] == 1
     assert (
         results['features'][0]['properties']['LOADDATE']
         == '2016-10-11 21:37:03+00:00'
@@ -272,6 +525,97 @@ def test_gpkg_date_query(gpkg_config):
     )
 
 
+@pytest.mark.parametrize(
+    'datetime_,expected',
+    [
+        ('2019', 5),
+        ('2019-10', 4),
+        ('2019-10-10', 1),
+        ('2019-10-10T20', 1),
+        ('2019-10-10 20:08', 1),
+        ('2019-10-10T20:08:56Z', 1),
+        ('2019-10-10T20:08:57Z', 0),
+        ('2019-10-10T22:08:56+02:00', 1),
+        ('2019-11', 0),
+    ],
+)
+def test_gpkg_partial_date_query(gpkg_config, datetime_, expected):
+    p = GeoPandasProvider(gpkg_config)
+
+    results = p.query(datetime_=datetime_, limit=100)
+    assert results['numberMatched'] == expected
+    for feature in results['features']:
+        assert feature['properties']['LOADDATE'].startswith(
+            datetime_[:10].replace('T', ' ')
+        )
+
+
+@pytest.mark.parametrize(
+    'datetime_', ['2019-13', '2019-02-30', '2019-10-10T25', '2019-10-10T20:61']
+)
+def test_gpkg_out_of_range_date_query(gpkg_config, datetime_):
+    p = GeoPandasProvider(gpkg_config)
+
+    for value in [datetime_, f'{datetime_}/..', f'2019/{datetime_}']:
+        with pytest.raises(ProviderInvalidQueryError):
+            p.query(datetime_=value)
+
+    assert p.query(datetime_='9999')['numberMatched'] == 0
+
+
+def test_gpkg_date_query_after_create(gpkg_config):
+    p = GeoPandasProvider(gpkg_config)
+    assert p.query(datetime_='2021')['numberMatched'] == 0
+
+    p.create(
+        {
+            'uri': '_',
+            'NAME': '_',
+            'gnis_url': '_',
+            'GNIS_ID': '',
+            'HUC2': '1111',
+            'LOADDATE': datetime.datetime.fromisoformat(
+                '2021-01-01T00:00:00+00:00'
+            ),
+            'geometry': shapely.box(0, 0, 1, 1),
+        }
+    )
+    assert p.query(datetime_='2021')['numberMatched'] == 1
+    assert p.query(datetime_='2020-12-31/2021-01-01')['numberMatched'] == 1
+
+    with pytest.raises(ProviderInvalidQueryError):
+        p.query(datetime_='October 2019')
+    with pytest.raises(ProviderInvalidQueryError):
+        p.query(datetime_='2021/2020')
+
+
+def test_gpkg_query_planner(gpkg_config):
+    p = GeoPandasProvider(gpkg_config)
+
+    bbox = (-74.881, 40.566, -71.249, 41.27)
+    assert p.query(resulttype='hits', bbox=bbox)['numberMatched'] == 2
+    assert p.query(resulttype='hits', datetime_='2016')['numberMatched'] == 2
+    results = p.query(resulttype='hits', bbox=bbox, datetime_='2019-10')
+    assert results['numberMatched'] == 1
+    assert results['features'] == []
+
+    plan = p._plan_filters(
+        identifier=None,
+        bbox=bbox,
+        datetime_='2019-10',
+        properties=[('gnis_url', '_')],
+    )
+    assert [f['estimate'] for f in plan] == [0, 2, 4]
+
+    results = p.query(
+        bbox=bbox,
+        datetime_='2019-10',
+        properties=[('NAME', 'New England Region')],
+    )
+    assert results['numberMatched'] == 1
+    assert results['features'][0]['id'] == '01'
+
+
 def test_gpkg_sort_query(gpkg_config):
     p = GeoPandasProvider(gpkg_config)
 
@@ -312,6 +656,64 @@ def test_gpkg_sort_query(gpkg_config):
     )
 
 
+@pytest.mark.parametrize(
+    'sortby',
+    [
+        [{'property': 'value', 'order': '+'}],
+        [{'property': 'value', 'order': '-'}],
+        [
+            {'property': 'NAME', 'order': '-'},
+            {'property': 'value', 'order': '+'},
+        ],
+        [
+            {'property': 'LOADDATE', 'order': '+'},
+            {'property': 'NAME', 'order': '-'},
+        ],
+    ],
+)
+def test_gpkg_top_k_sort(gpkg_config, sortby):
+    p = GeoPandasProvider(gpkg_config)
+
+    rng = np.random.default_rng(0)
+    size = 500
+    values = rng.integers(0, 20, size).astype('float64')
+    values[rng.integers(0, size, 50)] = np.nan
+    p.gdf = gpd.GeoDataFrame(
+        {
+            'HUC2': [str(i) for i in range(size)],
+            'NAME': rng.choice(['a', 'b', 'c', None], size),
+            'value': values,
+            'LOADDATE': pd.to_datetime(
+                rng.integers(0, 5, size), unit='D', utc=True
+            ),
+            'geometry': shapely.points(rng.uniform(0, 1, (size, 2))),
+        },
+        crs='EPSG:4326',
+    )
+
+    def expected(df):
+        return list(
+            df.sort_values(
+                by=[s['property'] for s in sortby],
+                ascending=[s['order'] == '+' for s in sortby],
+                kind='stable',
+            )['HUC2']
+        )
+
+    def ids(**kwargs):
+        results = p.query(sortby=sortby, **kwargs)
+        return [f['id'] for f in results['features']]
+
+    assert ids(limit=size) == expected(p.gdf)
+    assert ids(offset=40, limit=25) == expected(p.gdf)[40:65]
+
+    # A filtered frame both with and without a kept sort order
+    filtered = expected(p.gdf[p.gdf['NAME'] == 'b'])
+    assert ids(properties=[('NAME', 'b')], limit=7) == filtered[:7]
+    p._dataset['sorts'].clear()
+    assert ids(properties=[('NAME', 'b')], offset=3, limit=7) == filtered[3:10]
+
+
 def test_transaction(gpkg_config):
     p = GeoPandasProvider(gpkg_config)
 
@@ -362,3 +764,567 @@ def test_transaction(gpkg_config):
 
     with pytest.raises(ProviderItemNotFoundError):
         res = p.get('1111')
+
+
+@pytest.mark.parametrize(
+    'kwargs',
+    [
+        {'limit': 5},
+        {'offset': 20, 'limit': 5},
+        {'resulttype': 'hits'},
+        {'bbox': [-100, 30, -90, 40]},
+        {'properties': [('NAME', 'Lower Mississippi Region')]},
+        {'properties': [('GNIS_ID', '1243876')]},
+        {'datetime_': '2019'},
+        {'sortby': [{'property': 'NAME', 'order': '-'}], 'offset': 2},
+        {'resulttype': 'hits', 'bbox': [-100, 30, -90, 40]},
+        {'select_properties': ['NAME'], 'skip_geometry': True},
+        {'identifier': '07'},
+    ],
+)
+def test_gpkg_lazy_query(gpkg_config, kwargs):
+    eager = GeoPandasProvider(gpkg_config)
+    lazy = GeoPandasProvider({**gpkg_config, 'lazy': True})
+    assert len(lazy.gdf) == 1
+
+    assert lazy.query(**kwargs) == eager.query(**kwargs)
+
+
+def test_gpkg_lazy_page(gpkg_config, monkeypatch):
+    lazy = GeoPandasProvider({**gpkg_config, 'lazy': True})
+
+    read = []
+    read_dataframe = geopandas_.pyogrio.read_dataframe
+
+    def read_page(*args, **kwargs):
+        read.append(read_dataframe(*args, **kwargs))
+        return read[-1]
+
+    monkeypatch.setattr(geopandas_.pyogrio, 'read_dataframe', read_page)
+
+    # Unfiltered pages only read their rows, and hits read none
+    assert lazy.query(resulttype='hits')['numberMatched'] == 22
+    assert read == []
+
+    results = lazy.query(offset=10, limit=3)
+    assert results['numberMatched'] == 22
+    assert results['numberReturned'] == 3
+    assert [len(gdf) for gdf in read] == [3]
+
+
+def test_gpkg_lazy_get(gpkg_config):
+    eager = GeoPandasProvider(gpkg_config)
+    lazy = GeoPandasProvider({**gpkg_config, 'lazy': True})
+
+    assert lazy.get('07') == eager.get('07')
+    with pytest.raises(ProviderItemNotFoundError):
+        lazy.get("0'7")
+    with pytest.raises(NotImplementedError):
+        lazy.delete('07')
+
+
+@pytest.mark.parametrize('data', ['gpkg', 'parquet'])
+def test_lazy_get_numeric_id(gpkg_config, tmp_path, monkeypatch, data):
+    path = str(tmp_path / f'hu02.{data}')
+    gdf = gpd.read_file(gpkg_config['data'])
+    gdf['code'] = gdf['HUC2'].astype(int)
+    gdf['ratio'] = gdf['code'] / 2
+    if data == 'gpkg':
+        gdf.to_file(path)
+    else:
+        gdf.to_parquet(path)
+
+    # Numeric identifiers are pushed down as numbers
+    for id_field, identifier in [('code', '7'), ('ratio', '3.5')]:
+        lazy = GeoPandasProvider(
+            {**gpkg_config, 'data': path, 'id_field': id_field, 'lazy': True}
+        )
+        assert lazy._where_clause([(id_field, identifier)]) or (
+            lazy._parquet_filter([(id_field, identifier)]) is not None
+        )
+        assert lazy.get(identifier)['properties']['HUC2'] == '07'
+        assert lazy._lazy_view(identifier=identifier).gdf.shape[0] == 1
+
+
+def test_csv_lazy_query(config):
+    eager = GeoPandasProvider(config)
+    lazy = GeoPandasProvider({**config, 'properties': ['value'], 'lazy': True})
+
+    for properties, matched in [
+        ([('stn_id', '35')], 2),
+        ([('value', '89.9')], 1),
+    ]:
+        results = lazy.query(properties=properties)
+        assert results['numberMatched'] == matched
+        assert [f['id'] for f in results['features']] == [
+            f['id'] for f in eager.query(properties=properties)['features']
+        ]
+        for feature in results['features']:
+            assert set(feature['properties']) == {'value'}
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_parquet_query(gpkg_config, tmp_path, lazy):
+    data = str(tmp_path / 'hu02.parquet')
+    gpd.read_file(gpkg_config['data']).to_parquet(
+        data, write_covering_bbox=True, row_group_size=5
+    )
+    eager = GeoPandasProvider(gpkg_config)
+    p = GeoPandasProvider({**gpkg_config, 'data': data, 'lazy': lazy})
+    assert 'bbox' not in p.fields
+    assert p.fields == eager.fields
+
+    for kwargs in [
+        {'bbox': [-100, 30, -90, 40]},
+        {'properties': [('GNIS_ID', '1243876')]},
+        {'datetime_': '2019-10'},
+        {'datetime_': '2019-10-31T16:20:07Z/..', 'resulttype': 'hits'},
+        {'sortby': [{'property': 'NAME', 'order': '-'}], 'limit': 4},
+        {'offset': 4, 'limit': 7},
+        {'offset': 20},
+        {'resulttype': 'hits'},
+    ]:
+        assert p.query(**kwargs) == eager.query(**kwargs)
+
+    assert p.get('07') == eager.get('07')
+
+
+@pytest.mark.parametrize('data', ['gpkg', 'csv'])
+def test_shared_memory(config, gpkg_config, tmp_path, data):
+    source = gpkg_config if data == 'gpkg' else config
+    shared_memory = str(tmp_path / 'dataset.arrow')
+    eager = GeoPandasProvider(source)
+    p = GeoPandasProvider({**source, 'shared_memory': shared_memory})
+    assert os.path.exists(shared_memory)
+    assert p.fields == eager.fields
+
+    bbox = [-100, 30, -90, 40] if data == 'gpkg' else [-80, 42, -70, 46]
+    for kwargs in [
+        {},
+        {'properties': [(p.id_field, eager.gdf[p.id_field].iloc[1])]},
+        {'sortby': [{'property': p.id_field, 'order': '-'}], 'limit': 4},
+        {'bbox': bbox},
+    ]:
+        assert p.query(**kwargs) == eager.query(**kwargs)
+
+    identifier = eager.gdf[p.id_field].iloc[2]
+    assert p.get(identifier) == eager.get(identifier)
+    with pytest.raises(NotImplementedError):
+        p.delete(identifier)
+
+    # Other processes attach to the file instead of reading the source
+    geopandas_._DATASETS.clear()
+    mtime = os.stat(shared_memory).st_mtime_ns
+    attached = GeoPandasProvider({**source, 'shared_memory': shared_memory})
+    assert os.stat(shared_memory).st_mtime_ns == mtime
+    assert attached.query() == eager.query()
+    assert attached.query(bbox=bbox) == eager.query(bbox=bbox)
+    if data == 'gpkg':
+        # Envelopes are indexed once per version, wide ones apart
+        order, _, _, wide = attached._dataset['envelopes']
+        assert len(order) + len(wide) == len(eager.gdf)
+        for bbox in [[-180, -90, 180, 90], [-75, 40, -74, 41], [0, 0, 1, 1]]:
+            assert attached.query(bbox=bbox) == eager.query(bbox=bbox)
+
+
+def test_gpkg_geometry_cache(gpkg_config):
+    eager = GeoPandasProvider(gpkg_config)
+    p = GeoPandasProvider({**gpkg_config, 'geometry_cache': True})
+    assert p._dataset['geojson'] is not None
+    assert p.query() == eager.query()
+    assert p.query(bbox=[-100, 30, -90, 40]) == eager.query(
+        bbox=[-100, 30, -90, 40]
+    )
+
+    # Updated geometries are serialized again, deleted ones dropped
+    point = shapely.Point(-90.123456789, 40.987654321)
+    row = p.gdf.set_index('HUC2', drop=False).loc['07'].to_dict()
+    p.update('07', {**row, 'geometry': point})
+    p.delete('08')
+    feature = p.query(properties=[('HUC2', '07')])['features'][0]
+    assert feature['geometry']['coordinates'] == shapely.to_geojson(point)
+    assert len(p._dataset['geojson']) == len(p.gdf) == 21
+    features = p.query(limit=100)['features']
+    assert [f for f in features if f['id'] != '07'] == [
+        f
+        for f in eager.query(limit=100)['features']
+        if f['id'] not in ('07', '08')
+    ]
+
+    rounded = GeoPandasProvider(
+        {**gpkg_config, 'geometry_cache': True, 'geometry_precision': 2}
+    )
+    geometry = rounded.query(limit=1)['features'][0]['geometry']
+    coords = shapely.get_coordinates(
+        shapely.from_geojson(geometry['coordinates'])
+    )
+    assert (coords == coords.round(2)).all()
+
+
+def test_geojson_q():
+    p = GeoPandasProvider(
+        {
+            'name': 'places',
+            'type': 'feature',
+            'data': 'tests/data/ne_110m_populated_places_simple.geojson',
+            'id_field': 'nameascii',
+            'q_fields': ['name', 'adm0name'],
+        }
+    )
+    assert p._dataset['terms'] is not None
+
+    def matched(**kwargs):
+        return [f['id'] for f in p.query(**kwargs)['features']]
+
+    assert matched(q='san MARINO') == ['San Marino']
+    assert matched(q='city') == ['Vatican City']
+    assert matched(q='city, Luxembourg') == []
+    assert matched(q='liechtenstein') == ['Vaduz']
+    assert matched(q='Vaduz', bbox=[0, 40, 20, 50]) == ['Vaduz']
+    assert matched(q='Vaduz', bbox=[0, 0, 1, 1]) == []
+    assert matched(q='Vaduz', properties=[('iso_a2', 'LI')]) == ['Vaduz']
+    assert p.query(q='zzz', resulttype='hits')['numberMatched'] == 0
+
+    # The index follows created, updated and deleted rows
+    row = p.gdf.iloc[4].to_dict()
+    p.create({**row, 'nameascii': 'Esch', 'name': 'Esch-sur-Alzette'})
+    p.update('Vaduz', {**p.get('Vaduz')['properties'], 'name': 'Schaan'})
+    p.delete('San Marino')
+    assert matched(q='luxembourg') == ['Luxembourg', 'Esch']
+    assert matched(q='alzette') == ['Esch']
+    assert matched(q='vaduz') == []
+    assert matched(q='schaan') == ['Vaduz']
+    assert matched(q='marino') == []
+    assert matched(q='vatican') == ['Vatican City']
+
+
+@pytest.mark.parametrize('shared', [False, True])
+def test_gpkg_cql_filter(gpkg_config, tmp_path, shared):
+    if shared:
+        gpkg_config['shared_memory'] = str(tmp_path / 'hu02.arrow')
+    p = GeoPandasProvider(gpkg_config)
+
+    def matched(cql_text, **kwargs):
+        results = p.query(
+            filterq=parse_cql2_text(cql_text), limit=50, **kwargs
+        )
+        return sorted(f['id'] for f in results['features'])
+
+    assert matched("HUC2 IN ('07', '08')") == ['07', '08']
+    assert len(matched("HUC2 NOT IN ('07', '08')")) == 20
+    assert matched("NAME LIKE 'Upper%' AND GNIS_ID > 2730140") == ['14']
+    assert matched("CASEI(NAME) LIKE '%mississippi%'") == ['07', '08']
+    assert matched('GNIS_ID BETWEEN 2730148 AND 2730150') == [
+        '17',
+        '18',
+        '19',
+    ]
+    assert matched('GNIS_ID > 2730140 + 10') == ['20', '21', '22']
+    assert matched('NOT (NAME IS NULL)') == matched('INCLUDE')
+    assert matched("LOADDATE > TIMESTAMP('2019-10-12T00:00:00Z')") == [
+        '01',
+        '04',
+        '19',
+    ]
+    assert matched(
+        "LOADDATE T_DURING INTERVAL('2019-10-12T00:00:00Z',"
+        "'2019-10-30T00:00:00Z')"
+    ) == ['01', '19']
+    assert matched("LOADDATE T_BEFORE DATE('2016-10-01')") == ['22']
+    assert matched('S_CONTAINS(geometry, POINT(-95 35))') == ['11']
+    assert matched('S_INTERSECTS(geometry, POINT(-95 35))') == ['11']
+    assert len(matched('S_DISJOINT(geometry, POINT(-95 35))')) == 21
+    assert matched('BBOX(geometry, -100, 30, -90, 40)') == sorted(
+        f['id'] for f in p.query(bbox=[-100, 30, -90, 40])['features']
+    )
+    assert 'Hawaii Region' not in [
+        f['properties']['NAME']
+        for f in p.query(
+            filterq=parse_cql2_text(
+                'S_WITHIN(geometry, '
+                'POLYGON((-130 20, -60 20, -60 55, -130 55, -130 20)))'
+            ),
+            limit=50,
+        )['features']
+    ]
+
+    # Filters compose with the other query parameters
+    assert matched("NAME LIKE 'Texas%'", bbox=[-100, 30, -90, 40]) == ['12']
+    assert matched(
+        "NAME LIKE '%Region'", properties=[('GNIS_ID', '2730137')]
+    ) == ['07']
+
+    # Filters are compiled once, whether given as AST or text
+    p.query(filterq="HUC2 = '07'")
+    assert "HUC2 = '07'" in geopandas_._FILTERS
+    assert p.query(filterq="HUC2 = '07'")['numberMatched'] == 1
+
+    with pytest.raises(ProviderQueryError):
+        p.query(filterq='missing = 1')
+    with pytest.raises(ProviderQueryError):
+        p.query(filterq="LOADDATE > 'never'")
+
+
+@pytest.mark.parametrize('data', ['gpkg', 'csv'])
+def test_schema_cache(config, gpkg_config, tmp_path, data):
+    source = gpkg_config if data == 'gpkg' else config
+    schema_cache = str(tmp_path / 'schema.json')
+    eager = GeoPandasProvider(source)
+    p = GeoPandasProvider({**source, 'schema_cache': schema_cache})
+    assert os.path.exists(schema_cache)
+
+    # Later providers read the source on their first query only
+    geopandas_._DATASETS.clear()
+    geopandas_._SCHEMAS.clear()
+    p = GeoPandasProvider({**source, 'schema_cache': schema_cache})
+    assert p._version is None
+    assert p.fields == eager.fields
+    assert p.time_field == eager.time_field
+    assert p.query() == eager.query()
+    assert p._version is not None
+
+    identifier = eager.gdf[p.id_field].iloc[0]
+    geopandas_._DATASETS.clear()
+    p = GeoPandasProvider({**source, 'schema_cache': schema_cache})
+    assert p.get(identifier) == eager.get(identifier)
+    p.delete(identifier)
+    with pytest.raises(ProviderItemNotFoundError):
+        p.get(identifier)
+
+    # A schema cached for another version of the source is not used
+    geopandas_._DATASETS.clear()
+    with open(schema_cache) as fh:
+        stale = fh.read().replace(str(os.stat(source['data']).st_size), '0')
+    with open(schema_cache, 'w') as fh:
+        fh.write(stale)
+    geopandas_._SCHEMAS.clear()
+    p = GeoPandasProvider({**source, 'schema_cache': schema_cache})
+    assert p._version is not None
+    assert p.fields == eager.fields
+
+
+def test_gpkg_hot_reload(gpkg_config, tmp_path, caplog):
+    data = str(tmp_path / 'hu02.gpkg')
+    gdf = gpd.read_file(gpkg_config['data'])
+    gdf.to_file(data)
+    config = {**gpkg_config, 'data': data, 'hot_reload': True}
+    before = GeoPandasProvider(config)
+    assert before.query(resulttype='hits')['numberMatched'] == 22
+
+    # The version read before the change is served while it is reloaded
+    gdf.iloc[:5].to_file(data)
+    with caplog.at_level('INFO'):
+        p = GeoPandasProvider(config)
+        assert p.query(resulttype='hits')['numberMatched'] == 22
+        for reload in list(geopandas_._RELOADS.values()):
+            reload.join()
+    assert 'Reloaded' in caplog.text
+    assert not geopandas_._RELOADS
+
+    assert GeoPandasProvider(config).query()['numberMatched'] == 5
+    assert before.query(resulttype='hits')['numberMatched'] == 22
+
+
+def test_csv_batch_transactions(config):
+    p = GeoPandasProvider(config)
+    row = p.gdf.iloc[0].to_dict()
+
+    ids = p.create_many(
+        [{**row, 'id': str(i), 'stn_id': i} for i in range(1000, 1100)]
+    )
+    assert ids == [str(i) for i in range(1000, 1100)]
+    assert len(p.gdf) == 105
+    assert p.get('1050')['properties']['stn_id'] == 1050
+
+    result = p.update_many(
+        {
+            '1050': {**row, 'id': '1050', 'value': 1.5},
+            '371': {**row, 'id': '371', 'value': 2.5},
+            'missing': {**row, 'id': 'missing'},
+        }
+    )
+    assert result == {'1050': True, '371': True, 'missing': False}
+    assert p.get('1050')['properties']['value'] == 1.5
+    assert p.get('371')['properties']['value'] == 2.5
+    assert [f['id'] for f in p.query(limit=2)['features']] == ['371', '377']
+
+    # Large batches are set one column at a time
+    result = p.update_many(
+        {
+            str(i): {**row, 'id': str(i), 'stn_id': i, 'value': i / 2}
+            for i in range(1000, 1100)
+        }
+    )
+    assert all(result.values())
+    assert p.gdf['stn_id'].dtype == 'int64'
+    assert p.get('1099')['properties']['value'] == 549.5
+
+    # Changing an identifier rebuilds the id index
+    p.update_many({'1051': {**row, 'id': 'renamed'}})
+    assert p.get('renamed')['id'] == 'renamed'
+    with pytest.raises(ProviderItemNotFoundError):
+        p.get('1051')
+
+    assert p.delete_many([str(i) for i in range(1000, 1100)])
+    assert len(p.gdf) == 6
+    assert p.get('renamed')['id'] == 'renamed'
+    assert p.query(properties=[('stn_id', '35')])['numberMatched'] == 3
+
+
+def test_gpkg_write_ahead_log(gpkg_config, tmp_path, monkeypatch):
+    config = {**gpkg_config, 'wal': str(tmp_path / 'hu02.wal')}
+    p = GeoPandasProvider(config)
+    row = {
+        **p.gdf.iloc[0].to_dict(),
+        'LOADDATE': datetime.datetime.fromisoformat(
+            '2019-10-31T16:20:07+00:00'
+        ),
+    }
+
+    p.create_many([{**row, 'HUC2': f'new{i}'} for i in range(3)])
+    p.update('new1', {**row, 'HUC2': 'new1', 'NAME': 'Updated'})
+    p.delete('01')
+    expected = p.query(limit=100)
+
+    # Another process, or this one after a restart, replays the log
+    monkeypatch.setattr(geopandas_, '_DATASETS', {})
+    other = GeoPandasProvider(config)
+    assert other.query(limit=100) == expected
+
+    # And catches up with the writes logged since
+    other.create({**row, 'HUC2': 'other'})
+    monkeypatch.setattr(geopandas_, '_DATASETS', {})
+    assert GeoPandasProvider(config).get('other')['id'] == 'other'
+    assert GeoPandasProvider(config).query(limit=100) == other.query(limit=100)
+
+    # Providers of an up to date version leave the log alone
+    def write(*args):
+        raise AssertionError('log read')
+
+    monkeypatch.setattr(GeoPandasProvider, '_write', write)
+    assert GeoPandasProvider(config).get('other')['id'] == 'other'
+
+
+def test_gpkg_write_ahead_log_checkpoint(gpkg_config, tmp_path, monkeypatch):
+    wal = tmp_path / 'hu02.wal'
+    config = {**gpkg_config, 'wal': str(wal), 'wal_compact_size': 1}
+    p = GeoPandasProvider(config)
+    row = {
+        **p.gdf.iloc[0].to_dict(),
+        'GNIS_ID': 1,
+        'LOADDATE': datetime.datetime.fromisoformat(
+            '2019-10-31T16:20:07+00:00'
+        ),
+    }
+
+    p.create({**row, 'HUC2': 'new0'})
+    p.create({**row, 'HUC2': 'new1'})
+    assert (tmp_path / 'hu02.wal.2.parquet').exists()
+    header = json.loads(wal.read_bytes())
+    assert header == {'generation': 2, 'source': list(p._source_key[2])}
+    expected = p.query(limit=100)
+
+    # Restarting reads the checkpoint instead of the source
+    def read_file(*args, **kwargs):
+        raise AssertionError('source read')
+
+    monkeypatch.setattr(geopandas_.geopandas, 'read_file', read_file)
+    monkeypatch.setattr(geopandas_, '_DATASETS', {})
+    other = GeoPandasProvider(config)
+    assert other.query(limit=100) == expected
+
+    # The checkpoint is written without holding the log, and writes
+    # logged meanwhile by another process are carried over
+    write_checkpoint = GeoPandasProvider._write_checkpoint
+
+    def concurrent_write(self, gdf):
+        monkeypatch.setattr(geopandas_, '_DATASETS', {})
+        other.wal_compact_size = 2**20
+        other.create({**row, 'HUC2': 'concurrent'})
+        return write_checkpoint(self, gdf)
+
+    monkeypatch.setattr(
+        GeoPandasProvider, '_write_checkpoint', concurrent_write
+    )
+    p.create({**row, 'HUC2': 'new2'})
+    assert json.loads(wal.read_bytes().splitlines()[0])['generation'] == 3
+    monkeypatch.setattr(geopandas_, '_DATASETS', {})
+    latest = GeoPandasProvider(config)
+    assert latest.get('new2')['id'] == 'new2'
+    assert latest.get('concurrent')['id'] == 'concurrent'
+
+
+def test_parquet_write_ahead_log_checkpoint(
+    gpkg_config, tmp_path, monkeypatch
+):
+    data = str(tmp_path / 'hu02.parquet')
+    gpd.read_file(gpkg_config['data']).to_parquet(data)
+    config = {
+        **gpkg_config,
+        'data': data,
+        'wal': str(tmp_path / 'hu02.wal'),
+        'wal_compact_size': 1,
+    }
+    p = GeoPandasProvider(config)
+    row = p.get('02')['properties']
+    p.update('02', {**row, 'NAME': 'Updated'})
+
+    # GeoParquet sources are not read once they are checkpointed
+    def read_parquet(*args, **kwargs):
+        raise AssertionError('source read')
+
+    monkeypatch.setattr(GeoPandasProvider, '_read_parquet', read_parquet)
+    monkeypatch.setattr(geopandas_, '_DATASETS', {})
+    p = GeoPandasProvider(config)
+    assert p.get('02')['properties']['NAME'] == 'Updated'
+
+
+def test_gpkg_write_ahead_log_source_change(
+    gpkg_config, tmp_path, monkeypatch
+):
+    data = tmp_path / 'hu02.gpkg'
+    data.write_bytes(open(gpkg_config['data'], 'rb').read())
+    wal = tmp_path / 'hu02.wal'
+    config = {**gpkg_config, 'data': str(data), 'wal': str(wal)}
+    p = GeoPandasProvider(config)
+    row = p.get('02')['properties']
+    p.update('02', {**row, 'NAME': 'Updated'})
+
+    # The writes logged before a refresh of the source are replayed onto
+    # it, and checkpointed with it
+    gdf = gpd.read_file(data)
+    gdf.loc[gdf['HUC2'].isin(['02', '03']), 'NAME'] = 'Refreshed'
+    os.remove(data)
+    gdf.to_file(data)
+    monkeypatch.setattr(geopandas_, '_DATASETS', {})
+    p = GeoPandasProvider(config)
+    assert p.get('02')['properties']['NAME'] == 'Updated'
+    assert p.get('03')['properties']['NAME'] == 'Refreshed'
+    header = json.loads(wal.read_bytes())
+    assert header == {'generation': 1, 'source': list(p._source_key[2])}
+
+    # Later processes read the restarted log
+    monkeypatch.setattr(geopandas_, '_DATASETS', {})
+    p = GeoPandasProvider(config)
+    assert p.get('02')['properties']['NAME'] == 'Updated'
+    assert p.get('03')['properties']['NAME'] == 'Refreshed'
+
+    # Once checkpointed, the log no longer holds every write, so a source
+    # changed since is refused rather than dropping them
+    os.utime(data, ns=(0, 0))
+    monkeypatch.setattr(geopandas_, '_DATASETS', {})
+    with pytest.raises(ProviderInvalidDataError):
+        GeoPandasProvider(config)
+
+
+def test_gpkg_write_ahead_log_replay_error(gpkg_config, tmp_path, monkeypatch):
+    config = {**gpkg_config, 'wal': str(tmp_path / 'hu02.wal')}
+    p = GeoPandasProvider(config)
+    p.delete('01')
+    with open(config['wal'], 'a') as wal:
+        wal.write(json.dumps({'op': 'update', 'items': 'invalid'}) + '\n')
+
+    # Replaying the log fails rather than skipping the entry
+    monkeypatch.setattr(geopandas_, '_DATASETS', {})
+    with pytest.raises(ProviderInvalidDataError):
+        GeoPandasProvider(config)
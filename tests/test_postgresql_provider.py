@@ -39,17 +39,38 @@
 # test database in Docker
 
 import os
+from collections import OrderedDict
+
 import pytest
 
 from pygeofilter.parsers.ecql import parse
 
-from pygeoapi.provider.base import ProviderItemNotFoundError
+from pygeoapi.provider.base import (
+    ProviderInvalidDataError,
+    ProviderItemNotFoundError,
+)
 from pygeoapi.provider.sql import PostgreSQLProvider
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query, Session
+
+from pygeoapi_plugins.provider import postgresql as postgresql_
+from pygeoapi_plugins.provider.postgresql import (
+    Explain,
+    PseudoPostgreSQLProvider,
+)
 
 PASSWORD = os.environ.get('POSTGRESQL_PASSWORD', 'postgres')
 DEFAULT_CRS = 'http://www.opengis.net/def/crs/OGC/1.3/CRS84'
 
 
+@pytest.fixture(autouse=True)
+def caches(monkeypatch):
+    # Counts and keyset positions are cached per process, across tests
+    monkeypatch.setattr(postgresql_, '_COUNTS', OrderedDict())
+    monkeypatch.setattr(postgresql_, '_KEYSETS', OrderedDict())
+
+
 @pytest.fixture()
 def config():
     return {
@@ -422,3 +443,212 @@ def test_engine_and_table_model_stores(config):
     provider3 = PostgreSQLProvider(different_host)
     assert provider3._engine is not provider0._engine
     assert provider3.table_model is not provider0.table_model
+
+
+def test_pseudo_count_explain(config, monkeypatch):
+    provider = PseudoPostgreSQLProvider(config)
+    names = [f"Ru'{i}" for i in range(1000)] + ['Muhira']
+    with Session(provider._engine) as session:
+        results = session.query(provider.table_model).filter(
+            provider.table_model.name.in_(names)
+        )
+
+        # Quotes and long IN lists are bound, not rendered into the SQL
+        compiled = Explain(results.statement).compile(
+            dialect=postgresql.dialect()
+        )
+        assert "Ru'" not in str(compiled)
+
+        monkeypatch.setattr(postgresql_, 'PSUEDO_COUNT_LIMIT', 0)
+        assert provider._get_pseudo_count(results) >= 1
+
+        monkeypatch.setattr(postgresql_, 'PSUEDO_COUNT_LIMIT', 5000000)
+        assert provider._get_pseudo_count(results) == results.count()
+
+
+@pytest.mark.parametrize(
+    'property_filter, expected',
+    [
+        ([], 14776),
+        ([('waterway', 'stream')], 13930),
+        ([('waterway', 'this does not exist')], 0),
+    ],
+)
+def test_pseudo_query(config, property_filter, expected):
+    provider = PseudoPostgreSQLProvider(config)
+    results = provider.query(properties=property_filter, limit=50)
+    assert results['numberMatched'] == expected
+    assert results['numberReturned'] == min(expected, 50)
+
+
+def test_pseudo_count_error(config, monkeypatch):
+    provider = PseudoPostgreSQLProvider(config)
+
+    def fail(results, filtered):
+        results.session.execute(text('SELECT 1 / 0'))
+
+    # The failed estimate aborts only its savepoint, and the count falls
+    # back to an exact one
+    monkeypatch.setattr(provider, '_get_estimate', fail)
+    results = provider.query(properties=[('waterway', 'stream')])
+    assert results['numberMatched'] == 13930
+
+
+def test_pseudo_count_cache(config, monkeypatch):
+    provider = PseudoPostgreSQLProvider(config)
+    counts = []
+    pseudo_count = provider._get_pseudo_count
+    monkeypatch.setattr(
+        provider,
+        '_get_pseudo_count',
+        lambda *args: counts.append(args) or pseudo_count(*args),
+    )
+
+    # Paging through the same filters counts them once
+    properties = [('waterway', 'stream')]
+    for offset in range(0, 50, 10):
+        results = provider.query(offset=offset, properties=properties)
+        assert results['numberMatched'] == 13930
+    assert len(counts) == 1
+    assert provider.query()['numberMatched'] == 14776
+    assert len(counts) == 2
+
+    # Counts expire after the TTL
+    monkeypatch.setattr(postgresql_.time, 'monotonic', lambda: float('inf'))
+    provider.query(properties=properties)
+    assert len(counts) == 3
+
+    provider.count_cache_ttl = 0
+    monkeypatch.setattr(postgresql_, '_COUNTS', OrderedDict())
+    provider.query(properties=properties)
+    provider.query(properties=properties)
+    assert len(counts) == 5
+
+
+@pytest.mark.parametrize(
+    'strategy', ['pseudo', 'exact', 'exact-with-statement-timeout']
+)
+def test_count_strategy_exact(config, strategy):
+    config['count_strategy'] = strategy
+    provider = PseudoPostgreSQLProvider(config)
+    for resulttype in ['results', 'hits']:
+        results = provider.query(
+            properties=[('waterway', 'stream')], resulttype=resulttype
+        )
+        assert results['numberMatched'] == 13930
+
+
+def test_count_strategy_estimate(config, monkeypatch):
+    config['count_strategy'] = 'estimate'
+    provider = PseudoPostgreSQLProvider(config)
+    monkeypatch.setattr(provider, '_get_pseudo_count', None)
+
+    results = provider.query(filterq=parse("waterway = 'stream'"))
+    assert results['numberMatched'] > 0
+    assert results['numberReturned'] == 10
+
+
+def test_count_strategy_none(config):
+    config['count_strategy'] = 'none'
+    provider = PseudoPostgreSQLProvider(config)
+
+    results = provider.query(limit=50)
+    assert 'numberMatched' not in results
+    assert results['numberReturned'] == 50
+
+
+def test_count_strategy_timeout(config, monkeypatch):
+    config.update(count_strategy='exact-with-statement-timeout')
+    provider = PseudoPostgreSQLProvider(config)
+    monkeypatch.setattr(provider, '_get_timed_count', lambda results: None)
+    monkeypatch.setattr(provider, '_get_estimate', lambda *args: 42)
+
+    assert provider.query()['numberMatched'] == 42
+
+
+@pytest.mark.parametrize(
+    'strategy', ['estimate', 'exact-with-statement-timeout']
+)
+def test_count_strategy_error(config, monkeypatch, strategy):
+    config['count_strategy'] = strategy
+    provider = PseudoPostgreSQLProvider(config)
+
+    def fail(*args):
+        raise RuntimeError('failed')
+
+    monkeypatch.setattr(provider, '_get_timed_count', fail)
+    monkeypatch.setattr(provider, '_get_estimate', fail)
+    monkeypatch.setattr(Query, 'count', None)
+
+    # The count is left out rather than counted precisely
+    results = provider.query(limit=50)
+    assert 'numberMatched' not in results
+    assert results['numberReturned'] == 50
+
+
+def test_count_strategy_invalid(config):
+    config['count_strategy'] = 'sometimes'
+    with pytest.raises(ProviderInvalidDataError):
+        PseudoPostgreSQLProvider(config)
+
+
+@pytest.mark.parametrize(
+    'sortby',
+    [
+        [],
+        [{'property': 'name', 'order': '+'}],
+        [{'property': 'name', 'order': '-'}],
+        [
+            {'property': 'name', 'order': '+'},
+            {'property': 'waterway', 'order': '-'},
+        ],
+        [
+            {'property': 'waterway', 'order': '+'},
+            {'property': 'name', 'order': '-'},
+        ],
+    ],
+)
+def test_keyset_pagination(config, monkeypatch, sortby):
+    provider = PseudoPostgreSQLProvider({**config, 'pagination': 'keyset'})
+    properties = [('waterway', 'stream')]
+
+    # The first pages skip rows, the following ones seek past the last
+    # row of the page before
+    pages = [
+        provider.query(
+            offset=offset, limit=100, properties=properties, sortby=sortby
+        )
+        for offset in range(0, 500, 100)
+    ]
+    ids = [f['id'] for page in pages for f in page['features']]
+    assert len(ids) == len(set(ids)) == 500
+    assert len(postgresql_._KEYSETS) == 1
+
+    # Pages agree with pages of a fresh worker, which skips every row
+    monkeypatch.setattr(postgresql_, '_KEYSETS', OrderedDict())
+    for offset in [0, 250, 400]:
+        results = provider.query(
+            offset=offset, limit=100, properties=properties, sortby=sortby
+        )
+        assert [f['id'] for f in results['features']] == ids[
+            offset : offset + 100
+        ]
+
+
+def test_keyset_positions_expire(config, monkeypatch):
+    monkeypatch.setattr(PostgreSQLProvider, 'delete', lambda *args: True)
+    provider = PseudoPostgreSQLProvider({**config, 'pagination': 'keyset'})
+    for offset in range(0, 300, 100):
+        provider.query(offset=offset, limit=100)
+    (position,) = postgresql_._KEYSETS
+    assert provider._get_position(position, 300)[0] == 300
+
+    # Writes drop the positions of the table along with its counts
+    assert provider.delete(29701937)
+    assert not postgresql_._KEYSETS
+    assert not postgresql_._COUNTS
+
+    # Positions expire after the count cache TTL
+    provider.query(offset=0, limit=100)
+    monkeypatch.setattr(postgresql_.time, 'monotonic', lambda: float('inf'))
+    assert provider._get_position(position, 300) == (0, None)